@@ -0,0 +1,295 @@
+# autopilot.py
+from __future__ import annotations
+
+import random
+
+from game import GRID_SIZE, SnakeGame, Vec2
+
+# ---------------- 自动驾驶：位并行 BFS ----------------
+# 整张棋盘用一个 4096 位的 Python int 表示（第 y * 64 + x 位 = 格子 (x, y)），
+# 一次移位/与或就把整层 BFS 前沿同时扩展一格。
+# - 障碍位板（蛇身 / 绿豆 / 红橙豆）按每个 tick 的变化增量维护，不逐帧重建；
+# - 从全部绿豆多源 BFS 到蛇头邻格，得到去最近绿豆的距离与路径；距离场（按层位板）跨 tick 保留，
+#   重新规划时只从障碍/绿豆变化所在的最低层起重算，新层与旧层重合后更高的层直接沿用；
+# - 路径在目标仍在且沿途未被新障碍挡住时直接沿用，不重新搜索；
+# - 每步落子前做一次有界洪泛：能回到蛇尾或可达空间不少于蛇长才算安全。
+# 红豆/橙豆在寻路时视为障碍，只有无路可走时才会被吃掉。
+
+_N = GRID_SIZE * GRID_SIZE
+_FULL = (1 << _N) - 1
+_COL0 = sum(1 << (y * GRID_SIZE) for y in range(GRID_SIZE))
+_NOT_COL0 = _FULL ^ _COL0
+_NOT_COL_LAST = _FULL ^ (_COL0 << (GRID_SIZE - 1))
+
+_DIRECTIONS: tuple[Vec2, ...] = ((1, 0), (-1, 0), (0, 1), (0, -1))
+MAX_SEARCH_LAYERS = 2 * GRID_SIZE
+
+
+def _expand(bits: int) -> int:
+    """四邻域扩展一格（不跨越左右边界）"""
+    return (((bits << 1) & _NOT_COL0) | ((bits >> 1) & _NOT_COL_LAST)
+            | ((bits << GRID_SIZE) & _FULL) | (bits >> GRID_SIZE))
+
+
+class _DistanceField:
+    """多源 BFS 距离场：layers[d] = 距最近源恰为 d 的格子，reach[d] = layers[0..d] 的并集。
+    只按查询需要向外扩层；源/可走格子变化后 repair() 截到受影响的最低层，
+    之后扩层时一旦与旧距离场重合就直接接回旧的更高层"""
+
+    def __init__(self):
+        self.sources = 0
+        self.passable = 0
+        self.layers: list[int] = []
+        self.reach: list[int] = []
+        self.complete = False  # 前沿已空（或到达层数上限），不会再扩层
+        self._old = None  # repair 前的 (layers, reach, complete, 变化所及的最高层)
+
+    def _level(self, cells: int, every: bool = False) -> int:
+        """cells 中最近（every=True 时最远）一格所在的层；二分 reach"""
+        lo, hi = 0, len(self.reach) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            got = self.reach[mid] & cells
+            if (got == cells) if every else got:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def _grow(self) -> bool:
+        """算出下一层；与旧距离场重合时接回旧的更高层"""
+        d = len(self.layers)
+        layer = _expand(self.layers[-1]) & self.passable & ~self.reach[-1] if d else self.sources
+        if not layer:
+            self.complete = True
+            return False
+        self.layers.append(layer)
+        self.reach.append(self.reach[-1] | layer if d else layer)
+        old = self._old
+        if old is not None:
+            old_layers, old_reach, old_complete, hi = old
+            if d >= len(old_layers):
+                self._old = None
+            elif d > hi and layer == old_layers[d] and self.reach[d] == old_reach[d]:
+                self.layers += old_layers[d + 1:]
+                self.reach += old_reach[d + 1:]
+                self.complete = old_complete
+                self._old = None
+                return True
+        if len(self.layers) >= MAX_SEARCH_LAYERS:
+            self.complete = True
+        return True
+
+    def extend_to(self, goals: int) -> int:
+        """扩层直到碰到 goals，返回其所在层；碰不到返回 -1"""
+        while not (self.reach and self.reach[-1] & goals):
+            if self.complete or not self._grow():
+                return -1
+        return self._level(goals)
+
+    def repair(self, sources: int, passable: int) -> None:
+        sources &= passable
+        if self._old is not None:
+            # 上次截断后还没接回旧层：旧层里的变化范围不再可知，直接放弃
+            self._old = None
+        reached = self.reach[-1] if self.reach else 0
+        # 变差的格子（被挡住 / 不再是源）：自身所在层起受影响
+        worse = ((self.passable & ~passable) | (self.sources & ~sources)) & reached
+        # 变好的格子（新让出 / 新增源）：最多在其已知邻格的层 + 1
+        around = _expand(passable & ~self.passable) & reached
+        gained = sources & ~self.sources
+        self.sources, self.passable = sources, passable
+        if not self.layers:
+            return
+        lo, hi = len(self.layers), -1
+        if worse:
+            lo, hi = min(lo, self._level(worse)), max(hi, self._level(worse, every=True))
+        if around:
+            lo, hi = min(lo, self._level(around) + 1), max(hi, self._level(around, every=True) + 1)
+        if gained:
+            lo, hi = 0, max(hi, 0)
+        if hi < 0:
+            return
+        self._old = (self.layers, self.reach, self.complete, hi)
+        self.layers, self.reach, self.complete = self.layers[:lo], self.reach[:lo], False
+
+
+class Autopilot:
+    def __init__(self):
+        self._snake = None  # 正在跟踪的 SnakeBody；对局重置/恢复后会换成新对象
+        self._start = 0
+        self._length = 0
+        self.snake_bits = 0
+        self.green_bits = 0
+        self.avoid_bits = 0
+        self._known_green: set[Vec2] = set()
+        self._known_avoid: set[Vec2] = set()
+        self._path: list[int] = []  # 计划中的后续格子（不含当前蛇头）
+        self._path_bits = 0
+        self._target = -1
+        self._field = _DistanceField()
+
+    # ---------- 位板同步 ----------
+    def _resync(self, game: SnakeGame) -> None:
+        snake = game.snake
+        self._snake = snake
+        self._start, self._length = snake.start, snake.length
+        self.snake_bits = 0
+        for idx in snake.indices().tolist():
+            self.snake_bits |= 1 << idx
+        self._known_green = set(game.green_beans)
+        self._known_avoid = game.orange_beans | game.red_beans
+        self.green_bits = self._cells_to_bits(self._known_green)
+        self.avoid_bits = self._cells_to_bits(self._known_avoid)
+        self._path, self._path_bits, self._target = [], 0, -1
+        self._field = _DistanceField()
+
+    @staticmethod
+    def _cells_to_bits(cells) -> int:
+        bits = 0
+        for x, y in cells:
+            bits |= 1 << (y * GRID_SIZE + x)
+        return bits
+
+    def _sync(self, game: SnakeGame) -> None:
+        snake = game.snake
+        if snake is not self._snake:
+            self._resync(game)
+            return
+
+        # 蛇身：环形缓冲区里新增的头与移走的尾就是全部变化
+        cap, buf, occupied = snake.capacity, snake.buf, snake.occupied
+        pushed = (self._start - snake.start) % cap  # 上次同步以来经过的 tick 数
+        touched = []
+        for pos in range(snake.start, snake.start + pushed):
+            touched.append(buf[pos % cap])
+        new_end = snake.start + snake.length
+        popped = (self._start + self._length - new_end) % cap
+        for pos in range(new_end, new_end + popped):
+            touched.append(buf[pos % cap])
+        bits = self.snake_bits
+        for idx in touched:
+            if occupied[idx]:
+                bits |= 1 << idx
+            else:
+                bits &= ~(1 << idx)
+        self.snake_bits = bits
+        self._start, self._length = snake.start, snake.length
+
+        # 豆子：只隔一个 tick 时，数量变化或蛇头吃到才做一次集合差；
+        # 隔了多个 tick（手动转向期间没有调用 choose）时吃与生成可能在数量上抵消，直接做集合差
+        head = snake[0]
+        green = game.green_beans
+        stale = pushed != 1
+        if stale or len(green) != len(self._known_green) or head in self._known_green:
+            self.green_bits = self._apply_diff(self.green_bits, self._known_green, green)
+            self._known_green = set(green)
+        avoid_count = len(game.orange_beans) + len(game.red_beans)
+        if stale or avoid_count != len(self._known_avoid) or head in self._known_avoid:
+            current = game.orange_beans | game.red_beans
+            self.avoid_bits = self._apply_diff(self.avoid_bits, self._known_avoid, current)
+            self._known_avoid = current
+
+    @staticmethod
+    def _apply_diff(bits: int, known: set[Vec2], current: set[Vec2]) -> int:
+        for x, y in known - current:
+            bits &= ~(1 << (y * GRID_SIZE + x))
+        for x, y in current - known:
+            bits |= 1 << (y * GRID_SIZE + x)
+        return bits
+
+    # ---------- 搜索 ----------
+    def _is_safe(self, cell: int, tail: int, length: int, tail_moves: bool) -> bool:
+        """走到 cell 后：能回到（正在移动的）蛇尾，或可达空间不少于蛇长"""
+        free = _FULL & ~(self.snake_bits & ~(1 << tail))
+        reach = frontier = 1 << cell
+        tail_bit = (1 << tail) if tail_moves else 0
+        while frontier:
+            if reach & tail_bit or reach.bit_count() > length:
+                return True
+            frontier = _expand(frontier) & free & ~reach
+            reach |= frontier
+        return False
+
+    def _area(self, cell: int, tail: int) -> int:
+        free = _FULL & ~(self.snake_bits & ~(1 << tail))
+        reach = frontier = 1 << cell
+        while frontier:
+            frontier = _expand(frontier) & free & ~reach
+            reach |= frontier
+        return reach.bit_count()
+
+    def _plan(self, head: int, candidates: list[int], passable: int) -> None:
+        """多源 BFS（全部绿豆 -> 蛇头邻格），沿层回溯出一条到最近绿豆的路径"""
+        goal = 0
+        for idx in candidates:
+            goal |= 1 << idx
+        field = self._field
+        field.repair(self.green_bits, passable)
+        level = field.extend_to(goal)
+        self._path, self._path_bits, self._target = [], 0, -1
+        if level < 0:
+            return
+        layers = field.layers[:level + 1]
+        hits = layers[-1] & goal
+        # 同距离时优先直行（候选表第一项）
+        cell = next(idx for idx in candidates if hits >> idx & 1)
+        path = [cell]
+        for layer in reversed(layers[:-1]):
+            around = _expand(1 << cell) & layer
+            cell = (around & -around).bit_length() - 1
+            path.append(cell)
+        self._path = path
+        self._target = path[-1]
+        self._path_bits = 0
+        for idx in path:
+            self._path_bits |= 1 << idx
+
+    # ---------- 决策 ----------
+    def choose(self, game: SnakeGame) -> Vec2:
+        self._sync(game)
+        snake = game.snake
+        hx, hy = snake[0]
+        head = hy * GRID_SIZE + hx
+        tx, ty = snake[-1]
+        tail = ty * GRID_SIZE + tx
+        length = len(snake) + game.grow_pending
+
+        # 可走的邻格（直行在前）
+        dx, dy = game.direction
+        order = [game.direction] + [d for d in _DIRECTIONS if d != game.direction and d != (-dx, -dy)]
+        # 蛇尾只有在没有生长储备时才会让出
+        blocked = self.snake_bits & ~(1 << tail) if game.grow_pending == 0 else self.snake_bits
+        moves: dict[int, Vec2] = {}
+        for d in order:
+            x, y = hx + d[0], hy + d[1]
+            if 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE and not blocked >> (y * GRID_SIZE + x) & 1:
+                moves[y * GRID_SIZE + x] = d
+        if not moves:
+            return game.direction
+
+        # 沿用上次的路径：目标还在、路上没有新障碍
+        if self._path and self._path[0] == head:
+            self._path.pop(0)
+            self._path_bits &= ~(1 << head)
+        obstacles = blocked | self.avoid_bits
+        if not (self._path and self._path[0] in moves and self.green_bits >> self._target & 1
+                and not self._path_bits & obstacles):
+            self._plan(head, [idx for idx in moves if not self.avoid_bits >> idx & 1],
+                       _FULL & ~obstacles)
+
+        tail_moves = game.grow_pending == 0
+        if self._path and self._is_safe(self._path[0], tail, length, tail_moves):
+            return moves[self._path[0]]
+        self._path, self._path_bits, self._target = [], 0, -1
+
+        # 没有安全的去路：避开红橙豆，选能回到尾巴/空间最大的一步
+        safe = [idx for idx in moves if self._is_safe(idx, tail, length, tail_moves)]
+        clean = [idx for idx in safe if not self.avoid_bits >> idx & 1]
+        pool = clean or safe or list(moves)
+        best = max(pool, key=lambda idx: self._area(idx, tail)) if len(pool) > 1 else pool[0]
+        return moves[best]
+
+    def __call__(self, game: SnakeGame, rng: random.Random | None = None) -> Vec2:
+        """与 tuner 的策略接口一致"""
+        return self.choose(game)
@@ -1,9 +1,10 @@
 # codewall.py
 from __future__ import annotations
 
-import random
+import os
 from typing import Set
 
+import numpy as np
 import pygame as pg
 
 # ---------------- CodeWall（代码雨） ----------------
@@ -93,12 +94,21 @@ CODE_TOKENS = [
     "echo 1024",
     "exit",
 ]
-class _Glyph:
-    __slots__ = ("text", "x", "y", "vx", "vy", "color", "alpha", "surface")
-    def __init__(self, text, x, y, vx, vy, color, alpha, surface):
-        self.text = text; self.x = x; self.y = y
-        self.vx = vx; self.vy = vy
-        self.color = color; self.alpha = alpha; self.surface = surface
+
+# 透明度分桶：同一 (词条, 桶) 共享一张预渲染 Surface
+ALPHA_BUCKETS = 8
+
+# 离屏层：棋盘外的代码雨（连同底色）按 layer_hz 重绘到一张常驻 Surface，
+# 其余帧只推进坐标，游戏循环每帧整层 blit 一次。0 = 每帧逐字形直接画到屏幕。
+LAYER_HZ_ENV = "VIBESNAKE_CODEWALL_HZ"
+
+
+def layer_hz_from_env() -> float:
+    try:
+        return max(0.0, float(os.environ.get(LAYER_HZ_ENV, "0") or 0))
+    except ValueError:
+        return 0.0
+
 
 class CodeWall:
     def __init__(
@@ -112,12 +122,15 @@ class CodeWall:
         greenish=True,
         seed=None,
         max_token_len: int | None = 24,
+        layer_hz: float = 0.0,
     ):
         pg.font.init()
-        self.rng = random.Random(seed)
+        self.rng = np.random.default_rng(seed)
         self.font = pg.font.SysFont(font_name, font_size)
         self.font_size = font_size
         self.density = density
+        self.density_scale = 1.0  # 画质档位：实际密度 = density * density_scale
+        self.alpha_mode = "blend"  # "blend" 抗锯齿 + 透明度；"key" 无抗锯齿、预先压暗的色键字形
         self.speed = speed
         self.hspeed = horizontal_speed
         self.alpha_range = alpha_range
@@ -128,14 +141,48 @@ class CodeWall:
         self.error_tokens = self._trim_tokens(ERROR_TOKENS)
         self.normal_tokens = self._trim_tokens(CODE_TOKENS)
 
+        # 词条总表：token id 即下标；分组顺序与权重顺序一致（普通 / 错误 / 成功）
+        self.token_texts: list[str] = self.normal_tokens + self.error_tokens + self.success_tokens
+        self.token_colors: list[tuple[int, int, int]] = (
+            [NEUTRAL_COLOR] * len(self.normal_tokens)
+            + [ERROR_COLOR] * len(self.error_tokens)
+            + [SUCCESS_COLOR] * len(self.success_tokens)
+        )
+        self.alpha_levels = np.linspace(alpha_range[0], alpha_range[1], ALPHA_BUCKETS).round().astype(int)
+        self._surface_cache: dict[tuple[int, int], pg.Surface] = {}
+        sizes = [self.font.size(text) for text in self.token_texts]
+        self.token_w = np.array([w for w, _ in sizes], dtype=np.float64)
+        self.token_h = np.array([h for _, h in sizes], dtype=np.float64)
+        self._bands_key = None
+        self._bands = None
+
         self.score = 0
         self.success_weight = self._calc_success_weight(self.score)
         self.error_weight = 1.0
         self.normal_weight = 1.0
+        self._rebuild_token_table()
 
-        self.glyphs: list[_Glyph] = []
+        # 结构化数组（SoA）：每个字段一列，下标即字形编号
+        self.xs = np.empty(0, dtype=np.float64)
+        self.ys = np.empty(0, dtype=np.float64)
+        self.vxs = np.empty(0, dtype=np.float64)
+        self.vys = np.empty(0, dtype=np.float64)
+        self.token_ids = np.empty(0, dtype=np.int32)
+        self.alpha_ids = np.empty(0, dtype=np.int8)
         self.last_layout_key = None
         self.bounds_rect = pg.Rect(0, 0, 0, 0)
+        self._layout_bounds: pg.Rect | None = None  # 当前字形坐标所对应的区域
+
+        # 离屏层（layer_hz > 0 时启用）
+        self.layer_hz = layer_hz
+        self._layer: pg.Surface | None = None
+        self._layer_key = None
+        self._layer_age_ms = 0.0
+        self._layer_rects: list[pg.Rect] = []  # 上次重绘时画过的字形区域
+
+    @property
+    def glyph_count(self) -> int:
+        return int(self.xs.size)
 
     # ---------- 内部工具 ----------
     def _trim_tokens(self, tokens: list[str]) -> list[str]:
@@ -160,61 +207,128 @@ class CodeWall:
         if score == self.score:
             return
         self.score = score
-        self.success_weight = self._calc_success_weight(self.score)
+        success_weight = self._calc_success_weight(self.score)
+        if success_weight != self.success_weight:
+            self.success_weight = success_weight
+            self._rebuild_token_table()
+
+    def _rebuild_token_table(self) -> None:
+        """按分组权重生成整表累积分布；仅在权重变化时调用"""
+        weights = np.concatenate([
+            np.full(len(self.normal_tokens), self.normal_weight / max(1, len(self.normal_tokens))),
+            np.full(len(self.error_tokens), self.error_weight / max(1, len(self.error_tokens))),
+            np.full(len(self.success_tokens), self.success_weight / max(1, len(self.success_tokens))),
+        ])
+        self._token_cdf = np.cumsum(weights)
 
-    def _random_token(self) -> tuple[str, tuple[int, int, int]]:
-        groups: list[tuple[float, list[str], tuple[int, int, int]]] = []
-        if self.normal_tokens:
-            groups.append((self.normal_weight, self.normal_tokens, NEUTRAL_COLOR))
-        if self.error_tokens:
-            groups.append((self.error_weight, self.error_tokens, ERROR_COLOR))
-        if self.success_tokens:
-            groups.append((self.success_weight, self.success_tokens, SUCCESS_COLOR))
-
-        if not groups:
-            return ("", NEUTRAL_COLOR)
-
-        total_weight = sum(weight for weight, _, _ in groups)
-        pick = self.rng.uniform(0, total_weight)
-        cumulative = 0.0
-        for weight, tokens, color in groups:
-            cumulative += weight
-            if pick <= cumulative and tokens:
-                return self.rng.choice(tokens), color
-
-        # fallback if floating point rounding leaves pick slightly > cumulative
-        tokens, color = groups[-1][1], groups[-1][2]
-        return (self.rng.choice(tokens) if tokens else "", color)
+    def sample_token_ids(self, n: int) -> np.ndarray:
+        """一次抽取 n 个词条 id（按当前权重），无词条时返回 -1"""
+        cdf = self._token_cdf
+        if cdf.size == 0 or cdf[-1] <= 0:
+            return np.full(n, -1, dtype=np.int32)
+        picks = np.searchsorted(cdf, self.rng.random(n) * cdf[-1], side="right")
+        # 浮点舍入可能让 pick 恰好落在末尾之外
+        return np.minimum(picks, cdf.size - 1).astype(np.int32)
+
+    def set_quality(self, density_scale: float, alpha_mode: str) -> None:
+        """画质档位变化时调用；密度在下一次 advance 时增量重排，字形缓存按需重建"""
+        if density_scale != self.density_scale:
+            self.density_scale = density_scale
+            self.last_layout_key = None
+        if alpha_mode != self.alpha_mode:
+            self.alpha_mode = alpha_mode
+            self._surface_cache.clear()
 
     def _make_surface(self, text: str, color: tuple[int,int,int], alpha: int) -> pg.Surface:
-        surf = self.font.render(text, True, color).convert_alpha()
+        if self.alpha_mode == "key":
+            # 按透明度把颜色压暗（背景接近黑色），色键 + RLE 贴图远快于逐像素混合
+            dimmed = tuple(c * alpha // 255 for c in color)
+            surf = self.font.render(text, False, dimmed)
+            surf.set_colorkey(surf.get_colorkey(), pg.RLEACCEL)
+            return surf
+        surf = self.font.render(text, True, color)
+        if pg.display.get_surface() is not None:  # sdl2 后端没有 display surface
+            surf = surf.convert_alpha()
         if alpha < 255: surf.set_alpha(alpha)
         return surf
 
+    def _glyph_surface(self, token_id: int, alpha_id: int) -> pg.Surface | None:
+        if token_id < 0:
+            return None
+        key = (token_id, alpha_id)
+        surf = self._surface_cache.get(key)
+        if surf is None:
+            surf = self._make_surface(self.token_texts[token_id], self.token_colors[token_id],
+                                      int(self.alpha_levels[alpha_id]))
+            self._surface_cache[key] = surf
+        return surf
+
     def _ensure_layout(self, screen_size, hud_height):
         key = (screen_size, hud_height)
         if key == self.last_layout_key: return
         self.last_layout_key = key
         sw, sh = screen_size
-        self.glyphs.clear()
         top_margin = max(0, min(hud_height, sh))
         self.bounds_rect = pg.Rect(0, top_margin, sw, max(0, sh - top_margin))
-        if self.bounds_rect.width <= 0 or self.bounds_rect.height <= 0: return
+        b = self.bounds_rect
+        if b.width <= 0 or b.height <= 0:
+            return  # 窗口最小化等情况：保留现有字形，恢复后再按比例缩放
 
         fs = self.font_size
-        area = self.bounds_rect.width * self.bounds_rect.height
-        target = int(max(12, area / (fs * fs) * self.density))
-        for _ in range(target):
-            x = self.rng.uniform(self.bounds_rect.left, self.bounds_rect.right)
-            y = self.rng.uniform(self.bounds_rect.top, self.bounds_rect.bottom)
-            vy = self.rng.uniform(*self.speed)
-            vx = self.rng.uniform(-self.hspeed[1], self.hspeed[1])
-            alpha = self.rng.randint(*self.alpha_range)
-            text, color = self._random_token()
-            surface = self._make_surface(text, color, alpha)
-            self.glyphs.append(_Glyph(text, x, y, vx, vy, color, alpha, surface))
-
-    # ---------- 新：位置推进（每帧一次） ----------
+        target = int(max(12, b.width * b.height / (fs * fs) * self.density * self.density_scale))
+
+        # 增量重排：已有字形按比例映射到新区域，只为面积差增删字形
+        old = self._layout_bounds
+        if old is not None and old != b:
+            self.xs = b.left + (self.xs - old.left) * (b.width / old.width)
+            self.ys = b.top + (self.ys - old.top) * (b.height / old.height)
+        self._layout_bounds = b.copy()
+
+        count = self.xs.size
+        if target < count:
+            self.xs = self.xs[:target]
+            self.ys = self.ys[:target]
+            self.vxs = self.vxs[:target]
+            self.vys = self.vys[:target]
+            self.token_ids = self.token_ids[:target]
+            self.alpha_ids = self.alpha_ids[:target]
+        elif target > count:
+            n = target - count
+            rng = self.rng
+            self.xs = np.concatenate([self.xs, rng.uniform(b.left, b.right, n)])
+            self.ys = np.concatenate([self.ys, rng.uniform(b.top, b.bottom, n)])
+            self.vys = np.concatenate([self.vys, rng.uniform(*self.speed, n)])
+            self.vxs = np.concatenate([self.vxs, rng.uniform(-self.hspeed[1], self.hspeed[1], n)])
+            self.token_ids = np.concatenate([self.token_ids, self.sample_token_ids(n)])
+            self.alpha_ids = np.concatenate([self.alpha_ids, rng.integers(0, ALPHA_BUCKETS, n, dtype=np.int8)])
+
+    def resize(self, screen_size, hud_height: int = 0) -> None:
+        """窗口尺寸变化时立即重排（否则在下一次 advance 时惰性重排）"""
+        self._ensure_layout(tuple(screen_size), hud_height)
+
+    # ---------- 动画状态导出/恢复（离线渲染分段用） ----------
+    def get_state(self) -> dict:
+        """可 pickle 的动画状态：字形数组、随机数状态、布局与分数"""
+        return {
+            "arrays": tuple(a.copy() for a in (self.xs, self.ys, self.vxs, self.vys,
+                                               self.token_ids, self.alpha_ids)),
+            "rng": self.rng.bit_generator.state,
+            "score": self.score,
+            "success_weight": self.success_weight,
+            "layout": (self.last_layout_key, self.bounds_rect.copy(),
+                       None if self._layout_bounds is None else self._layout_bounds.copy()),
+        }
+
+    def set_state(self, state: dict) -> None:
+        (self.xs, self.ys, self.vxs, self.vys,
+         self.token_ids, self.alpha_ids) = (a.copy() for a in state["arrays"])
+        self.rng.bit_generator.state = state["rng"]
+        self.score = state["score"]
+        self.success_weight = state["success_weight"]
+        self._rebuild_token_table()
+        self.last_layout_key, self.bounds_rect, self._layout_bounds = state["layout"]
+
+    # ---------- 新：位置推进（每帧一次，整列向量化） ----------
     def advance(self, dt_ms: int, screen: pg.Surface | None = None, hud_height: int = 0):
         if screen is None: screen = pg.display.get_surface()
         if screen is None: return
@@ -223,21 +337,48 @@ class CodeWall:
         if self.bounds_rect.width <= 0 or self.bounds_rect.height <= 0: return
 
         dt = max(1.0, float(dt_ms)) / 1000.0
+        self._layer_age_ms += dt * 1000.0
         b = self.bounds_rect
-        for g in self.glyphs:
-            g.x += g.vx * dt
-            g.y += g.vy * dt
-            if g.y > b.bottom:
-                g.y = b.top - self.font_size * self.rng.uniform(0.2, 1.5)
-                g.text, g.color = self._random_token()
-                g.alpha = self.rng.randint(*self.alpha_range)
-                g.surface = self._make_surface(g.text, g.color, g.alpha)
-            if g.x < b.left - 20:
-                g.x = b.right + 10
-            elif g.x > b.right + 20:
-                g.x = b.left - 10
+        self.xs += self.vxs * dt
+        self.ys += self.vys * dt
+
+        # 掉出底部的字形：回到顶部并换新词条/透明度
+        respawn = np.flatnonzero(self.ys > b.bottom)
+        if respawn.size:
+            n = respawn.size
+            self.ys[respawn] = b.top - self.font_size * self.rng.uniform(0.2, 1.5, n)
+            self.token_ids[respawn] = self.sample_token_ids(n)
+            self.alpha_ids[respawn] = self.rng.integers(0, ALPHA_BUCKETS, n, dtype=np.int8)
+
+        # 左右越界环绕
+        self.xs[self.xs < b.left - 20] = b.right + 10
+        self.xs[self.xs > b.right + 20] = b.left - 10
 
     # ---------- 绘制：将代码雨直接画到屏幕（棋盘外与未激活区域内） ----------
+    def _draw_bands(self, board_rect, scale, cell_pixels, subgrid_cells, active_mask,
+                    grid_cells, subgrid_cols, hide_margin_px):
+        """按棋盘位置预计算可见带与子块激活表；参数不变时复用"""
+        key = (tuple(board_rect) if board_rect else None, scale, cell_pixels, subgrid_cells,
+               active_mask, grid_cells, subgrid_cols, hide_margin_px)
+        if key == self._bands_key:
+            return self._bands
+        self._bands_key = key
+        if not board_rect:
+            self._bands = None
+            return None
+        margin = hide_margin_px * scale
+        subgrid_rows = max(1, -(-grid_cells // max(1, subgrid_cells)))
+        cols = max(1, subgrid_cols)
+        bits = np.array([(active_mask >> i) & 1 for i in range(subgrid_rows * cols)], dtype=bool)
+        self._bands = (
+            board_rect.left - margin, board_rect.top - margin,      # 左/上带的内边界
+            board_rect.right + margin, board_rect.bottom + margin,  # 右/下带的内边界
+            board_rect.left, board_rect.top,
+            max(1e-6, subgrid_cells * cell_pixels * scale),         # 子块在屏幕上的边长
+            subgrid_rows, cols, bits,
+        )
+        return self._bands
+
     def draw(
         self,
         screen: pg.Surface,
@@ -246,24 +387,74 @@ class CodeWall:
         board_scale: float,
         cell_pixels: int = 16,
         subgrid_cells: int = 16,
-        active_subgrids: Set[int] | None = None,
+        active_subgrids: Set[int] | int | None = None,
         grid_cells: int = 64,
         subgrid_cols: int = 4,
         hide_margin_px: int = 0,
-    ) -> None:
-        if screen is None:
-            return
-        active_subgrids = active_subgrids or set()
+    ) -> list[pg.Rect]:
+        """返回本帧实际绘制的矩形列表（供脏矩形提交使用）"""
+        if screen is None or self.xs.size == 0:
+            return []
+        # 激活子块统一转成位掩码（bit i = 第 i 个子块，行优先）
+        if isinstance(active_subgrids, int):
+            active_mask = active_subgrids
+        else:
+            active_mask = 0
+            for idx in active_subgrids or ():
+                active_mask |= 1 << idx
         scale = max(board_scale, 1e-6)
-        board_span = cell_pixels * grid_cells
+        bands = self._draw_bands(board_rect, scale, cell_pixels, subgrid_cells, active_mask,
+                                 grid_cells, subgrid_cols, hide_margin_px)
+
+        xs, ys, tids = self.xs, self.ys, self.token_ids
+        safe_tids = np.maximum(tids, 0)
+        right = xs + self.token_w[safe_tids]
+        bottom = ys + self.token_h[safe_tids]
+        sw, sh = screen.get_size()
+        visible = (tids >= 0) & (right > 0) & (xs < sw) & (bottom > 0) & (ys < sh)
 
-        for g in self.glyphs:
-            if g.surface is None:
-                continue
+        if bands is not None:
+            bl, bt, br, bb, ox, oy, sub_px, rows, cols, bits = bands
+            # 完全落在棋盘四周的横/竖可见带内
+            outside = (right <= bl) | (xs >= br) | (bottom <= bt) | (ys >= bb)
+            # 落在棋盘内：以中心点所在子块判定，未激活子块中照常显示
+            col = np.floor(((xs + right) * 0.5 - ox) / sub_px).astype(np.int64)
+            row = np.floor(((ys + bottom) * 0.5 - oy) / sub_px).astype(np.int64)
+            in_grid = (col >= 0) & (col < cols) & (row >= 0) & (row < rows)
+            inactive = np.zeros_like(in_grid)
+            inactive[in_grid] = ~bits[row[in_grid] * cols + col[in_grid]]
+            visible &= outside | inactive
 
-            glyph_rect_screen = g.surface.get_rect(topleft=(g.x, g.y))
-            if board_rect and glyph_rect_screen.colliderect(board_rect):
-                continue
+        idx = np.flatnonzero(visible)
+        if idx.size == 0:
+            return []
+        surface_of = self._glyph_surface
+        return screen.blits(
+            [
+                (surface_of(t, a), (x, y))
+                for x, y, t, a in zip(xs[idx].tolist(), ys[idx].tolist(),
+                                      tids[idx].tolist(), self.alpha_ids[idx].tolist())
+            ]
+        )
 
-            surf = g.surface
-            screen.blit(surf, (g.x, g.y))
+    def draw_layer(self, screen: pg.Surface, background: tuple[int, int, int], **draw_args) -> list[pg.Rect]:
+        """离屏层模式：代替 screen.fill(background) + draw()。
+        到期（或尺寸/棋盘位置/字形样式变化）时把底色与字形重绘到常驻层，每帧整层 blit 一次；
+        返回需提交的矩形：重绘帧为旧字形与新字形区域，其余帧为空（层内容没变）"""
+        size = screen.get_size()
+        board_rect = draw_args.get("board_rect")
+        key = (size, background, self.alpha_mode, tuple(board_rect) if board_rect else None)
+        interval = 1000.0 / self.layer_hz
+        dirty: list[pg.Rect] = []
+        if key != self._layer_key or self._layer_age_ms >= interval:
+            if self._layer is None or self._layer.get_size() != size:
+                self._layer = pg.Surface(size, 0, screen)
+            self._layer.fill(background)
+            rects = self.draw(self._layer, **draw_args)
+            dirty = self._layer_rects + rects
+            self._layer_rects = rects
+            self._layer_key = key
+            # 保留余量让重绘节奏贴近 layer_hz；落后太多时直接清零
+            self._layer_age_ms = self._layer_age_ms - interval if self._layer_age_ms < 2 * interval else 0.0
+        screen.blit(self._layer, (0, 0))
+        return dirty
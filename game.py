@@ -1,12 +1,28 @@
 # game.py
 from __future__ import annotations
 
+import copy
+import os
 import random
+import statistics
+import struct
+import sys
+import time
+from array import array
 from collections import deque
 from typing import Deque, Set, Tuple
 
+import numpy as np
 import pygame as pg
 
+import memtrace
+import quality
+import render_backend
+from present import Presenter
+from resize import ResizeHub
+from scheduler import ACTIVE, ANIMATED, STATIC, FrameScheduler
+from snakebody import SnakeBody
+
 Vec2 = Tuple[int, int]
 
 # ===== 基础尺寸 =====
@@ -18,6 +34,8 @@ TOTAL_CELLS = GRID_SIZE * GRID_SIZE  # 64x64 = 4096
 # ===== 渲染&布局 =====
 MOVE_FPS = 10
 RENDER_FPS = 60
+IDLE_RENDER_FPS = 20  # 结算页等无交互动画的帧率
+MAX_CATCHUP_STEPS = 5  # 单帧最多追赶的移动步数，超出部分丢弃
 PIXEL_PERFECT = True
 
 HUD_RESERVED_HEIGHT = 64
@@ -68,6 +86,12 @@ DIRECTION_KEYS = {
     pg.K_LEFT: (-1, 0), pg.K_a: (-1, 0),
     pg.K_RIGHT: (1, 0), pg.K_d: (1, 0),
 }
+AUTOPILOT_KEY = pg.K_F2  # 开关自动驾驶
+AUTOPILOT_ENV = "VIBESNAKE_AUTOPILOT"  # 设为 1 时开局即启用（长时间压测）
+SPECTATE_ENV = "VIBESNAKE_SPECTATE"  # 设为文件路径时把对局录成观战流（spectate.py）
+REPLAY_ENV = "VIBESNAKE_REPLAY"  # 设为文件路径时记录种子 + 逐 tick 输入（replay.py 离线导出）
+TURN_QUEUE_SIZE = 3  # 一个移动周期内最多缓存的转向数
+LATENCY_SAMPLES = 256
 
 # ===== 生成节奏 =====
 SPAWN_BATCH_INTERVAL = 0.5  # 每 0.5 秒生成一批
@@ -83,18 +107,60 @@ MAX_BEANS_HARD_CAP = 1600
 INITIAL_RED_BEANS = 96
 MAX_RED_BEAN_COUNT = 200
 
+# ===== 变更日志（观战流/录像用；game.journal 为 None 时不记录） =====
+# 事件：(EV_HEAD, 格子) 新蛇头 / (EV_POP, 节数) 尾部移除 / (EV_EAT, 种类) 蛇头吃豆
+#       (EV_SPAWN, 种类, 格子) 生成豆子 / (EV_TICK,) 一个 tick 结束 / (EV_RESET,) 重开
+EV_TICK, EV_HEAD, EV_POP, EV_EAT, EV_SPAWN, EV_RESET = range(6)
+BEAN_GREEN, BEAN_ORANGE, BEAN_RED = 1, 2, 3
+
+# ===== 输入记录（game.input_log 为 None 时不记录）：每个 tick 一个字节 =====
+# 0~3 = 本 tick 实际采用的方向（INPUT_DIRECTIONS 的下标），INPUT_RESET = 重开
+INPUT_DIRECTIONS: tuple[Vec2, ...] = ((1, 0), (-1, 0), (0, 1), (0, -1))
+INPUT_RESET = 0xFF
+_INPUT_CODES = {d: code for code, d in enumerate(INPUT_DIRECTIONS)}
+
+# ===== 快照 =====
+# 头部（小端）：魔数、版本、方向、分数/最高分/生长储备/丢弃步数、移动间隔与两个计时器、
+# 状态位、上一 tick 首尾格、各段长度、RNG 的 gauss 缓存；其后依次为
+# 蛇身/绿/橙/红 int16 格子编号、转向队列 int8 方向对、RNG 状态 uint32 数组。
+SNAPSHOT_MAGIC = b"VSNK"
+SNAPSHOT_VERSION = 1
+_DEATH_CAUSES = (None, "wall", "self", "shrink")  # 状态位 4~5
+_SNAPSHOT_HEADER = struct.Struct("<4sBbbIIIIdddBHHHHHHBH?d")
+
+# 豆子/蛇身精灵与字体缓存（首次渲染时创建，所有对局共享；无界面模拟不会创建）
+# 精灵按豆子细节档位分组：True = 完整立体精灵，False = 纯色方块
+_SPRITES: dict[bool, dict[str, pg.Surface]] = {}
+_FONTS: dict[int, pg.font.Font] = {}
+
+
+def _font(size: int) -> pg.font.Font:
+    font = _FONTS.get(size)
+    if font is None:
+        font = _FONTS[size] = pg.font.SysFont(FONT_NAME, size)
+    return font
+
+
 class SnakeGame:
     def __init__(self, rng_seed: int | None = None):
         self.rng = random.Random(rng_seed)
         self.move_interval = 1.0 / MOVE_FPS
 
-        self.board_surface = pg.Surface((BOARD_PIXELS, BOARD_PIXELS))
-        self.entities_surface = pg.Surface((BOARD_PIXELS, BOARD_PIXELS), pg.SRCALPHA)
+        self.backend = render_backend.active()
 
-        self.font_hud = pg.font.SysFont(FONT_NAME, 20)
-        self.font_small = pg.font.SysFont(FONT_NAME, 18)
-        self.font_large = pg.font.SysFont(FONT_NAME, 48)
         self.high_score = 0
+        self.input_latency_ms: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._presented_overlay = (False, False)
+        # 尺寸相关缓存：棋盘位置/缩放、覆盖层（由 on_resize 统一失效）
+        self._board_dest_cache = None
+        self._overlay_cache: dict[str, tuple[tuple, pg.Surface]] = {}
+        # 自动驾驶（autopilot.Autopilot）：每个 tick 在转向队列为空时接管方向
+        self.autopilot = None
+        self.journal: list[tuple] | None = None
+        self.input_log: bytearray | None = None
+        # 画质档位（quality.py）：豆子细节与非整数倍缩放方式
+        self.bean_detail = True
+        self.smooth_scaling = True
 
         self.reset()
 
@@ -147,13 +213,20 @@ class SnakeGame:
 
     # ====== 初始化/重置 ======
     def reset(self) -> None:
+        if self.journal is not None:
+            self.journal.clear()
+            self.journal.append((EV_RESET,))
+        if self.input_log is not None:
+            self.input_log.append(INPUT_RESET)
         center = GRID_SIZE // 2
         initial = [(center + offset, center) for offset in range(3, -5, -1)]
-        self.snake: Deque[Vec2] = deque(initial)
-        self.snake_set: Set[Vec2] = set(initial)
+        self.snake = SnakeBody(GRID_SIZE, initial)
+        self._prev_head: Vec2 = initial[0]
+        self._prev_tail: Vec2 = initial[-1]
         self.direction: Vec2 = (1, 0)
-        self.pending_direction: Vec2 = self.direction
-        self.direction_locked = False
+        # 转向队列：(方向, 按键时刻)，每步消费一个
+        self.turn_queue: Deque[tuple[Vec2, float]] = deque()
+        self._turns_awaiting_frame: list[float] = []
 
         # 分数 = 长度
         self.score = len(self.snake)
@@ -168,9 +241,11 @@ class SnakeGame:
         # 计时器
         self.move_timer = 0.0
         self.spawn_timer = 0.0
+        self.dropped_steps = 0
 
         # 状态
         self.dead = False
+        self.death_cause: str | None = None  # "wall" / "self" / "shrink"
         self.restart_requested = False
         self.exit_to_menu = False
         self.easter_triggered = False
@@ -186,35 +261,173 @@ class SnakeGame:
             elif key == pg.K_ESCAPE: self.exit_to_menu = True
             return
         candidate = DIRECTION_KEYS.get(key)
-        if candidate is None or self.direction_locked:
+        if candidate is not None:
+            self.queue_turn(candidate)
+
+    def queue_turn(self, candidate: Vec2) -> bool:
+        """把转向放进队列（无界面驱动也走这里）；被丢弃时返回 False"""
+        if self.dead or self.easter_triggered or len(self.turn_queue) >= TURN_QUEUE_SIZE:
+            return False
+        # 只接受四个单位方向（无界面客户端可能发来任意 (dx, dy)）
+        if candidate not in _INPUT_CODES:
+            return False
+        # 相对“队尾将要生效的方向”判断：重复与掉头都丢弃
+        last = self.turn_queue[-1][0] if self.turn_queue else self.direction
+        if candidate == last or candidate == (-last[0], -last[1]):
+            return False
+        self.turn_queue.append((candidate, time.perf_counter()))
+        return True
+
+    # ====== 输入延迟统计（按键 -> 第一帧体现该转向的画面） ======
+    def mark_frame_presented(self) -> None:
+        """每帧提交画面后调用：把本帧已生效的转向记为一次延迟样本"""
+        if not self._turns_awaiting_frame:
             return
-        opposite = (-self.direction[0], -self.direction[1])
-        if candidate == opposite:
-            return
-        self.pending_direction = candidate
-        self.direction_locked = True
+        now = time.perf_counter()
+        for pressed_at in self._turns_awaiting_frame:
+            self.input_latency_ms.append((now - pressed_at) * 1000.0)
+        self._turns_awaiting_frame.clear()
+
+    def latency_stats(self) -> dict[str, float]:
+        samples = sorted(self.input_latency_ms)
+        if not samples:
+            return {"count": 0}
+        return {
+            "count": len(samples),
+            "mean": statistics.fmean(samples),
+            "p50": samples[len(samples) // 2],
+            "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            "max": samples[-1],
+        }
+
+    # ====== 快照 / 克隆 ======
+    def snapshot(self) -> bytes:
+        """把完整对局状态打包成紧凑的二进制快照（豆子按格子编号排序，同一状态输出相同）"""
+        g = GRID_SIZE
+        snake = array("h", self.snake.indices().tobytes())
+        beans = [array("h", sorted(y * g + x for x, y in kind))
+                 for kind in (self.green_beans, self.orange_beans, self.red_beans)]
+        turns = array("b", [c for (dx, dy), _ in self.turn_queue for c in (dx, dy)])
+        _, internal, gauss = self.rng.getstate()
+        rng_state = array("I", internal)
+        flags = (self.dead | self.restart_requested << 1
+                 | self.exit_to_menu << 2 | self.easter_triggered << 3
+                 | _DEATH_CAUSES.index(self.death_cause) << 4)
+        header = _SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, *self.direction,
+            self.score, self.high_score, self.grow_pending, self.dropped_steps,
+            self.move_interval, self.move_timer, self.spawn_timer, flags,
+            self._prev_head[1] * g + self._prev_head[0], self._prev_tail[1] * g + self._prev_tail[0],
+            len(snake), *(len(b) for b in beans), len(self.turn_queue),
+            len(rng_state), gauss is not None, gauss or 0.0,
+        )
+        parts = [snake, *beans, turns, rng_state]
+        if sys.byteorder == "big":
+            for part in parts:
+                part.byteswap()
+        return header + b"".join(part.tobytes() for part in parts)
+
+    def restore(self, blob: bytes) -> None:
+        """从 snapshot() 的输出恢复对局状态（渲染资源与缓存保持不变）；
+        格式或长度不对时抛 ValueError，原状态不变"""
+        if len(blob) < _SNAPSHOT_HEADER.size:
+            raise ValueError(f"truncated snapshot: {len(blob)} bytes")
+        (magic, version, dx, dy, score, high_score, grow_pending, dropped_steps,
+         move_interval, move_timer, spawn_timer, flags, prev_head, prev_tail,
+         n_snake, n_green, n_orange, n_red, n_turns, n_rng, has_gauss, gauss) = \
+            _SNAPSHOT_HEADER.unpack_from(blob)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot: {magic!r} v{version}")
+        expected = (_SNAPSHOT_HEADER.size + array("h").itemsize * (n_snake + n_green + n_orange + n_red)
+                    + 2 * n_turns + array("I").itemsize * n_rng)
+        if len(blob) != expected:
+            raise ValueError(f"snapshot length {len(blob)} != {expected}")
+
+        offset = _SNAPSHOT_HEADER.size
+
+        def take(typecode: str, count: int) -> array:
+            nonlocal offset
+            part = array(typecode)
+            end = offset + count * part.itemsize
+            part.frombytes(blob[offset:end])
+            offset = end
+            if sys.byteorder == "big":
+                part.byteswap()
+            return part
+
+        snake = take("h", n_snake)
+        green, orange, red = take("h", n_green), take("h", n_orange), take("h", n_red)
+        turns = take("b", 2 * n_turns)
+        rng_state = take("I", n_rng)
+
+        g = GRID_SIZE
+        self.snake = SnakeBody.from_indices(g, snake)
+        self.green_beans = {(i % g, i // g) for i in green}
+        self.orange_beans = {(i % g, i // g) for i in orange}
+        self.red_beans = {(i % g, i // g) for i in red}
+        # 按键时刻不进快照：恢复后的转向按“刚刚按下”计延迟
+        now = time.perf_counter()
+        self.turn_queue = deque(((turns[i], turns[i + 1]), now) for i in range(0, len(turns), 2))
+        self._turns_awaiting_frame = []
+        self.rng.setstate((3, tuple(rng_state), gauss if has_gauss else None))
+
+        self.direction = (dx, dy)
+        self.score = score
+        self.high_score = high_score
+        self.grow_pending = grow_pending
+        self.dropped_steps = dropped_steps
+        self.move_interval = move_interval
+        self.move_timer = move_timer
+        self.spawn_timer = spawn_timer
+        self.dead = bool(flags & 1)
+        self.restart_requested = bool(flags & 2)
+        self.exit_to_menu = bool(flags & 4)
+        self.easter_triggered = bool(flags & 8)
+        self.death_cause = _DEATH_CAUSES[(flags >> 4) & 3]
+        self._prev_head = (prev_head % g, prev_head // g)
+        self._prev_tail = (prev_tail % g, prev_tail // g)
+
+    def clone(self) -> SnakeGame:
+        """分叉出一个独立对局：直接复制状态，共享字体/后端等只读资源"""
+        other = copy.copy(self)
+        other.rng = random.Random()
+        other.rng.setstate(self.rng.getstate())
+        other.snake = self.snake.copy()
+        other.green_beans = self.green_beans.copy()
+        other.orange_beans = self.orange_beans.copy()
+        other.red_beans = self.red_beans.copy()
+        other.turn_queue = self.turn_queue.copy()
+        other._turns_awaiting_frame = []
+        other.input_latency_ms = deque(maxlen=LATENCY_SAMPLES)
+        other._overlay_cache = {}
+        other.autopilot = None  # 自动驾驶跟踪的是原对局的蛇身，不随克隆共享
+        other.journal = None
+        other.input_log = None
+        return other
 
     # ====== 每帧更新 ======
     def update(self, dt: float) -> None:
         if self.dead:
             return
 
-        # 网格移动
+        # 固定步长：每个 tick 推进一步并累计生成计时；单帧最多追赶 MAX_CATCHUP_STEPS 步，
+        # 更长的卡顿（拖拽窗口、慢帧）直接丢弃积压，避免越追越慢
         self.move_timer += dt
+        steps = 0
         while self.move_timer >= self.move_interval:
+            if steps >= MAX_CATCHUP_STEPS:
+                dropped = int(self.move_timer // self.move_interval)
+                self.dropped_steps += dropped
+                self.move_timer -= dropped * self.move_interval
+                break
             self.move_timer -= self.move_interval
-            self._advance_one_step()
-            self.direction_locked = False
+            self._tick()
+            if self.journal is not None:
+                self.journal.append((EV_TICK,))
+            steps += 1
             if self.dead:
                 return
 
-        # 定时生成豆子批次（与是否吃豆无关）
-        if not self.easter_triggered:
-            self.spawn_timer += dt
-            while self.spawn_timer >= SPAWN_BATCH_INTERVAL:
-                self.spawn_timer -= SPAWN_BATCH_INTERVAL
-                self._spawn_batch()
-
         # 彩蛋检测：分数≥1048 且 场上无红豆且橙豆≤256
         if (not self.easter_triggered
                 and self.score >= 1024
@@ -222,12 +435,47 @@ class SnakeGame:
                 and len(self.orange_beans) <= 256):
             self.easter_triggered = True
 
+    def _tick(self) -> None:
+        # 记录上一 tick 的首尾，供渲染插值
+        if self.snake:
+            self._prev_head = self.snake[0]
+            self._prev_tail = self.snake[-1]
+        if self.autopilot is not None and not self.turn_queue and not self.easter_triggered:
+            self.direction = self.autopilot.choose(self)
+        self._advance_one_step()
+        if self.dead:
+            return
+
+        # 定时生成豆子批次（与是否吃豆无关）；按 tick 计时，生成节奏与渲染帧率无关
+        if not self.easter_triggered:
+            self.spawn_timer += self.move_interval
+            while self.spawn_timer >= SPAWN_BATCH_INTERVAL:
+                self.spawn_timer -= SPAWN_BATCH_INTERVAL
+                self._spawn_batch()
+
+    def set_move_fps(self, fps: float) -> None:
+        """运行时调整移动频率：保留当前 tick 内的相位，渲染帧率不受影响"""
+        phase = self.move_timer / self.move_interval
+        self.move_interval = 1.0 / max(1e-3, fps)
+        self.move_timer = phase * self.move_interval
+
+    @property
+    def render_alpha(self) -> float:
+        """当前帧位于两个 tick 之间的比例 [0, 1]；结束状态直接显示最终画面"""
+        if self.dead or self.easter_triggered:
+            return 1.0
+        return min(1.0, self.move_timer / self.move_interval)
+
     # ====== 单步推进 ======
     def _advance_one_step(self) -> None:
         if self.easter_triggered:
             return  # 彩蛋后如需继续移动，移除此 return
 
-        self.direction = self.pending_direction
+        if self.turn_queue:
+            self.direction, pressed_at = self.turn_queue.popleft()
+            self._turns_awaiting_frame.append(pressed_at)
+        if self.input_log is not None:
+            self.input_log.append(_INPUT_CODES[self.direction])
         hx, hy = self.snake[0]
         dx, dy = self.direction
         new_head = (hx + dx, hy + dy)
@@ -235,48 +483,50 @@ class SnakeGame:
         # 撞墙/撞自己
         if not (0 <= new_head[0] < GRID_SIZE and 0 <= new_head[1] < GRID_SIZE):
             self.dead = True
+            self.death_cause = "wall"
             return
         tail = self.snake[-1]
-        if new_head in self.snake_set and new_head != tail:
+        if new_head in self.snake and new_head != tail:
             self.dead = True
+            self.death_cause = "self"
             return
 
         # 放置新头
-        self.snake.appendleft(new_head)
-        self.snake_set.add(new_head)
+        self.snake.push_head(new_head)
+        journal = self.journal
+        if journal is not None:
+            journal.append((EV_HEAD, new_head[1] * GRID_SIZE + new_head[0]))
 
         extra_removals = 0
 
         # 吃豆
+        eaten = 0
         if new_head in self.green_beans:
             self.green_beans.remove(new_head)
             self.grow_pending += 2
+            eaten = BEAN_GREEN
         elif new_head in self.orange_beans:
             self.orange_beans.remove(new_head)
             extra_removals += 1  # 净 -1
+            eaten = BEAN_ORANGE
         elif new_head in self.red_beans:
             self.red_beans.remove(new_head)
             extra_removals += 5  # 净 -5
-
-        # 基础步进：优先消耗生长储备，否则移除尾巴；缩短类豆子仍然强制额外移除
-        if self.grow_pending > 0:
-            self.grow_pending -= 1
-        else:
-            removed = self.snake.pop()
-            self.snake_set.remove(removed)
-        while extra_removals > 0:
-            if self.grow_pending > 0:
-                self.grow_pending -= 1
-            else:
-                if len(self.snake) == 0:
-                    self.dead = True
-                    return
-                removed_extra = self.snake.pop()
-                self.snake_set.remove(removed_extra)
-                if len(self.snake) == 0:
-                    self.dead = True
-                    return
-            extra_removals -= 1
+            eaten = BEAN_RED
+        if eaten and journal is not None:
+            journal.append((EV_EAT, eaten))
+
+        # 基础步进 + 缩短类豆子的额外移除：优先消耗生长储备，其余一次性从尾部移除
+        removals = 1 + extra_removals
+        absorbed = min(self.grow_pending, removals)
+        self.grow_pending -= absorbed
+        popped = self.snake.pop_tail(removals - absorbed)
+        if popped and journal is not None:
+            journal.append((EV_POP, popped))
+        if len(self.snake) == 0:
+            self.dead = True
+            self.death_cause = "shrink"
+            return
 
         # 分数 = 长度
         self.score = len(self.snake)
@@ -311,6 +561,9 @@ class SnakeGame:
                 self.green_beans.add(cell)
             else:
                 self.orange_beans.add(cell)
+            if self.journal is not None:
+                self.journal.append((EV_SPAWN, BEAN_GREEN if kind == "green" else BEAN_ORANGE,
+                                     cell[1] * GRID_SIZE + cell[0]))
 
     def _seed_initial_beans(self) -> None:
         # 初始铺一些，但不超过当期上限的 60%
@@ -342,16 +595,19 @@ class SnakeGame:
 
     def _random_free_cell(self) -> Vec2 | None:
         tries = 0
-        occupied = self.snake_set | self.green_beans | self.orange_beans | self.red_beans
         while tries < 500:
             cell = (self.rng.randrange(GRID_SIZE), self.rng.randrange(GRID_SIZE))
-            if cell not in occupied:
+            if (cell not in self.snake and cell not in self.green_beans
+                    and cell not in self.orange_beans and cell not in self.red_beans):
                 return cell
             tries += 1
         return None
 
     # ====== 渲染 ======
     def _compute_board_dest(self, sw: int, sh: int):
+        cached = self._board_dest_cache
+        if cached is not None and cached[0] == (sw, sh):
+            return cached[1]
         available_height = max(1, sh - HUD_RESERVED_HEIGHT - BOARD_BOTTOM_MARGIN)
         scale_float = min(sw / BOARD_PIXELS, available_height / BOARD_PIXELS)
         if scale_float <= 0:
@@ -369,79 +625,132 @@ class SnakeGame:
         top_space = HUD_RESERVED_HEIGHT
         vertical_space = max(0, available_height - dest_size[1])
         dest_rect.top = top_space + vertical_space // 2
-        return dest_rect, scale_used, use_integer_scale, dest_size
-
-    def render(self, screen: pg.Surface, code_wall: CodeWall | None = None) -> tuple[pg.Rect, float]:
-        screen.fill(BG_DARK)
-        self.board_surface.fill(BOARD_BG)
-        self.entities_surface.fill((0, 0, 0, 0))
-
-        # 画豆子 & 蛇
-        self._draw_beans(self.entities_surface)
-        self._draw_snake(self.entities_surface)
+        result = (dest_rect, scale_used, use_integer_scale, dest_size)
+        self._board_dest_cache = ((sw, sh), result)
+        return result
 
+    def render(self, screen: pg.Surface, code_wall: CodeWall | None = None,
+               presenter: Presenter | None = None) -> tuple[pg.Rect, float]:
         # 计算棋盘贴图位置&缩放
         sw, sh = screen.get_size()
         dest_rect, scale_used, use_integer_scale, dest_size = self._compute_board_dest(sw, sh)
 
-        # 缩放并贴到屏幕
-        if use_integer_scale:
-            if int(scale_used) == 1:
-                board_to_blit = self.board_surface
-                entities_to_blit = self.entities_surface
-            else:
-                board_to_blit = pg.transform.scale(self.board_surface, dest_size)
-                entities_to_blit = pg.transform.scale(self.entities_surface, dest_size)
-        else:
-            board_to_blit = (self.board_surface if self.board_surface.get_size() == dest_size
-                             else pg.transform.smoothscale(self.board_surface, dest_size))
-            entities_to_blit = (self.entities_surface if self.entities_surface.get_size() == dest_size
-                                else pg.transform.smoothscale(self.entities_surface, dest_size))
-        screen.blit(board_to_blit, dest_rect)
-
         # 代码雨：整盘视为激活（棋盘内会淡化）
         if code_wall is not None:
             sub_side = GRID_SIZE // 16  # 以 16x16 cell 为一子块
-            all_active = set(range(max(1, sub_side * sub_side)))
-            code_wall.draw(
-                screen,
+            wall_args = dict(
                 board_rect=dest_rect,
                 board_scale=scale_used,
                 cell_pixels=CELL,
                 subgrid_cells=16,
-                active_subgrids=all_active,
+                active_subgrids=(1 << max(1, sub_side * sub_side)) - 1,  # 位掩码
                 grid_cells=GRID_SIZE,
                 subgrid_cols=max(1, sub_side),
                 hide_margin_px=CELL // 2,
             )
+        # 离屏层模式：字形全部落在棋盘外，层（含底色）可以先于棋盘整块贴上
+        layered = code_wall is not None and code_wall.layer_hz > 0
+        if layered:
+            with memtrace.stage("codewall.draw"):
+                wall_rects = code_wall.draw_layer(screen, BG_DARK, **wall_args)
+        else:
+            screen.fill(BG_DARK)
+
+        # 棋盘底色 + 实体交给渲染后端（surface / sdl2）
+        self.backend.begin_board(screen, self, dest_rect, use_integer_scale, dest_size)
+
+        if code_wall is not None and not layered:
+            with memtrace.stage("codewall.draw"):
+                wall_rects = code_wall.draw(screen, **wall_args)
 
         # 让实体在最前
-        screen.blit(entities_to_blit, dest_rect)
+        self.backend.finish_board(screen)
 
         # HUD / 覆盖层
-        self._draw_hud(screen, dest_rect)
+        hud_rect = self._draw_hud(screen, dest_rect)
         if self.dead:
             self._draw_death_overlay(screen)
         if self.easter_triggered:
             self._draw_easter_overlay(screen)
+
+        # 脏矩形：棋盘、HUD、代码雨；覆盖层出现/消失时整屏提交
+        if presenter is not None:
+            presenter.mark(dest_rect, hud_rect)
+            if code_wall is not None:
+                presenter.mark_many(wall_rects)
+            overlay_state = (self.dead, self.easter_triggered)
+            if overlay_state != self._presented_overlay:
+                self._presented_overlay = overlay_state
+                presenter.mark_full()
         return dest_rect, scale_used
 
-    # --- 画豆子 ---
-    def _draw_beans(self, surface: pg.Surface) -> None:
-        for pos in self.green_beans:
-            self._draw_round_item(surface, pos, GREEN_BEAN_FILL, GREEN_BEAN_OUTLINE, GREEN_BEAN_HL, GREEN_BEAN_SHADOW)
-        for pos in self.orange_beans:
-            self._draw_round_item(surface, pos, ORANGE_BEAN_FILL, ORANGE_BEAN_OUTLINE, ORANGE_BEAN_HL, ORANGE_BEAN_SHADOW)
-        for pos in self.red_beans:
-            self._draw_round_item(surface, pos, RED_BEAN_FILL, RED_BEAN_OUTLINE, RED_BEAN_HL, RED_BEAN_SHADOW)
-
-    def _draw_round_item(
-        self, surface: pg.Surface, cell: Vec2,
+    # --- 精灵：每种豆子/蛇身只画一次，之后按格子位置批量贴图 ---
+    board_pixels = BOARD_PIXELS
+    board_color = BOARD_BG
+    cell_pixels = CELL
+
+    def apply_quality(self, settings: dict) -> None:
+        """读取画质档位（quality.LEVELS 的一项）"""
+        self.bean_detail = settings["bean_detail"]
+        self.smooth_scaling = settings["smoothscale"]
+
+    @property
+    def sprites(self) -> dict[str, pg.Surface]:
+        sprites = _SPRITES.get(self.bean_detail)
+        if sprites is None:
+            if self.bean_detail:
+                sprites = {
+                    "green": self._make_round_item(GREEN_BEAN_FILL, GREEN_BEAN_OUTLINE, GREEN_BEAN_HL, GREEN_BEAN_SHADOW),
+                    "orange": self._make_round_item(ORANGE_BEAN_FILL, ORANGE_BEAN_OUTLINE, ORANGE_BEAN_HL, ORANGE_BEAN_SHADOW),
+                    "red": self._make_round_item(RED_BEAN_FILL, RED_BEAN_OUTLINE, RED_BEAN_HL, RED_BEAN_SHADOW),
+                }
+            else:
+                sprites = {
+                    "green": self._make_flat_item(GREEN_BEAN_FILL),
+                    "orange": self._make_flat_item(ORANGE_BEAN_FILL),
+                    "red": self._make_flat_item(RED_BEAN_FILL),
+                }
+            # 蛇身精灵与豆子细节无关：两个档位共用同一组 Surface
+            other = _SPRITES.get(not self.bean_detail)
+            if other is not None:
+                sprites["head"], sprites["body"] = other["head"], other["body"]
+            else:
+                sprites["head"] = self._make_snake_segment(fill_color=SNAKE_HEAD_COLOR, is_head=True)
+                sprites["body"] = self._make_snake_segment(fill_color=SNAKE_BODY_COLOR, is_head=False)
+            _SPRITES[self.bean_detail] = sprites
+        return sprites
+
+    def entity_blits(self) -> list[tuple[str, tuple[int, int]]]:
+        """按绘制顺序返回 (精灵名, 棋盘像素坐标)：豆子 -> 蛇头 -> 蛇身。
+        蛇头与蛇尾在上一 tick 与当前 tick 之间按 render_alpha 插值。"""
+        blits = [("green", (x * CELL, y * CELL)) for x, y in self.green_beans]
+        blits += [("orange", (x * CELL, y * CELL)) for x, y in self.orange_beans]
+        blits += [("red", (x * CELL, y * CELL)) for x, y in self.red_beans]
+        if self.snake:
+            alpha = self.render_alpha
+            cells = self.snake.indices().astype(np.int32)
+            xs = ((cells % GRID_SIZE) * CELL).tolist()
+            ys = ((cells // GRID_SIZE) * CELL).tolist()
+            hx, hy = xs[0] / CELL, ys[0] / CELL
+            px, py = self._prev_head
+            blits.append(("head", (round((px + (hx - px) * alpha) * CELL),
+                                   round((py + (hy - py) * alpha) * CELL))))
+            blits += [("body", pos) for pos in zip(xs[1:], ys[1:])]
+            # 尾巴刚离开的格子：相邻时画一个滑向新尾巴的身体段
+            tx, ty = self.snake[-1]
+            px, py = self._prev_tail
+            if abs(tx - px) + abs(ty - py) == 1 and alpha < 1.0:
+                blits.append(("body", (round((px + (tx - px) * alpha) * CELL),
+                                       round((py + (ty - py) * alpha) * CELL))))
+        return blits
+
+    @staticmethod
+    def _make_round_item(
         fill_color: Tuple[int, int, int],
         outline_color: Tuple[int, int, int],
         hl_color: Tuple[int, int, int, int],
         shadow_color: Tuple[int, int, int, int],
-    ) -> None:
+    ) -> pg.Surface:
         item = pg.Surface((CELL, CELL), pg.SRCALPHA)
         center = (CELL // 2, CELL // 2)
         base_r = max(4, CELL // 2 - 2)
@@ -460,19 +769,19 @@ class SnakeGame:
         hl_r = max(2, base_r // 3)
         pg.draw.circle(item, hl_color, hl_center, hl_r)
 
-        surface.blit(item, (cell[0] * CELL, cell[1] * CELL))
+        return item
 
-    # --- 画蛇 ---
-    def _draw_snake(self, surface: pg.Surface) -> None:
-        if not self.snake:
-            return
-        segments = list(self.snake)
-        head_cell = segments[0]
-        self._draw_snake_segment(surface, head_cell, fill_color=SNAKE_HEAD_COLOR, is_head=True)
-        for segment in segments[1:]:
-            self._draw_snake_segment(surface, segment, fill_color=SNAKE_BODY_COLOR, is_head=False)
+    @staticmethod
+    def _make_flat_item(fill_color: Tuple[int, int, int]) -> pg.Surface:
+        # 低画质：不透明纯色方块（留 1px 棋盘底色做间隔），贴图走最快路径
+        item = pg.Surface((CELL, CELL))
+        item.fill(BOARD_BG)
+        item.fill(fill_color, item.get_rect().inflate(-2, -2))
+        return item
 
-    def _draw_snake_segment(self, surface: pg.Surface, cell: Vec2, *, fill_color: Tuple[int, int, int], is_head: bool) -> None:
+    # --- 画蛇 ---
+    @staticmethod
+    def _make_snake_segment(*, fill_color: Tuple[int, int, int], is_head: bool) -> pg.Surface:
         seg_surf = pg.Surface((CELL, CELL), pg.SRCALPHA)
 
         padding = max(1, CELL // 10)
@@ -529,9 +838,21 @@ class SnakeGame:
             pg.draw.rect(seg_surf, eye_color, left_eye)
             pg.draw.rect(seg_surf, eye_color, right_eye)
 
-        surface.blit(seg_surf, (cell[0] * CELL, cell[1] * CELL))
+        return seg_surf
 
     # --- HUD & 覆盖层 ---
+    @property
+    def font_hud(self) -> pg.font.Font:
+        return _font(20)
+
+    @property
+    def font_small(self) -> pg.font.Font:
+        return _font(18)
+
+    @property
+    def font_large(self) -> pg.font.Font:
+        return _font(48)
+
     def _phase_name(self, score: int) -> str:
         if score < 300:
             return "EARLY"
@@ -542,84 +863,169 @@ class SnakeGame:
         else:
             return "SPRINT"
 
-    def _draw_hud(self, screen: pg.Surface, board_rect: pg.Rect) -> None:
+    def _draw_hud(self, screen: pg.Surface, board_rect: pg.Rect) -> pg.Rect:
         phase = self._phase_name(self.score)
         info = (f"Score: {self.score}   High: {self.high_score}   Phase: {phase}   "
                 f"Beans G/O/R: {len(self.green_beans)}/{len(self.orange_beans)}/{len(self.red_beans)}")
+        if self.autopilot is not None:
+            info += "   [AUTO]"
         info_surf = self.font_hud.render(info, True, HUD_TEXT_COLOR)
         info_y = HUD_TOP_MARGIN
         if board_rect.top - info_surf.get_height() - 12 > HUD_TOP_MARGIN:
             info_y = board_rect.top - info_surf.get_height() - 12
-        screen.blit(info_surf, (20, info_y))
+        return screen.blit(info_surf, (20, info_y))
+
+    def _overlay_surface(self, kind: str, size: tuple[int, int]) -> pg.Surface:
+        """覆盖层（半透明底 + 文字）按 (类型, 尺寸, 分数) 合成一次并缓存"""
+        key = (kind, size, self.score)
+        cached = self._overlay_cache.get(kind)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        overlay = pg.Surface(size, pg.SRCALPHA)
+        cx = size[0] // 2
+        cy = size[1] // 2
+        if kind == "death":
+            overlay.fill((0, 0, 0, 160))
+            title = self.font_large.render("GAME OVER", True, RED_BEAN_FILL)
+            score_text = self.font_hud.render(f"Final Score: {self.score}", True, HUD_TEXT_COLOR)
+            prompt = self.font_small.render("R — Restart    ESC — Menu", True, HUD_TEXT_COLOR)
+            overlay.blit(title, (cx - title.get_width() // 2, cy - 70))
+            overlay.blit(score_text, (cx - score_text.get_width() // 2, cy - 20))
+            overlay.blit(prompt, (cx - prompt.get_width() // 2, cy + 30))
+        else:
+            overlay.fill(EASTER_BACK)
+            title = self.font_large.render("PERFECT 1024", True, EASTER_TEXT)
+            line1 = self.font_hud.render("# system stable — zero errors, minimal warnings.", True, EASTER_TEXT)
+            line2 = self.font_hud.render("# mission complete — the grid bows to your logic.", True, EASTER_TEXT)
+            line3 = self.font_hud.render("# may every line you write light up the dark.", True, EASTER_TEXT)
+            prompt = self.font_small.render("R — Restart    ESC — Menu", True, HUD_TEXT_COLOR)
+            overlay.blit(title, (cx - title.get_width() // 2, cy - 90))
+            overlay.blit(line1, (cx - line1.get_width() // 2, cy - 30))
+            overlay.blit(line2, (cx - line2.get_width() // 2, cy + 6))
+            overlay.blit(line3, (cx - line3.get_width() // 2, cy + 42))
+            overlay.blit(prompt, (cx - prompt.get_width() // 2, cy + 96))
+        self._overlay_cache[kind] = (key, overlay)
+        return overlay
 
     def _draw_death_overlay(self, screen: pg.Surface) -> None:
-        overlay = pg.Surface(screen.get_size(), pg.SRCALPHA)
-        overlay.fill((0, 0, 0, 160))
-        screen.blit(overlay, (0, 0))
-        cx = screen.get_width() // 2
-        cy = screen.get_height() // 2
-        title = self.font_large.render("GAME OVER", True, RED_BEAN_FILL)
-        score_text = self.font_hud.render(f"Final Score: {self.score}", True, HUD_TEXT_COLOR)
-        prompt = self.font_small.render("R — Restart    ESC — Menu", True, HUD_TEXT_COLOR)
-        screen.blit(title, (cx - title.get_width() // 2, cy - 70))
-        screen.blit(score_text, (cx - score_text.get_width() // 2, cy - 20))
-        screen.blit(prompt, (cx - prompt.get_width() // 2, cy + 30))
+        screen = self.backend.overlay_layer(screen)
+        screen.blit(self._overlay_surface("death", screen.get_size()), (0, 0))
 
     def _draw_easter_overlay(self, screen: pg.Surface) -> None:
-        overlay = pg.Surface(screen.get_size(), pg.SRCALPHA)
-        overlay.fill(EASTER_BACK)
-        screen.blit(overlay, (0, 0))
-
-        cx = screen.get_width() // 2
-        cy = screen.get_height() // 2
+        screen = self.backend.overlay_layer(screen)
+        screen.blit(self._overlay_surface("easter", screen.get_size()), (0, 0))
 
-        title = self.font_large.render("PERFECT 1024", True, EASTER_TEXT)
-        line1 = self.font_hud.render("# system stable — zero errors, minimal warnings.", True, EASTER_TEXT)
-        line2 = self.font_hud.render("# mission complete — the grid bows to your logic.", True, EASTER_TEXT)
-        line3 = self.font_hud.render("# may every line you write light up the dark.", True, EASTER_TEXT)
-        prompt = self.font_small.render("R — Restart    ESC — Menu", True, HUD_TEXT_COLOR)
-
-        screen.blit(title, (cx - title.get_width() // 2, cy - 90))
-        screen.blit(line1, (cx - line1.get_width() // 2, cy - 30))
-        screen.blit(line2, (cx - line2.get_width() // 2, cy + 6))
-        screen.blit(line3, (cx - line3.get_width() // 2, cy + 42))
-        screen.blit(prompt, (cx - prompt.get_width() // 2, cy + 96))
+    # --- 尺寸变化：统一失效点 ---
+    def on_resize(self, size: tuple[int, int]) -> None:
+        self._board_dest_cache = None
+        self._overlay_cache.clear()
+        self._compute_board_dest(*size)
 
 # ---------- 主循环 ----------
 def game_loop(code_wall) -> str:
-    clock = pg.time.Clock()
-    game = SnakeGame()
+    scheduler = FrameScheduler(pg.time.Clock(), active_fps=RENDER_FPS, idle_fps=IDLE_RENDER_FPS)
+    presenter = Presenter()
+    tracker = memtrace.active()
+    governor = quality.active()
+    recorder = None
+    if os.environ.get(REPLAY_ENV, "") not in ("", "0"):
+        import replay
+        recorder = replay.from_env()
+    game = SnakeGame(rng_seed=recorder.seed if recorder is not None else None)
+    if recorder is not None:
+        recorder.attach(game)
+    backend = game.backend
+    if os.environ.get(AUTOPILOT_ENV, "") not in ("", "0"):
+        from autopilot import Autopilot
+        game.autopilot = Autopilot()
+    spectator = None
+    if os.environ.get(SPECTATE_ENV, "") not in ("", "0"):
+        import spectate
+        spectator = spectate.from_env(game)
+
+    def finish(result: str) -> str:
+        # 离开游戏页：收尾录像/观战流文件
+        if recorder is not None:
+            recorder.close()
+        if spectator is not None:
+            spectator.close()
+        return result
+
+    # 尺寸相关缓存统一从这里失效：棋盘缩放/覆盖层、代码雨布局、整屏提交
+    resize_hub = ResizeHub()
+    resize_hub.subscribe(game.on_resize)
+    if code_wall is not None:
+        resize_hub.subscribe(lambda size: code_wall.resize(size, HUD_RESERVED_HEIGHT))
+    resize_hub.subscribe(lambda size: presenter.mark_full())
 
     while True:
-        dt_ms = clock.tick(RENDER_FPS)
+        # 结算页只剩代码雨在动：降帧率；没有代码雨则画面完全静止
+        if game.dead or game.easter_triggered:
+            mode = ANIMATED if code_wall is not None else STATIC
+        else:
+            mode = ACTIVE
+        events, dt_ms = scheduler.next_events(mode)
+        work_started = time.perf_counter()
         dt = dt_ms / 1000.0
-        screen = pg.display.get_surface()
+        screen = backend.get_surface()
         if screen is None:
             continue
 
-        for event in pg.event.get():
+        # 同一帧内的多个 VIDEORESIZE 只应用最后一个
+        events, new_size = resize_hub.coalesce(events)
+        if new_size is not None:
+            with tracker.stage("resize"):
+                screen = resize_hub.apply(new_size)
+
+        for event in events:
             if event.type == pg.QUIT:
-                return "QUIT"
-            if event.type == pg.VIDEORESIZE:
-                screen = pg.display.set_mode((event.w, event.h), pg.RESIZABLE)
+                return finish("QUIT")
+            if event.type == pg.WINDOWEXPOSED:
+                presenter.mark_full()
+            elif event.type == pg.KEYDOWN and event.key == AUTOPILOT_KEY:
+                from autopilot import Autopilot
+                game.autopilot = None if game.autopilot is not None else Autopilot()
             elif event.type == pg.KEYDOWN:
                 game.handle_keydown(event.key)
 
-        game.update(dt)
-
-        # 代码雨：根据分数调整强度，并推进（advance 接受毫秒）
-        if code_wall is not None:
-            code_wall.set_score(game.score)
-            code_wall.advance(dt_ms, screen=screen, hud_height=HUD_RESERVED_HEIGHT)
-
-        # 渲染：棋盘 -> 代码雨 -> 实体
-        game.render(screen, code_wall=code_wall)
-
-        pg.display.flip()
-
         if game.dead or game.easter_triggered:
             if game.restart_requested:
                 game.reset()
                 continue
             if game.exit_to_menu:
-                return "MENU"
+                return finish("MENU")
+
+        # 失焦/最小化：暂停模拟与渲染
+        if scheduler.paused:
+            continue
+
+        with tracker.stage("game.update"):
+            game.update(dt)
+        if spectator is not None:
+            spectator.flush()
+
+        # 画质档位：由上一帧的耗时决定，本帧生效
+        settings = governor.settings
+        game.apply_quality(settings)
+        if code_wall is not None:
+            code_wall.set_quality(settings["codewall_density"], settings["codewall_alpha"])
+
+        # 代码雨：根据分数调整强度，并推进（advance 接受毫秒）
+        if code_wall is not None:
+            with tracker.stage("codewall.advance"):
+                code_wall.set_score(game.score)
+                code_wall.advance(dt_ms, screen=screen, hud_height=HUD_RESERVED_HEIGHT)
+
+        # 渲染：棋盘 -> 代码雨 -> 实体
+        with tracker.stage("game.render"):
+            game.render(screen, code_wall=code_wall, presenter=presenter)
+        overlay_rect = tracker.draw_overlay(screen)
+        if overlay_rect is not None:
+            presenter.mark(overlay_rect)
+
+        with tracker.stage("present"):
+            presenter.present()
+        game.mark_frame_presented()
+        governor.observe((time.perf_counter() - work_started) * 1000.0)
+        tracker.end_frame(quality=governor.level_name)
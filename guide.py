@@ -1,6 +1,11 @@
 # guide.py
 import pygame as pg
 
+import render_backend
+from present import Presenter
+from resize import ResizeHub
+from scheduler import STATIC, FrameScheduler
+
 
 GUIDE_LINES = [
     "- Use Arrow keys or WASD to steer.",
@@ -19,8 +24,11 @@ def guide_loop(screen: pg.Surface, clock: pg.time.Clock) -> str:
     font_tip = pg.font.SysFont("Consolas, Menlo, Monospace", 20)
 
     width, height = screen.get_size()
+    presenter = Presenter()
 
     def draw():
+        # 尺寸变化时由 ResizeHub 回调，此时直接取后端的新画布
+        screen = render_backend.active().get_surface()
         width_local, height_local = screen.get_size()
         screen.fill((16, 18, 24))
 
@@ -50,19 +58,28 @@ def guide_loop(screen: pg.Surface, clock: pg.time.Clock) -> str:
         footer = font_tip.render("ENTER / SPACE — Continue     ESC — Back to Menu", True, (150, 200, 190))
         screen.blit(footer, (width_local // 2 - footer.get_width() // 2, panel_rect.bottom + 24))
 
-        pg.display.flip()
+        # 指南页只在整页重绘时提交
+        presenter.mark_full()
+        presenter.present()
 
+    # 指南页只在尺寸变化/重新曝光时重绘：阻塞等待事件即可
+    scheduler = FrameScheduler(clock)
+    resize_hub = ResizeHub()
+    resize_hub.subscribe(lambda size: draw())
     draw()
     while True:
-        for event in pg.event.get():
+        events, _ = scheduler.next_events(STATIC)
+        # 拖拽窗口时只按最后一个尺寸重绘一次
+        events, new_size = resize_hub.coalesce(events)
+        if new_size is not None:
+            resize_hub.apply(new_size)
+        for event in events:
             if event.type == pg.QUIT:
                 return "QUIT"
-            if event.type == pg.VIDEORESIZE:
-                screen = pg.display.set_mode((event.w, event.h), pg.RESIZABLE)
+            if event.type == pg.WINDOWEXPOSED:
                 draw()
             if event.type == pg.KEYDOWN:
                 if event.key in (pg.K_RETURN, pg.K_SPACE):
                     return "PLAY"
                 if event.key == pg.K_ESCAPE:
                     return "MENU"
-        clock.tick(60)
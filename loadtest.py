@@ -0,0 +1,124 @@
+# loadtest.py
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import struct
+import time
+
+from server import (DEFAULT_PORT, MSG_BYE, MSG_NEW, MSG_STATE, MSG_TICK, MSG_TURN,
+                    GameServer, decode_tick, encode_frame, read_frame)
+
+# ---------------- 对局服务器压测客户端 ----------------
+# 开 N 个连接，各自新建一局并随机转向，死亡后立即重开；统计：
+# 每秒收到的更新数、相邻更新间隔（tick 抖动）、转向 -> 下一条更新的延迟、下行字节数。
+#
+#   python loadtest.py --sessions 500 --duration 20            # 连接已启动的 server.py
+#   python loadtest.py --sessions 300 --spawn                  # 同进程内启动服务器（会与客户端争 CPU）
+
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+class Stats:
+    def __init__(self):
+        self.updates = 0
+        self.bytes = 0
+        self.games = 0
+        self.intervals: list[float] = []
+        self.turn_latency: list[float] = []
+
+
+async def run_client(index: int, stats: Stats, deadline: float, turn_rate: float,
+                     host: str, port: int, unix_path: str | None) -> None:
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(index)
+    writer.write(encode_frame(MSG_NEW, struct.pack("<q", index)))
+    last_update = None
+    turn_sent = None
+    try:
+        while time.perf_counter() < deadline:
+            msg_type, payload = await read_frame(reader)
+            now = time.perf_counter()
+            stats.bytes += len(payload) + 5
+            if msg_type == MSG_STATE:
+                stats.games += 1
+                last_update = None
+                continue
+            if msg_type != MSG_TICK:
+                continue
+            stats.updates += 1
+            if last_update is not None:
+                stats.intervals.append(now - last_update)
+            last_update = now
+            if turn_sent is not None:
+                stats.turn_latency.append(now - turn_sent)
+                turn_sent = None
+
+            update = decode_tick(payload)
+            if update["dead"] or update["easter"]:
+                writer.write(encode_frame(MSG_NEW, struct.pack("<q", rng.getrandbits(31))))
+            elif rng.random() < turn_rate:
+                writer.write(encode_frame(MSG_TURN, struct.pack("<bb", *rng.choice(DIRECTIONS))))
+                turn_sent = now
+        writer.write(encode_frame(MSG_BYE))
+        await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def main_async(args) -> None:
+    server_task = None
+    if args.spawn:
+        server = GameServer(verbose=False)
+        server_task = asyncio.create_task(server.serve(args.host, args.port, args.unix))
+        await asyncio.sleep(0.2)
+
+    stats = Stats()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    clients = [
+        run_client(i, stats, deadline, args.turn_rate, args.host, args.port, args.unix)
+        for i in range(args.sessions)
+    ]
+    await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - started
+
+    ms = 1000.0
+    print(f"sessions {args.sessions}  games {stats.games}  {elapsed:.1f}s")
+    print(f"updates  {stats.updates / elapsed:9.1f}/s  ({stats.updates / elapsed / max(1, args.sessions):.2f}/s per session)")
+    print(f"downlink {stats.bytes / elapsed / 1024:9.1f} KiB/s  ({stats.bytes / max(1, stats.updates):.1f} B/update)")
+    print(f"interval p50 {_pct(stats.intervals, 0.5) * ms:7.2f}ms  p99 {_pct(stats.intervals, 0.99) * ms:7.2f}ms  "
+          f"max {_pct(stats.intervals, 1.0) * ms:7.2f}ms")
+    print(f"turn->update p50 {_pct(stats.turn_latency, 0.5) * ms:7.2f}ms  "
+          f"p99 {_pct(stats.turn_latency, 0.99) * ms:7.2f}ms")
+    if server_task is not None:
+        server_task.cancel()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="VibeSnake 对局服务器压测")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15.0, help="秒")
+    parser.add_argument("--turn-rate", type=float, default=0.2, help="每条更新后发送转向的概率")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="改用 Unix socket（路径）")
+    parser.add_argument("--spawn", action="store_true", help="在同一进程内启动服务器")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
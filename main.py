@@ -1,23 +1,69 @@
-import pygame as pg
+import startup  # 最先导入：以此为启动计时起点
 
-from codewall import CodeWall
-from game import game_loop
-from guide import guide_loop
-from menu import menu_loop
+import importlib
+
+# 首帧用不到 pygame 顺带导入的 NumPy / pkg_resources（见 startup.py）
+with startup.blocked_imports("numpy", "pkg_resources"):
+    import pygame as pg
+
+import memtrace
+import render_backend
 
 WINDOW_W, WINDOW_H = int(960 * 1.2), int(720 * 1.2)
 
 
+def _prefetch_modules() -> None:
+    for name in ("guide", "codewall", "game"):
+        importlib.import_module(name)
+
+
+def _load_menu() -> None:
+    # 菜单（数字雨、Shader、蛇路径）依赖 NumPy：与其一起在后台导入
+    startup.load_numpy()
+    importlib.import_module("menu")
+
+
+def _splash(screen: pg.Surface) -> None:
+    """首帧：菜单底色 + 标题（不依赖 NumPy），菜单模块就绪前一直显示"""
+    screen.fill((12, 14, 24))
+    font = pg.font.SysFont("Consolas, Menlo, Monospace", 36)
+    title = font.render("Vibe Coding 1024 — Snake 1024", True, (220, 230, 240))
+    screen.blit(title, (screen.get_width() // 2 - title.get_width() // 2, 30))
+    render_backend.active().present()
+
+
+def _wait_for_menu(job, clock) -> bool:
+    """等后台导入菜单模块；期间关闭窗口则返回 False"""
+    while not job.done():
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                return False
+            if event.type == pg.WINDOWEXPOSED:
+                render_backend.active().present()
+        clock.tick(60)
+    job.result()  # 导入出错时直接暴露
+    return True
+
+
 def main() -> None:
+    memtrace.active()  # 按环境变量启用内存追踪；尽早开始以覆盖启动阶段
     pg.init()
-    pg.display.set_caption("VibeSnake 1024")
-    pg.display.set_mode((WINDOW_W, WINDOW_H), pg.RESIZABLE)
+    render_backend.open_window((WINDOW_W, WINDOW_H), "VibeSnake 1024")
+    startup.mark("window")
     clock = pg.time.Clock()
-    code_wall = CodeWall()
+    # 游戏相关模块在菜单首帧之后由后台线程预先导入；
+    # 代码雨要建字体与字形尺寸表，推迟到第一次进入游戏时在主线程创建
+    startup.after_first_frame(_prefetch_modules)
+    code_wall = None
+
+    menu_job = startup.background(_load_menu)
+    _splash(render_backend.active().get_surface())
+    startup.first_frame()
+    running = _wait_for_menu(menu_job, clock)
 
-    running = True
     while running:
-        screen = pg.display.get_surface()
+        from menu import menu_loop
+        screen = render_backend.active().get_surface()
         if screen is None:
             break
 
@@ -27,6 +73,7 @@ def main() -> None:
             break
 
         if menu_result == "START":
+            from guide import guide_loop
             guide_result = guide_loop(screen, clock)
             if guide_result == "QUIT":
                 running = False
@@ -36,12 +83,17 @@ def main() -> None:
             if guide_result != "PLAY":
                 continue
 
+            from codewall import CodeWall, layer_hz_from_env
+            from game import game_loop
+            if code_wall is None:
+                code_wall = CodeWall(layer_hz=layer_hz_from_env())
             game_result = game_loop(code_wall)
             if game_result == "QUIT":
                 running = False
         else:
             game_result = menu_result
 
+    memtrace.active().close()
     pg.quit()
 
 
@@ -0,0 +1,131 @@
+# matrixrain.py
+from __future__ import annotations
+
+import numpy as np
+import pygame as pg
+
+# ---------------- MatrixRain（菜单数字雨） ----------------
+
+MATRIX_COLORS = [
+    (0, 80, 0),
+    (0, 160, 0),
+    (150, 255, 150),
+]
+
+MATRIX_CHARS = ("0", "1")
+
+
+class MatrixRain:
+    def __init__(
+        self,
+        font: pg.font.Font,
+        colors=MATRIX_COLORS,
+        speed=(90, 160),
+        length=(12, 26),
+        flicker=0.02,
+        seed=None,
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.speed = speed
+        self.length_range = length
+        self.max_length = length[1]
+        self.flicker = flicker
+        self.char_width, self.char_height = font.size("0")
+
+        # 预渲染字形表：下标 = 颜色档 * 字符数 + 字符
+        self.glyph_table = [
+            font.render(ch, True, col)
+            for col in colors
+            for ch in MATRIX_CHARS
+        ]
+        if pg.display.get_surface() is not None:  # sdl2 后端没有 display surface
+            self.glyph_table = [glyph.convert_alpha() for glyph in self.glyph_table]
+        # 每一行（距离流头部的序号）对应的颜色档：头部最亮，前 4 个次亮
+        rows = np.arange(self.max_length)
+        self.row_color = np.where(rows == 0, 2, np.where(rows < 4, 1, 0)) * len(MATRIX_CHARS)
+        self.row_offsets = rows * self.char_height
+
+        self.width = 0
+        self.height = 0
+        self.xs = np.empty(0, dtype=np.int64)
+        self.ys = np.empty(0, dtype=np.float64)
+        self.speeds = np.empty(0, dtype=np.float64)
+        self.lengths = np.empty(0, dtype=np.int64)
+        self.chars = np.empty((0, self.max_length), dtype=np.int8)
+
+        self._exclusion_key = None
+        self._exclusions: list[tuple[np.ndarray, int, int]] = []
+
+    # ---------- 布局（窗口尺寸变化时调用） ----------
+    def layout(self, w: int, h: int) -> None:
+        self.width, self.height = w, h
+        spacing = max(self.char_width + 4, int(w * 0.02))
+        self.xs = np.arange(0, w + spacing, spacing, dtype=np.int64)
+        n = self.xs.size
+        self.ys = self.rng.uniform(-h, 0, n)
+        self.speeds = self.rng.uniform(*self.speed, n)
+        self.lengths = self.rng.integers(self.length_range[0], self.length_range[1] + 1, n)
+        self.chars = self.rng.integers(0, len(MATRIX_CHARS), (n, self.max_length), dtype=np.int8)
+        self._exclusion_key = None
+
+    def set_exclusions(self, rects: list[pg.Rect]) -> None:
+        """预计算每个遮挡矩形覆盖的列（流）与行区间；矩形与布局不变时复用"""
+        key = (self.xs.size, tuple(tuple(r) for r in rects))
+        if key == self._exclusion_key:
+            return
+        self._exclusion_key = key
+        cw = self.char_width
+        self._exclusions = [
+            ((self.xs + cw > r.left) & (self.xs < r.right), r.top, r.bottom)
+            for r in rects
+        ]
+
+    # ---------- 推进 ----------
+    def update(self, dt_sec: float) -> None:
+        n = self.xs.size
+        if n == 0:
+            return
+        self.ys += self.speeds * dt_sec
+
+        # 整条流落出底部：重置位置/速度/长度/字符
+        gone = np.flatnonzero(self.ys - self.lengths * self.char_height > self.height + self.char_height)
+        if gone.size:
+            k = gone.size
+            self.ys[gone] = self.rng.uniform(-self.height, 0, k)
+            self.speeds[gone] = self.rng.uniform(*self.speed, k)
+            self.lengths[gone] = self.rng.integers(self.length_range[0], self.length_range[1] + 1, k)
+            self.chars[gone] = self.rng.integers(0, len(MATRIX_CHARS), (k, self.max_length), dtype=np.int8)
+
+        # 小概率刷新字符，营造“数字流动”的感觉
+        flip = self.rng.random(self.chars.shape) < self.flicker
+        count = int(flip.sum())
+        if count:
+            self.chars[flip] = self.rng.integers(0, len(MATRIX_CHARS), count, dtype=np.int8)
+
+    # ---------- 绘制 ----------
+    def draw(self, surf: pg.Surface) -> list[pg.Rect]:
+        """返回本帧绘制的矩形列表"""
+        if self.xs.size == 0:
+            return []
+        width_local, height_local = surf.get_size()
+        ch = self.char_height
+        char_y = (self.ys[:, None] - self.row_offsets[None, :]).astype(np.int64)
+
+        visible = np.arange(self.max_length)[None, :] < self.lengths[:, None]
+        visible &= (char_y >= -ch) & (char_y <= height_local)
+        visible &= (self.xs <= width_local)[:, None]
+        for cols, top, bottom in self._exclusions:
+            visible &= ~(cols[:, None] & (char_y < bottom) & (char_y + ch > top))
+
+        stream_idx, row_idx = np.nonzero(visible)
+        if stream_idx.size == 0:
+            return []
+        glyph_idx = self.row_color[row_idx] + self.chars[stream_idx, row_idx]
+        table = self.glyph_table
+        return surf.blits(
+            [
+                (table[g], (x, y))
+                for g, x, y in zip(glyph_idx.tolist(), self.xs[stream_idx].tolist(),
+                                   char_y[stream_idx, row_idx].tolist())
+            ]
+        )
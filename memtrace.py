@@ -0,0 +1,224 @@
+# memtrace.py
+from __future__ import annotations
+
+import json
+import os
+import time
+import tracemalloc
+
+import pygame as pg
+
+# ---------------- 分阶段内存追踪（可选） ----------------
+# 设置环境变量 VIBESNAKE_MEMTRACE 后启用（值为 1 时写到 memtrace.jsonl，否则视为文件路径）：
+#   with memtrace.stage("game.render"): ...
+# 每个阶段记录：耗时、Python 堆净增量与峰值（tracemalloc）、进程 RSS 增量（Linux）；
+# 每 SNAPSHOT_EVERY 帧在阶段前后各拍一次 tracemalloc 快照，统计新增分配块数与最大分配点。
+# 注意：SDL 的像素缓冲不走 Python 分配器，只能从 RSS 增量里看到；numpy 数组两边都能看到。
+# 每帧一行写入 JSONL，并在画面右上角叠加上一帧的统计。
+# 未启用时 stage() 只返回一个空上下文，开销可以忽略。
+
+MEMTRACE_ENV = "VIBESNAKE_MEMTRACE"
+DEFAULT_TELEMETRY_FILE = "memtrace.jsonl"
+SNAPSHOT_EVERY = 30  # 帧
+TRACE_FRAMES = 1     # 分配点只记录最内层调用帧
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes() -> int | None:
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, tracker: MemTracker, name: str):
+        self.tracker = tracker
+        self.name = name
+
+    def __enter__(self):
+        self.tracker._enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.tracker._exit()
+        return False
+
+
+class MemTracker:
+    def __init__(self, enabled: bool = False, telemetry_path: str | None = None,
+                 snapshot_every: int = SNAPSHOT_EVERY):
+        self.enabled = enabled
+        self.telemetry_path = telemetry_path
+        self.snapshot_every = max(1, snapshot_every)
+        self.frame = 0
+        self.last_frame: dict[str, dict] = {}  # 上一帧各阶段统计（叠加层显示用）
+        self.last_extra: dict = {}
+        self._current: dict[str, dict] = {}
+        self._stack: list[dict] = []
+        self._file = None
+        self._font: pg.font.Font | None = None
+        if enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACE_FRAMES)
+            self._filters = [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ]
+            if telemetry_path:
+                self._file = open(telemetry_path, "a", encoding="utf-8")
+
+    # ---------- 阶段 ----------
+    def stage(self, name: str):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def begin(self, name: str) -> None:
+        """与 end() 成对使用；适合跨越一大段循环体、不便缩进成 with 的阶段"""
+        if self.enabled:
+            self._enter(name)
+
+    def end(self) -> None:
+        if self.enabled:
+            self._exit()
+
+    def _sampling(self) -> bool:
+        return self.frame % self.snapshot_every == 0
+
+    def _enter(self, name: str) -> None:
+        # 先拍快照再取基线，快照本身不计入本阶段（但会计入外层阶段的峰值）
+        snapshot = tracemalloc.take_snapshot().filter_traces(self._filters) if self._sampling() else None
+        rss = _rss_bytes()
+        current, peak = tracemalloc.get_traced_memory()
+        # 峰值计数器是全局的：进入子阶段前先把父阶段目前的峰值记下来
+        if self._stack:
+            parent = self._stack[-1]
+            parent["peak_seen"] = max(parent["peak_seen"], peak)
+        tracemalloc.reset_peak()
+        entry = {
+            "name": name,
+            "start": current,
+            "peak_seen": current,
+            "rss": rss,
+            "snapshot": snapshot,
+            "t": time.perf_counter(),
+        }
+        self._stack.append(entry)
+
+    def _exit(self) -> None:
+        entry = self._stack.pop()
+        elapsed = time.perf_counter() - entry["t"]
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, entry["peak_seen"])
+        if self._stack:
+            parent = self._stack[-1]
+            parent["peak_seen"] = max(parent["peak_seen"], peak)
+
+        stats = self._current.setdefault(entry["name"], {
+            "calls": 0, "ms": 0.0, "py_bytes": 0, "py_peak": 0, "rss_bytes": 0,
+        })
+        stats["calls"] += 1
+        stats["ms"] += elapsed * 1000.0
+        stats["py_bytes"] += current - entry["start"]
+        stats["py_peak"] = max(stats["py_peak"], peak - entry["start"])
+        rss = _rss_bytes()
+        if rss is not None and entry["rss"] is not None:
+            stats["rss_bytes"] += rss - entry["rss"]
+
+        if entry["snapshot"] is not None:
+            after = tracemalloc.take_snapshot().filter_traces(self._filters)
+            diff = [d for d in after.compare_to(entry["snapshot"], "lineno") if d.size_diff > 0]
+            stats["blocks"] = stats.get("blocks", 0) + sum(max(0, d.count_diff) for d in diff)
+            if diff:
+                top = diff[0]
+                frame = top.traceback[0]
+                stats["top"] = f"{os.path.basename(frame.filename)}:{frame.lineno} +{top.size_diff}B"
+
+    # ---------- 帧 ----------
+    def end_frame(self, **extra) -> None:
+        """每帧提交画面后调用：滚动统计并写一行遥测（extra 原样附在记录里，如画质档位）"""
+        if not self.enabled:
+            return
+        current, _ = tracemalloc.get_traced_memory()
+        self.last_frame = self._current
+        self.last_extra = extra
+        self._current = {}
+        if self._file is not None:
+            record = {
+                "frame": self.frame,
+                "time": time.time(),
+                "py_current": current,
+                "rss": _rss_bytes(),
+                "stages": self.last_frame,
+                **extra,
+            }
+            self._file.write(json.dumps(record) + "\n")
+            if self._sampling():
+                self._file.flush()
+        self.frame += 1
+
+    def overlay_lines(self) -> list[str]:
+        lines = []
+        for name, s in self.last_frame.items():
+            line = (f"{name:<16}{s['ms']:6.2f}ms  py {s['py_bytes'] / 1024:+8.1f}K"
+                    f"  peak {s['py_peak'] / 1024:7.1f}K  rss {s['rss_bytes'] / 1024:+8.1f}K")
+            if "blocks" in s:
+                line += f"  blk {s['blocks']}"
+            lines.append(line)
+        lines += [f"{key:<16}{value}" for key, value in self.last_extra.items()]
+        return lines
+
+    def draw_overlay(self, screen: pg.Surface) -> pg.Rect | None:
+        """右上角画出上一帧统计；返回需要提交的矩形"""
+        if not self.enabled or not self.last_frame:
+            return None
+        if self._font is None:
+            self._font = pg.font.SysFont("Consolas, Menlo, Monospace", 14)
+        rows = [self._font.render(line, True, (200, 255, 200)) for line in self.overlay_lines()]
+        width = max(r.get_width() for r in rows) + 12
+        height = sum(r.get_height() for r in rows) + 8
+        rect = pg.Rect(screen.get_width() - width - 8, 8, width, height)
+        screen.fill((0, 0, 0), rect)
+        y = rect.top + 4
+        for r in rows:
+            screen.blit(r, (rect.left + 6, y))
+            y += r.get_height()
+        return rect
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_active: MemTracker | None = None
+
+
+def active() -> MemTracker:
+    """首次调用时按环境变量创建（尽早调用可以覆盖启动阶段的分配）"""
+    global _active
+    if _active is None:
+        value = os.environ.get(MEMTRACE_ENV, "")
+        if value in ("", "0"):
+            _active = MemTracker()
+        else:
+            _active = MemTracker(True, DEFAULT_TELEMETRY_FILE if value == "1" else value)
+    return _active
+
+
+def stage(name: str):
+    return active().stage(name)
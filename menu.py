@@ -1,16 +1,147 @@
 # menu.py
+import os
 import time
 import math
 import random
+from concurrent.futures import ThreadPoolExecutor
 import pygame as pg
 import numpy as np
-from shader import gen_1024_field, set_variant
+import memtrace
+import quality
+import startup
+from matrixrain import MatrixRain
+from present import Presenter
+from resize import ResizeHub
+from shader import (gen_1024_field, resize_workspace, set_glow_radius, set_variant, text_mask,
+                    workspace_ready)
+
+# ------------------ 蛇路径：弧长查找表 ------------------
+class SnakePath:
+    """矩形路径按整数弧长预计算坐标与法线方向；同一画框尺寸内复用"""
+
+    def __init__(self, x0: int, y0: int, margin: int, path_w: int, path_h: int):
+        self.key = (x0, y0, margin, path_w, path_h)
+        self.length = max(1, 2 * (path_w + path_h))
+        s = np.arange(self.length + 1, dtype=np.float64)
+        left, top = x0 + margin, y0 + margin
+        edges = [s < path_w, s < path_w + path_h, s < 2 * path_w + path_h]
+        self.px = np.select(edges, [left + s, left + path_w, left + path_w - (s - path_w - path_h)],
+                            left)
+        self.py = np.select(edges, [top, top + (s - path_w), top + path_h],
+                            top + path_h - (s - 2 * path_w - path_h))
+        angle = np.select(edges, [-math.pi / 2, 0.0, math.pi / 2], math.pi)
+        self.nx = np.cos(angle)
+        self.ny = np.sin(angle)
+
+    def positions(self, offsets, t: float, float_idx, amp: float, freq: float):
+        """一次求出多个弧长位置（含漂浮抖动）的屏幕坐标"""
+        offsets = np.asarray(offsets, dtype=np.float64)
+        i0 = np.clip(offsets.astype(np.int64), 0, self.length - 1)
+        frac = offsets - i0
+        x = self.px[i0] + frac * (self.px[i0 + 1] - self.px[i0])
+        y = self.py[i0] + frac * (self.py[i0 + 1] - self.py[i0])
+        wobble = amp * np.sin(2 * math.pi * freq * t + np.asarray(float_idx) * 0.2)
+        return x + wobble * self.nx[i0], y + wobble * self.ny[i0]
+
+    def free_offset(self, head_offset: float, snake_len: int, spacing: float, clearance: float):
+        """在蛇身占据弧段之外均匀取一个位置；无空位时返回 None"""
+        # 蛇身占据 [head - (n-1)*spacing - clearance, head + clearance]（环形）
+        blocked = (snake_len - 1) * spacing + 2 * clearance
+        free = self.length - blocked
+        if free <= 0:
+            return None
+        return (head_offset + clearance + random.uniform(0, free)) % self.length
+
+
+# ------------------ Shader 降频 + 交叉淡化 ------------------
+# 霓虹底图按 SHADER_HZ 更新（默认 20 Hz），在后台线程提前算好“下一张”；
+# 菜单每帧只在最近两张之间按时间比例做一次 alpha 混合 blit，数字雨与蛇仍按满帧率动。
+# 环境变量 VIBESNAKE_SHADER_HZ 可调（如 15 / 30），0 = 旧行为：每帧同步重算。
+SHADER_HZ_ENV = "VIBESNAKE_SHADER_HZ"
+DEFAULT_SHADER_HZ = 20.0
+
+_shader_executor: ThreadPoolExecutor | None = None
+
+
+def shader_hz() -> float:
+    try:
+        return max(0.0, float(os.environ.get(SHADER_HZ_ENV, DEFAULT_SHADER_HZ)))
+    except ValueError:
+        return DEFAULT_SHADER_HZ
+
+
+class ShaderFader:
+    """保留最近两张 Shader 输出 (t, Surface)，中间帧交叉淡化"""
+
+    def __init__(self, hz: float):
+        self.interval = 1.0 / hz
+        self.key = None
+        self.frames: list[tuple[float, pg.Surface]] = []
+        self.pending = None  # (t, Future)
+        self.blend: pg.Surface | None = None
+        self._seed = None  # (t, (w, h, glow), img)
+
+    def seed(self, t: float, w: int, h: int, glow: int, img) -> None:
+        """预热线程算好的一帧：首帧的尺寸/发光半径与之一致时直接作为淡化起点"""
+        self._seed = (t, (w, h, glow), img)
+
+    def _submit(self, t: float, w: int, h: int) -> None:
+        global _shader_executor
+        if _shader_executor is None:
+            _shader_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shader")
+        self.pending = (t, _shader_executor.submit(gen_1024_field, w, h, t))
+
+    def _to_surface(self, img) -> pg.Surface:
+        # Surface 创建与缩放留在主线程
+        w, h, glow, out_size, smooth = self.key
+        surface = pg.surfarray.make_surface(img)
+        if surface.get_size() != out_size:
+            scale = pg.transform.smoothscale if smooth else pg.transform.scale
+            surface = scale(surface, out_size)
+        return surface
+
+    def frame(self, t: float, w: int, h: int, glow: int, out_size, smooth: bool) -> pg.Surface:
+        key = (w, h, glow, out_size, smooth)
+        if key != self.key:
+            # 尺寸/画质变化：等后台算完再改工作区，当前帧同步算出
+            if self.pending is not None:
+                self.pending[1].result()
+                self.pending = None
+            self.key = key
+            set_glow_radius(glow)
+            seed, self._seed = self._seed, None
+            if seed is not None and seed[1] == (w, h, glow):
+                self.frames = [(seed[0], self._to_surface(seed[2]))]
+            else:
+                if not workspace_ready(w, h):
+                    resize_workspace(w, h)
+                self.frames = [(t, self._to_surface(gen_1024_field(w, h, t)))]
+            self.blend = pg.Surface(out_size)
+
+        if self.pending is not None and self.pending[1].done():
+            pending_t, future = self.pending
+            self.frames.append((pending_t, self._to_surface(future.result())))
+            self.pending = None
+        while len(self.frames) > 2 or (len(self.frames) == 2 and t >= self.frames[1][0]):
+            self.frames.pop(0)
+        if self.pending is None and len(self.frames) < 2:
+            # 正常情况下提前一张；后台落后时从当前时刻重新起步
+            next_t = self.frames[-1][0] + self.interval
+            if next_t <= t:
+                next_t = t + self.interval
+            self._submit(next_t, w, h)
+
+        t0, first = self.frames[0]
+        if len(self.frames) < 2:
+            return first
+        t1, second = self.frames[1]
+        alpha = int(255 * min(1.0, max(0.0, (t - t0) / (t1 - t0))))
+        first.set_alpha(None)
+        self.blend.blit(first, (0, 0))
+        second.set_alpha(alpha)
+        self.blend.blit(second, (0, 0))
+        return self.blend
 
-MATRIX_COLORS = [
-    (0, 80, 0),
-    (0, 160, 0),
-    (150, 255, 150),
-]
 
 def menu_loop(screen, clock, width, height):
     variant_choice = random.choice(["vortex", "metaballs", "kaleido"])
@@ -24,67 +155,10 @@ def menu_loop(screen, clock, width, height):
     t0 = time.time()
     dt = 0.016
 
-    char_width, char_height = matrix_font.size("0")
-    matrix_spacing = max(char_width + 4, int(width * 0.02))
-    matrix_streams = []
-    matrix_surfaces = [
-        {
-            "0": matrix_font.render("0", True, col).convert_alpha(),
-            "1": matrix_font.render("1", True, col).convert_alpha(),
-        }
-        for col in MATRIX_COLORS
-    ]
-
-    # ------------------ 初始化数字雨 ------------------
-    def init_matrix_streams(w: int, h: int):
-        nonlocal matrix_streams, matrix_spacing, char_width, char_height
-        char_width, char_height = matrix_font.size("0")
-        matrix_spacing = max(char_width + 4, int(w * 0.02))
-        matrix_streams = []
-        for x in range(0, w + matrix_spacing, matrix_spacing):
-            length = random.randint(12, 26)
-            stream = {
-                "x": x,
-                "y": random.uniform(-h, 0),
-                "speed": random.uniform(90, 160),
-                "length": length,
-                "chars": [random.choice(["0", "1"]) for _ in range(length)]
-            }
-            matrix_streams.append(stream)
-
-    # ------------------ 绘制数字雨 ------------------
-    def update_and_draw_matrix(surf: pg.Surface, dt_sec: float, exclude_rects: list[pg.Rect]):
-        if not matrix_streams:
-            return
-        height_local = surf.get_height()
-        width_local = surf.get_width()
-        for stream in matrix_streams:
-            # 更新 y 位置
-            stream["y"] += stream["speed"] * dt_sec
-            max_tail = stream["y"] - stream["length"] * char_height
-            if max_tail > height_local + char_height:
-                stream["y"] = random.uniform(-height_local, 0)
-                stream["speed"] = random.uniform(90, 160)
-                stream["length"] = random.randint(12, 26)
-                stream["chars"] = [random.choice(["0", "1"]) for _ in range(stream["length"])]
-
-            # 小概率刷新字符，营造“数字流动”的感觉
-            for i in range(len(stream["chars"])):
-                if random.random() < 0.02:
-                    stream["chars"][i] = random.choice(["0", "1"])
-
-            for idx in range(stream["length"]):
-                char_y = stream["y"] - idx * char_height
-                if char_y < -char_height or char_y > height_local:
-                    continue
-                color_idx = 2 if idx == 0 else (1 if idx < 4 else 0)
-                glyph = matrix_surfaces[color_idx][stream["chars"][idx]]
-                dest_rect = pg.Rect(stream["x"], int(char_y), char_width, char_height)
-                if stream["x"] > width_local:
-                    continue
-                if any(dest_rect.colliderect(ex) for ex in exclude_rects):
-                    continue
-                surf.blit(glyph, dest_rect.topleft)
+    matrix_rain = MatrixRain(matrix_font)
+    presenter = Presenter()
+    tracker = memtrace.active()
+    governor = quality.active()
 
     # ============================
     # ✅ 自适应背景画布尺寸
@@ -110,64 +184,62 @@ def menu_loop(screen, clock, width, height):
 
     easter_egg_triggered = False
 
-    init_matrix_streams(width, height)
-
-    # ------------------ 蛇路径工具 ------------------
-    def get_pos_along_path(offset, t, float_idx=0):
-        if offset < path_w:
-            x = x0 + margin + offset
-            y = y0 + margin
-            angle = -math.pi/2
-        elif offset < path_w + path_h:
-            x = x0 + margin + path_w
-            y = y0 + margin + (offset - path_w)
-            angle = 0
-        elif offset < 2*path_w + path_h:
-            x = x0 + margin + path_w - (offset - path_w - path_h)
-            y = y0 + margin + path_h
-            angle = math.pi/2
-        else:
-            x = x0 + margin
-            y = y0 + margin + path_h - (offset - 2*path_w - path_h)
-            angle = math.pi
-        offset_float = float_amp * math.sin(2 * math.pi * float_freq * t + float_idx * 0.2)
-        fx = x + offset_float * math.cos(angle)
-        fy = y + offset_float * math.sin(angle)
-        return fx, fy
-
-    def spawn_apple():
-        nonlocal apple_offset
-        attempts = 0
-        while attempts < 100:
-            candidate = random.uniform(0, path_len)
-            too_close = False
-            for i in range(snake_len):
-                seg_offset = (head_offset - i * node_spacing) % path_len
-                if abs(candidate - seg_offset) < node_spacing * 1.5:
-                    too_close = True
-                    break
-            if not too_close:
-                apple_offset = candidate
-                return
-            attempts += 1
-        apple_offset = None
+    matrix_rain.layout(width, height)
+
+    snake_path = None
+    segment_idx = np.arange(snake_len)
+    segment_colors = []
+
+    # ------------------ 尺寸变化：统一失效点 ------------------
+    def apply_layout(size):
+        nonlocal width, height, surf_w, surf_h, snake_radius, margin, apple_radius
+        width, height = size
+        surf_w = int(width * 0.7)
+        surf_h = int(height * 0.35)
+        snake_radius = max(2, int(min(width, height) * 0.004))
+        margin = max(8, int(min(width, height) * 0.008))
+        apple_radius = max(4, int(min(width, height) * 0.006))
+
+    resize_hub = ResizeHub()
+    resize_hub.subscribe(apply_layout)
+    resize_hub.subscribe(lambda size: matrix_rain.layout(*size))
+    def shader_size():
+        # 画质档位：Shader 以较低内部分辨率计算，再放大到画框尺寸
+        scale = governor.settings["shader_scale"]
+        return max(1, int(surf_w * scale)), max(1, int(surf_h * scale))
+
+    # Shader 工作区（坐标网格/发光蒙版）首次构建较慢：字样蒙版在主线程渲染，
+    # 其余 numpy 计算连同第一帧一起交给后台线程；就绪前画框先显示占位底色。
+    # 第一帧交给 fader 作为交叉淡化的起点
+    def warm_shader(w, h, glow, mask):
+        resize_workspace(w, h, mask)
+        return w, h, glow, gen_1024_field(w, h, 0.0)
+
+    set_glow_radius(governor.settings["glow_radius"])
+    shader_job = startup.background(warm_shader, *shader_size(), governor.settings["glow_radius"],
+                                    text_mask(*shader_size()))
+    placeholder = None
+
+    # 尺寸/画质变化由 fader 自己检测（hz=0 时 gen_1024_field 会按新尺寸重建工作区）
+    hz = shader_hz()
+    fader = ShaderFader(hz) if hz > 0 else None
+    resize_hub.subscribe(lambda size: presenter.mark_full())
 
     # ============================
     # 主循环
     # ============================
     while True:
-        for e in pg.event.get():
+        work_started = time.perf_counter()
+        # 同一帧内的多个 VIDEORESIZE 只应用最后一个
+        events, new_size = resize_hub.coalesce(pg.event.get())
+        if new_size is not None:
+            with tracker.stage("resize"):
+                screen = resize_hub.apply(new_size)
+        for e in events:
             if e.type == pg.QUIT:
                 return "QUIT"
-            if e.type == pg.VIDEORESIZE:
-                screen = pg.display.set_mode((e.w, e.h), pg.RESIZABLE)
-                width, height = screen.get_size()
-                surf_w = int(width * 0.7)
-                surf_h = int(height * 0.35)
-                snake_radius = max(2, int(min(width, height) * 0.004))
-                margin = max(8, int(min(width, height) * 0.008))
-                apple_radius = max(4, int(min(width, height) * 0.006))
-                init_matrix_streams(width, height)
+            if e.type == pg.WINDOWEXPOSED:
+                presenter.mark_full()
             if e.type == pg.KEYDOWN:
                 if e.key in (pg.K_RETURN, pg.K_SPACE):
                     return "START"
@@ -175,8 +247,26 @@ def menu_loop(screen, clock, width, height):
                     return "QUIT"
 
         t = time.time() - t0
-        img = gen_1024_field(surf_w, surf_h, t)
-        frame = pg.surfarray.make_surface(img)
+        settings = governor.settings
+        with tracker.stage("shader"):
+            if shader_job.done() and fader is not None:
+                if fader.key is None:
+                    fader.seed(0.0, *shader_job.result())
+                frame = fader.frame(t, *shader_size(), settings["glow_radius"], (surf_w, surf_h),
+                                    settings["smoothscale"])
+            elif shader_job.done():
+                set_glow_radius(settings["glow_radius"])
+                img = gen_1024_field(*shader_size(), t)
+                frame = pg.surfarray.make_surface(img)
+                if frame.get_size() != (surf_w, surf_h):
+                    scale = pg.transform.smoothscale if settings["smoothscale"] else pg.transform.scale
+                    frame = scale(frame, (surf_w, surf_h))
+            else:
+                if placeholder is None or placeholder.get_size() != (surf_w, surf_h):
+                    placeholder = pg.Surface((surf_w, surf_h))
+                    placeholder.fill((8, 8, 16))
+                frame = placeholder
+        tracker.begin("menu.draw")
 
         screen.fill((12, 14, 24))
 
@@ -186,46 +276,56 @@ def menu_loop(screen, clock, width, height):
             pg.Rect(x0, y0, frame.get_width(), frame.get_height()),
             pg.Rect(width//2 - 260, y0 + frame.get_height() + 6, 520, 140),
         ]
-        update_and_draw_matrix(screen, dt, exclude_rects)
+        matrix_rain.set_exclusions(exclude_rects)
+        matrix_rain.update(dt)
+        presenter.mark_many(matrix_rain.draw(screen))
         screen.blit(frame, (x0, y0))
 
-        # 蛇的路径
+        # 蛇的路径（画框尺寸变化时重建查找表）
         path_w = frame.get_width() - 2*margin
         path_h = frame.get_height() - 2*margin
-        path_len = 2*(path_w + path_h)
+        path_key = (x0, y0, margin, path_w, path_h)
+        if snake_path is None or snake_path.key != path_key:
+            snake_path = SnakePath(*path_key)
+        path_len = snake_path.length
         max_len = int(path_len / node_spacing) - 5
         head_offset = (t * snake_speed) % path_len
 
         # 🍎 苹果刷新
         if apple_offset is None and snake_len < max_len:
             if random.random() < 0.01:
-                spawn_apple()
+                apple_offset = snake_path.free_offset(head_offset, snake_len, node_spacing, node_spacing * 1.5)
 
         # 🍎 绘制苹果
         if apple_offset is not None:
-            ax, ay = get_pos_along_path(apple_offset, t)
+            ax, ay = snake_path.positions(apple_offset, t, 0, float_amp, float_freq)
             pg.draw.circle(screen, apple_color, (int(ax), int(ay)), apple_radius)
 
-        # 🐍 绘制蛇
-        for i in range(snake_len):
-            seg_offset = (head_offset - i * node_spacing) % path_len
-            sx, sy = get_pos_along_path(seg_offset, t, i)
-            intensity = max(0.3, 1 - i / snake_len)
-            color = (int(80 * intensity + 175 * (1 - intensity)),
-                     int(220 * intensity),
-                     int(120 * intensity))
-            pg.draw.circle(screen, color, (int(sx), int(sy)), snake_radius)
+        # 🐍 绘制蛇：所有节点位置一次算出
+        if len(segment_colors) != snake_len:
+            segment_idx = np.arange(snake_len)
+            segment_colors = []
+            for i in range(snake_len):
+                intensity = max(0.3, 1 - i / snake_len)
+                segment_colors.append((int(80 * intensity + 175 * (1 - intensity)),
+                                       int(220 * intensity),
+                                       int(120 * intensity)))
+        seg_offsets = (head_offset - segment_idx * node_spacing) % path_len
+        seg_x, seg_y = snake_path.positions(seg_offsets, t, segment_idx, float_amp, float_freq)
+        for color, sx, sy in zip(segment_colors, seg_x.astype(np.int64).tolist(), seg_y.astype(np.int64).tolist()):
+            pg.draw.circle(screen, color, (sx, sy), snake_radius)
 
         # 🐍 吃苹果
         if apple_offset is not None:
-            head_x, head_y = get_pos_along_path(head_offset, t)
-            apple_x, apple_y = get_pos_along_path(apple_offset, t)
+            head_x, head_y = snake_path.positions(head_offset, t, 0, float_amp, float_freq)
+            apple_x, apple_y = snake_path.positions(apple_offset, t, 0, float_amp, float_freq)
             dist = math.hypot(head_x - apple_x, head_y - apple_y)
             if dist < snake_radius + apple_radius:
                 snake_len += 5
                 apple_offset = None
                 if snake_len >= max_len:
                     easter_egg_triggered = True
+                    presenter.mark_full()
 
         # 标题 & 提示
         title = font_big.render("Vibe Coding 1024 — Snake 1024", True, (220, 230, 240))
@@ -244,5 +344,17 @@ def menu_loop(screen, clock, width, height):
                 screen.blit(line_surf, (width//2 - line_surf.get_width()//2,
                                         y0 + frame.get_height() + 12 + (i+1)*24))
 
-        pg.display.flip()
+        # 画框（含蛇与苹果的漂浮范围）与下方提示/彩蛋区域每帧都会变化
+        presenter.mark(exclude_rects[0].inflate(2 * (snake_radius + apple_radius + float_amp),
+                                                2 * (snake_radius + apple_radius + float_amp)),
+                       exclude_rects[1])
+        tracker.end()
+        overlay_rect = tracker.draw_overlay(screen)
+        if overlay_rect is not None:
+            presenter.mark(overlay_rect)
+        presenter.present()
+        if startup.frame_presented():
+            return "QUIT"
+        governor.observe((time.perf_counter() - work_started) * 1000.0)
+        tracker.end_frame(quality=governor.level_name)
         dt = clock.tick(60) / 1000.0
\ No newline at end of file
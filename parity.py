@@ -0,0 +1,777 @@
+# parity.py
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import pygame as pg
+
+import render_backend
+import shader
+from game import (
+    BG_DARK, BOARD_BG, BOARD_BOTTOM_MARGIN, BOARD_PIXELS, CELL, GREEN_BEAN_FILL, GREEN_BEAN_HL,
+    GREEN_BEAN_OUTLINE, GREEN_BEAN_SHADOW, GRID_SIZE, HUD_RESERVED_HEIGHT, INITIAL_RED_BEANS,
+    INPUT_DIRECTIONS, INPUT_RESET, MAX_RED_BEAN_COUNT, MOVE_FPS, ORANGE_BEAN_FILL, ORANGE_BEAN_HL,
+    ORANGE_BEAN_OUTLINE, ORANGE_BEAN_SHADOW, PIXEL_PERFECT, RED_BEAN_FILL, RED_BEAN_HL,
+    RED_BEAN_OUTLINE, RED_BEAN_SHADOW, SNAKE_BODY_COLOR, SNAKE_HEAD_COLOR, SNAKE_OUTLINE_COLOR,
+    SNAKE_SHADOW_COLOR, SPAWN_BATCH_INTERVAL, SnakeGame, Vec2,
+)
+from replay import STEP_RESET, ReplayDriver, apply_step, load, save
+from tuner import greedy_policy
+
+# ---------------- 差分对拍：参考实现 vs 优化实现 ----------------
+# 两个引擎用同一种子、同一输入流（录像格式：每 tick 一个方向码，INPUT_RESET = 重开）
+# 逐 tick 推进，每步之后比较完整状态；可选每隔若干 tick 比较渲染画面（带像素容差）。
+# 默认参考实现 reference 是冻结的基线代码（见 ReferenceGame），不继承 SnakeGame；
+# 每个引擎各用自己的渲染路径出图：reference 逐格重绘，ringbuffer/snapshot/clone
+# 走 surface 后端 + 精灵缓存，sdl2 走 Renderer，只比较棋盘区域（HUD/覆盖层不在对拍范围）。
+# 发现分歧时报告第一个不一致的 tick 与字段，并把输入流裁剪到分歧处、尽量把转向
+# 还原成直行，得到最小复现录像（可用 parity.py repro / replay.py export 查看）。
+#
+#   python parity.py run --engine snapshot --ticks 2000000 --seeds 8
+#   python parity.py run --engine clone --frame-every 500
+#   python parity.py run --engine sdl2 --frame-every 200 --frame-size 1024 1112 --pixel-tol 2
+#   python parity.py repro divergence.vsr --engine snapshot
+#   python parity.py field                         # gen_1024_field 各实现与冻结的基线实现的像素差
+
+FRAME_SIZE = (640, 520)  # 棋盘缩小到 432px：smoothscale 路径
+DEFAULT_CHAOS = 0.005  # 每 tick 随机转向（可能致死）的概率；其余时间一步贪心
+MINIMIZE_SECONDS = 120.0
+
+
+# ====== 参考实现：冻结的基线逻辑 ======
+class ReferenceGame:
+    """环形缓冲区/固定步长/精灵缓存之前的 SnakeGame 原样抄录（deque + set 蛇身、逐节弹尾、
+    按 dt 累计的生成计时、逐格重绘的棋盘），之后不随 game.py 改动。
+    难度曲线是调参对象而非优化对象，直接沿用 SnakeGame 的；death_cause 为对拍补记；
+    唯一的逻辑改动见 _pop_tail（基线在蛇头追进尾巴格时会抛 KeyError）。"""
+
+    green_weight = staticmethod(SnakeGame.green_weight)
+    orange_weight = staticmethod(SnakeGame.orange_weight)
+    batch_size = staticmethod(SnakeGame.batch_size)
+    max_beans = staticmethod(SnakeGame.max_beans)
+
+    def __init__(self, rng_seed: int | None = None):
+        self.rng = random.Random(rng_seed)
+        self.move_interval = 1.0 / MOVE_FPS
+        self.board_surface = pg.Surface((BOARD_PIXELS, BOARD_PIXELS))
+        self.entities_surface = pg.Surface((BOARD_PIXELS, BOARD_PIXELS), pg.SRCALPHA)
+        self.high_score = 0
+        self.reset()
+
+    def reset(self) -> None:
+        center = GRID_SIZE // 2
+        initial = [(center + offset, center) for offset in range(3, -5, -1)]
+        self.snake: deque[Vec2] = deque(initial)
+        self.snake_set: set[Vec2] = set(initial)
+        self.direction: Vec2 = (1, 0)
+        self.pending_direction: Vec2 = self.direction
+        self.score = len(self.snake)
+        self.high_score = max(self.high_score, self.score)
+        self.green_beans: set[Vec2] = set()
+        self.orange_beans: set[Vec2] = set()
+        self.red_beans: set[Vec2] = set()
+        self.grow_pending = 0
+        self.move_timer = 0.0
+        self.spawn_timer = 0.0
+        self.dead = False
+        self.death_cause: str | None = None
+        self.easter_triggered = False
+        self._seed_initial_beans()
+        self._seed_initial_red_beans()
+
+    def update(self, dt: float) -> None:
+        if self.dead:
+            return
+        self.move_timer += dt
+        while self.move_timer >= self.move_interval:
+            self.move_timer -= self.move_interval
+            self._advance_one_step()
+            if self.dead:
+                return
+        if not self.easter_triggered:
+            self.spawn_timer += dt
+            while self.spawn_timer >= SPAWN_BATCH_INTERVAL:
+                self.spawn_timer -= SPAWN_BATCH_INTERVAL
+                self._spawn_batch()
+        if (not self.easter_triggered
+                and self.score >= 1024
+                and len(self.red_beans) == 0
+                and len(self.orange_beans) <= 256):
+            self.easter_triggered = True
+
+    def _advance_one_step(self) -> None:
+        if self.easter_triggered:
+            return
+        self.direction = self.pending_direction
+        hx, hy = self.snake[0]
+        dx, dy = self.direction
+        new_head = (hx + dx, hy + dy)
+        if not (0 <= new_head[0] < GRID_SIZE and 0 <= new_head[1] < GRID_SIZE):
+            self.dead, self.death_cause = True, "wall"
+            return
+        tail = self.snake[-1]
+        if new_head in self.snake_set and new_head != tail:
+            self.dead, self.death_cause = True, "self"
+            return
+
+        self.snake.appendleft(new_head)
+        self.snake_set.add(new_head)
+        extra_removals = 0
+        if new_head in self.green_beans:
+            self.green_beans.remove(new_head)
+            self.grow_pending += 2
+        elif new_head in self.orange_beans:
+            self.orange_beans.remove(new_head)
+            extra_removals += 1
+        elif new_head in self.red_beans:
+            self.red_beans.remove(new_head)
+            extra_removals += 5
+
+        if self.grow_pending > 0:
+            self.grow_pending -= 1
+        else:
+            self._pop_tail()
+        while extra_removals > 0:
+            if self.grow_pending > 0:
+                self.grow_pending -= 1
+            else:
+                if len(self.snake) == 0:
+                    self.dead, self.death_cause = True, "shrink"
+                    return
+                self._pop_tail()
+                if len(self.snake) == 0:
+                    self.dead, self.death_cause = True, "shrink"
+                    return
+            extra_removals -= 1
+
+        self.score = len(self.snake)
+        if self.score > self.high_score:
+            self.high_score = self.score
+
+    def _pop_tail(self) -> None:
+        removed = self.snake.pop()
+        # 蛇头刚进入旧尾巴格时该格在 deque 里出现两次：基线照样从 snake_set 删掉，
+        # 蛇头随之“隐身”，之后再弹到它时 KeyError。这里保留蛇头的占用
+        if not self.snake or removed != self.snake[0]:
+            self.snake_set.remove(removed)
+
+    def _spawn_batch(self) -> None:
+        capacity = self.max_beans(self.score) - (len(self.green_beans) + len(self.orange_beans) + len(self.red_beans))
+        if capacity <= 0:
+            return
+        want = min(capacity, self.batch_size(self.score))
+        gw = self.green_weight(self.score)
+        ow = self.orange_weight(self.score)
+        total_w = gw + ow
+        if total_w <= 0:
+            return
+        for _ in range(want):
+            pick = self.rng.random() * total_w
+            kind = "green" if pick < gw else "orange"
+            if kind == "orange" and self.score >= 512:
+                kind = "green"
+            cell = self._random_free_cell()
+            if cell is None:
+                break
+            if kind == "green":
+                self.green_beans.add(cell)
+            else:
+                self.orange_beans.add(cell)
+
+    def _seed_initial_beans(self) -> None:
+        cap = self.max_beans(self.score)
+        target_total = max(0, int(cap * 0.6))
+        need = max(0, target_total - (len(self.green_beans) + len(self.orange_beans) + len(self.red_beans)))
+        for _ in range(need):
+            kind = "green" if self.rng.random() < (2 / 3) else "orange"
+            if kind == "orange" and self.orange_weight(self.score) <= 0.0:
+                kind = "green"
+            cell = self._random_free_cell()
+            if cell is None:
+                break
+            if kind == "green":
+                self.green_beans.add(cell)
+            else:
+                self.orange_beans.add(cell)
+
+    def _seed_initial_red_beans(self) -> None:
+        for _ in range(min(INITIAL_RED_BEANS, MAX_RED_BEAN_COUNT)):
+            if len(self.red_beans) >= MAX_RED_BEAN_COUNT:
+                break
+            cell = self._random_free_cell()
+            if cell is None:
+                break
+            self.red_beans.add(cell)
+
+    def _random_free_cell(self) -> Vec2 | None:
+        tries = 0
+        occupied = self.snake_set | self.green_beans | self.orange_beans | self.red_beans
+        while tries < 500:
+            cell = (self.rng.randrange(GRID_SIZE), self.rng.randrange(GRID_SIZE))
+            if cell not in occupied:
+                return cell
+            tries += 1
+        return None
+
+    # --- 渲染：只画棋盘（底色 + 逐个新建 Surface 画豆子/蛇身），返回棋盘在屏幕上的位置 ---
+    def render(self, screen: pg.Surface) -> pg.Rect:
+        screen.fill(BG_DARK)
+        self.board_surface.fill(BOARD_BG)
+        self.entities_surface.fill((0, 0, 0, 0))
+        for cells, colors in ((self.green_beans, (GREEN_BEAN_FILL, GREEN_BEAN_OUTLINE, GREEN_BEAN_HL, GREEN_BEAN_SHADOW)),
+                              (self.orange_beans, (ORANGE_BEAN_FILL, ORANGE_BEAN_OUTLINE, ORANGE_BEAN_HL, ORANGE_BEAN_SHADOW)),
+                              (self.red_beans, (RED_BEAN_FILL, RED_BEAN_OUTLINE, RED_BEAN_HL, RED_BEAN_SHADOW))):
+            for pos in cells:
+                self._draw_round_item(self.entities_surface, pos, *colors)
+        segments = list(self.snake)
+        if segments:
+            self._draw_snake_segment(self.entities_surface, segments[0], fill_color=SNAKE_HEAD_COLOR, is_head=True)
+            for segment in segments[1:]:
+                self._draw_snake_segment(self.entities_surface, segment, fill_color=SNAKE_BODY_COLOR, is_head=False)
+
+        dest_rect, scale_used, use_integer_scale, dest_size = self._compute_board_dest(*screen.get_size())
+        if use_integer_scale:
+            if int(scale_used) == 1:
+                board_to_blit, entities_to_blit = self.board_surface, self.entities_surface
+            else:
+                board_to_blit = pg.transform.scale(self.board_surface, dest_size)
+                entities_to_blit = pg.transform.scale(self.entities_surface, dest_size)
+        else:
+            board_to_blit = (self.board_surface if self.board_surface.get_size() == dest_size
+                             else pg.transform.smoothscale(self.board_surface, dest_size))
+            entities_to_blit = (self.entities_surface if self.entities_surface.get_size() == dest_size
+                                else pg.transform.smoothscale(self.entities_surface, dest_size))
+        screen.blit(board_to_blit, dest_rect)
+        screen.blit(entities_to_blit, dest_rect)
+        return dest_rect
+
+    @staticmethod
+    def _compute_board_dest(sw: int, sh: int):
+        available_height = max(1, sh - HUD_RESERVED_HEIGHT - BOARD_BOTTOM_MARGIN)
+        scale_float = min(sw / BOARD_PIXELS, available_height / BOARD_PIXELS)
+        if scale_float <= 0:
+            scale_float = 1.0
+        use_integer_scale = PIXEL_PERFECT and scale_float >= 1.0
+        if use_integer_scale:
+            scale = max(1, int(scale_float))
+            dest_size = (BOARD_PIXELS * scale, BOARD_PIXELS * scale)
+            scale_used = float(scale)
+        else:
+            dest_size = (max(1, int(BOARD_PIXELS * scale_float)),) * 2
+            scale_used = dest_size[0] / BOARD_PIXELS
+        dest_rect = pg.Rect((0, 0), dest_size)
+        dest_rect.centerx = sw // 2
+        vertical_space = max(0, available_height - dest_size[1])
+        dest_rect.top = HUD_RESERVED_HEIGHT + vertical_space // 2
+        return dest_rect, scale_used, use_integer_scale, dest_size
+
+    @staticmethod
+    def _draw_round_item(surface: pg.Surface, cell: Vec2, fill_color, outline_color, hl_color, shadow_color) -> None:
+        item = pg.Surface((CELL, CELL), pg.SRCALPHA)
+        center = (CELL // 2, CELL // 2)
+        base_r = max(4, CELL // 2 - 2)
+        pg.draw.circle(item, shadow_color, (center[0] + 1, center[1] + 2), base_r)
+        pg.draw.circle(item, outline_color, center, base_r, width=2)
+        pg.draw.circle(item, fill_color, center, base_r - 1)
+        hl_center = (center[0] - base_r // 2, center[1] - base_r // 2)
+        pg.draw.circle(item, hl_color, hl_center, max(2, base_r // 3))
+        surface.blit(item, (cell[0] * CELL, cell[1] * CELL))
+
+    @staticmethod
+    def _draw_snake_segment(surface: pg.Surface, cell: Vec2, *, fill_color, is_head: bool) -> None:
+        seg_surf = pg.Surface((CELL, CELL), pg.SRCALPHA)
+        padding = max(1, CELL // 10)
+        outline_rect = pg.Rect(padding, padding, CELL - padding * 2, CELL - padding * 2)
+        pg.draw.rect(seg_surf, SNAKE_SHADOW_COLOR, outline_rect.move(2, 3))
+        pg.draw.rect(seg_surf, SNAKE_OUTLINE_COLOR, outline_rect, width=max(2, CELL // 6))
+        fill_rect = outline_rect.inflate(-max(4, CELL // 6), -max(4, CELL // 6))
+        pg.draw.rect(seg_surf, fill_color, fill_rect)
+        accent_color = tuple(min(255, c + 35) for c in fill_color)
+        stripe_width = max(2, CELL // 6)
+        for idx, x in enumerate(range(fill_rect.left, fill_rect.right, stripe_width * 2)):
+            stripe_rect = pg.Rect(x, fill_rect.top, stripe_width, fill_rect.height)
+            pg.draw.rect(seg_surf, accent_color if (idx + (1 if is_head else 0)) % 2 == 0 else fill_color, stripe_rect)
+        if is_head:
+            highlight_rect = pg.Rect(
+                fill_rect.left + fill_rect.width // 8,
+                fill_rect.top + fill_rect.height // 8,
+                max(3, fill_rect.width // 2),
+                max(3, fill_rect.height // 2),
+            )
+            highlight_surface = pg.Surface(highlight_rect.size, pg.SRCALPHA)
+            highlight_surface.fill((*(min(255, c + 60) for c in fill_color), 140))
+            seg_surf.blit(highlight_surface, highlight_rect.topleft)
+            eye_size = max(2, CELL // 6)
+            left_eye = pg.Rect(fill_rect.left + fill_rect.width // 6, fill_rect.top + fill_rect.height // 4,
+                               eye_size, eye_size)
+            pg.draw.rect(seg_surf, (20, 30, 60), left_eye)
+            pg.draw.rect(seg_surf, (20, 30, 60), left_eye.move(fill_rect.width // 2, 0))
+        surface.blit(seg_surf, (cell[0] * CELL, cell[1] * CELL))
+
+
+# ====== 引擎 ======
+class Engine:
+    """包一层 SnakeGame：step(code) 推进一个 tick（code 为录像方向码）；
+    frame(size) 用引擎自己的渲染后端画一帧，返回棋盘区域"""
+    name = "ringbuffer"
+    game_class: type[SnakeGame] = SnakeGame
+
+    def __init__(self, seed: int):
+        self.game = self.game_class(rng_seed=seed)
+        self.driver = ReplayDriver()
+        self.game.autopilot = self.driver
+        self.backend = None
+        self.screen: pg.Surface | None = None
+
+    def step(self, code: int) -> None:
+        apply_step(self.game, self.driver, STEP_RESET if code == INPUT_RESET else code)
+
+    def open_backend(self, size: tuple[int, int]):
+        return render_backend.SurfaceBackend(), pg.Surface(size)
+
+    def frame(self, size: tuple[int, int]) -> pg.Surface:
+        if self.screen is None or self.screen.get_size() != size:
+            self.backend, self.screen = self.open_backend(size)
+        game = self.game
+        game.backend = self.backend  # snapshot/clone 会换掉 game 对象
+        # 参考实现没有渲染插值：按 alpha = 1（蛇头已在当前格）出图
+        timer, game.move_timer = game.move_timer, game.move_interval
+        try:
+            rect, _ = game.render(self.screen)
+        finally:
+            game.move_timer = timer
+        return self.backend.capture(self.screen).subsurface(rect)
+
+
+class ReferenceEngine(Engine):
+    """冻结的基线逻辑 + 逐格重绘；方向码直接写入 pending_direction（基线按键处理的效果）"""
+    name = "reference"
+
+    def __init__(self, seed: int):
+        self.game = ReferenceGame(rng_seed=seed)
+        self.screen = None
+
+    def step(self, code: int) -> None:
+        if code == INPUT_RESET:
+            self.game.reset()
+        else:
+            self.game.pending_direction = INPUT_DIRECTIONS[code]
+            self.game.update(self.game.move_interval)
+
+    def frame(self, size: tuple[int, int]) -> pg.Surface:
+        if self.screen is None or self.screen.get_size() != size:
+            self.screen = pg.Surface(size)
+        return self.screen.subsurface(self.game.render(self.screen))
+
+
+class SDL2Engine(Engine):
+    """逻辑同 ringbuffer，画面走 SDL2 Renderer（软件渲染器），读回合成结果。
+    Renderer 的双线性缩小与 smoothscale 的盒式滤波差别很大，画面对拍请用整数倍尺寸
+    （--frame-size 1024 1112），此时只剩混合取整误差（--pixel-tol 2）"""
+    name = "sdl2"
+
+    def open_backend(self, size: tuple[int, int]):
+        backend = render_backend.SDL2Backend(software=True)
+        return backend, backend.open(size, "parity")
+
+
+class SnapshotEngine(Engine):
+    """每个 tick 都先 snapshot() 再 restore() 到另一个对象上，验证快照无损"""
+    name = "snapshot"
+
+    def __init__(self, seed: int):
+        super().__init__(seed)
+        self.spare = SnakeGame(rng_seed=0)
+
+    def step(self, code: int) -> None:
+        self.spare.restore(self.game.snapshot())
+        self.game, self.spare = self.spare, self.game
+        self.game.autopilot = self.driver
+        super().step(code)
+
+
+class CloneEngine(Engine):
+    """每个 tick 都在 clone() 出的新对象上推进"""
+    name = "clone"
+
+    def step(self, code: int) -> None:
+        self.game = self.game.clone()
+        self.game.autopilot = self.driver
+        super().step(code)
+
+
+ENGINES: dict[str, type[Engine]] = {
+    e.name: e for e in (ReferenceEngine, Engine, SDL2Engine, SnapshotEngine, CloneEngine)
+}
+
+
+# ====== 状态比较 ======
+# 便宜的标量在前，蛇身/豆子集合/随机数状态在后
+_FIELDS: tuple[tuple[str, Callable[[SnakeGame], object]], ...] = (
+    ("direction", lambda g: g.direction),
+    ("score", lambda g: g.score),
+    ("high_score", lambda g: g.high_score),
+    ("grow_pending", lambda g: g.grow_pending),
+    ("move_timer", lambda g: g.move_timer),
+    ("spawn_timer", lambda g: g.spawn_timer),
+    ("dead", lambda g: (g.dead, g.death_cause)),
+    ("easter", lambda g: g.easter_triggered),
+    ("prev_head_tail", lambda g: (g._prev_head, g._prev_tail)),
+    ("snake", lambda g: list(g.snake)),
+    ("green_beans", lambda g: g.green_beans),
+    ("orange_beans", lambda g: g.orange_beans),
+    ("red_beans", lambda g: g.red_beans),
+    ("rng", lambda g: g.rng.getstate()),
+)
+
+
+def first_state_diff(a: SnakeGame, b: SnakeGame) -> str | None:
+    """返回第一个不一致的字段（含两边的值摘要）；一致时返回 None。
+    只有一边有的字段（如渲染插值用的 _prev_head）跳过"""
+    for name, get in _FIELDS:
+        try:
+            va, vb = get(a), get(b)
+        except AttributeError:
+            continue
+        if va != vb:
+            return f"{name}: {_summary(va)} != {_summary(vb)}"
+    return None
+
+
+def _summary(value) -> str:
+    if isinstance(value, (set, list)) and len(value) > 6:
+        return f"<{type(value).__name__} of {len(value)}>"
+    text = repr(value)
+    return text if len(text) <= 80 else text[:77] + "..."
+
+
+def frame_diff(a: Engine, b: Engine, size: tuple[int, int], tol: int) -> tuple[int, int]:
+    """两边各用自己的渲染路径出一帧棋盘，返回 (最大通道差, 超出容差的像素数)"""
+    fa, fb = a.frame(size), b.frame(size)
+    if (fa.get_abs_offset(), fa.get_size()) != (fb.get_abs_offset(), fb.get_size()):
+        return 255, max(fa.get_width() * fa.get_height(), fb.get_width() * fb.get_height())
+    pa = pg.surfarray.array3d(fa).astype(np.int16)
+    pb = pg.surfarray.array3d(fb).astype(np.int16)
+    delta = np.abs(pa - pb).max(axis=2)
+    return int(delta.max()), int(np.count_nonzero(delta > tol))
+
+
+# ====== 输入流 ======
+def next_input(game: SnakeGame, rng: random.Random, chaos: float) -> int:
+    if game.dead or game.easter_triggered:
+        return INPUT_RESET
+    dx, dy = game.direction
+    if rng.random() < chaos:
+        direction = rng.choice([d for d in INPUT_DIRECTIONS if d != (-dx, -dy)])
+    else:
+        direction = greedy_policy(game, rng) or game.direction
+    return INPUT_DIRECTIONS.index(direction)
+
+
+def run_pair(reference: str, target: str, seed: int, inputs: bytes | None = None,
+             ticks: int = 0, chaos: float = DEFAULT_CHAOS, frame_every: int = 0,
+             pixel_tol: int = 0, pixel_count: int = 0,
+             frame_size: tuple[int, int] = FRAME_SIZE) -> dict:
+    """逐 tick 对拍；inputs 为 None 时按种子在线生成输入流。返回结果摘要"""
+    ref = ENGINES[reference](seed)
+    alt = ENGINES[target](seed)
+    rng = random.Random(seed ^ 0x9A21)
+    log = bytearray()
+    total = ticks if inputs is None else len(inputs)
+    result = {"seed": seed, "ticks": 0, "games": 1, "divergence": None}
+    for tick in range(total):
+        # 输入按优化实现的状态生成（分歧前两边一致；参考实现的 deque 蛇身查找太慢）
+        code = next_input(alt.game, rng, chaos) if inputs is None else inputs[tick]
+        log.append(code)
+        ref.step(code)
+        alt.step(code)
+        result["ticks"] = tick + 1
+        if code == INPUT_RESET:
+            result["games"] += 1
+        diff = first_state_diff(ref.game, alt.game)
+        if (diff is None and frame_every and tick % frame_every == 0
+                and not (ref.game.dead or ref.game.easter_triggered)):
+            worst, count = frame_diff(ref, alt, frame_size, pixel_tol)
+            if count > pixel_count:
+                diff = f"frame: {count} pixels differ by more than {pixel_tol} (max {worst})"
+        if diff is not None:
+            result["divergence"] = {"tick": tick, "what": diff}
+            break
+    result["inputs"] = bytes(log)
+    return result
+
+
+def minimize(reference: str, target: str, seed: int, inputs: bytes,
+             budget_s: float = MINIMIZE_SECONDS, **kwargs) -> bytes:
+    """裁剪到分歧所在 tick，再按块把转向换回直行（上一方向），只保留复现所必需的转向；
+    超出时间预算时返回目前为止最小的结果"""
+    deadline = time.perf_counter() + budget_s
+
+    def diverges(candidate: bytes) -> int | None:
+        div = run_pair(reference, target, seed, candidate, **kwargs)["divergence"]
+        return None if div is None else div["tick"]
+
+    tick = diverges(inputs)
+    if tick is None:
+        return inputs
+    current = bytearray(inputs[:tick + 1])
+    chunk = max(1, len(current) // 2)
+    while chunk >= 1 and time.perf_counter() < deadline:
+        changed = False
+        for start in range(0, len(current), chunk):
+            if time.perf_counter() >= deadline:
+                break
+            trial = bytearray(current)
+            for i in range(start, min(len(trial), start + chunk)):
+                prev = trial[i - 1] if i > 0 else 0
+                if trial[i] != INPUT_RESET and prev != INPUT_RESET:
+                    trial[i] = prev
+            if trial == current:
+                continue
+            new_tick = diverges(bytes(trial))
+            if new_tick is not None:
+                current = trial[:new_tick + 1]
+                changed = True
+        if not changed:
+            chunk //= 2
+    return bytes(current)
+
+
+# ====== 多进程 ======
+def _init_worker(frames: bool) -> None:
+    if frames:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        pg.init()
+
+
+def _run_seed(reference: str, target: str, seed: int, ticks: int, chaos: float,
+              frame_every: int, pixel_tol: int, pixel_count: int, frame_size: tuple[int, int]) -> dict:
+    result = run_pair(reference, target, seed, None, ticks, chaos, frame_every, pixel_tol, pixel_count,
+                      frame_size)
+    if result["divergence"] is None:
+        result.pop("inputs")
+    return result
+
+
+def run(args) -> int:
+    started = time.perf_counter()
+    per_seed = -(-args.ticks // args.seeds)
+    seeds = [args.seed + i for i in range(args.seeds)]
+    frames = args.frame_every > 0
+    total = games = 0
+    failures = []
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(frames,)) as pool:
+        futures = [pool.submit(_run_seed, args.reference, args.engine, seed, per_seed, args.chaos,
+                               args.frame_every, args.pixel_tol, args.pixel_count, tuple(args.frame_size))
+                   for seed in seeds]
+        for future in as_completed(futures):
+            result = future.result()
+            total += result["ticks"]
+            games += result["games"]
+            if result["divergence"] is not None:
+                failures.append(result)
+            elapsed = time.perf_counter() - started
+            print(f"\r{total} ticks  {games} games  {total / elapsed:8.0f} ticks/s  "
+                  f"{len(failures)} divergent seeds", end="", flush=True)
+    print()
+    if not failures:
+        print(f"{args.reference} == {args.engine} for {total} ticks")
+        return 0
+
+    failure = min(failures, key=lambda r: (r["divergence"]["tick"], r["seed"]))
+    div = failure["divergence"]
+    print(f"first divergence: seed {failure['seed']} tick {div['tick']}: {div['what']}")
+    if frames:
+        _init_worker(True)
+    kwargs = {"frame_every": args.frame_every, "pixel_tol": args.pixel_tol, "pixel_count": args.pixel_count,
+              "frame_size": tuple(args.frame_size)}
+    minimal = minimize(args.reference, args.engine, failure["seed"], failure["inputs"], **kwargs)
+    turns = sum(1 for i in range(1, len(minimal)) if minimal[i] != minimal[i - 1])
+    save(args.out, failure["seed"], minimal)
+    print(f"minimal replay: {len(minimal)} ticks, {turns} input changes -> {args.out}")
+    print(f"  python parity.py repro {args.out} --engine {args.engine}")
+    return 1
+
+
+def repro(args) -> int:
+    seed, _, inputs = load(args.replay)
+    if args.frame_every:
+        _init_worker(True)
+    result = run_pair(args.reference, args.engine, seed, inputs, frame_every=args.frame_every,
+                      pixel_tol=args.pixel_tol, pixel_count=args.pixel_count,
+                      frame_size=tuple(args.frame_size))
+    div = result["divergence"]
+    if div is None:
+        print(f"no divergence in {result['ticks']} ticks")
+        return 0
+    print(f"tick {div['tick']}: {div['what']}")
+    return 1
+
+
+# ====== Shader ======
+def _roll_max_reference(mask: np.ndarray, radius: int) -> np.ndarray:
+    out = mask.copy()
+    for r in range(1, radius + 1):
+        out = np.maximum(out, np.roll(mask, r, axis=0))
+        out = np.maximum(out, np.roll(mask, -r, axis=0))
+        out = np.maximum(out, np.roll(mask, r, axis=1))
+        out = np.maximum(out, np.roll(mask, -r, axis=1))
+    return out
+
+
+def _field_reference(w: int, h: int, t: float) -> np.ndarray:
+    """工作区缓存之前的 gen_1024_field 原样抄录：每帧重建坐标网格、字样蒙版、描边与发光，
+    不读写 shader 的工作区。底图/调色/扫描线/暗角是效果设计而非优化对象，沿用 shader 的；
+    发光半径基线固定为 6，这里取 shader.GLOW_RADIUS（默认同为 6）以便按画质档位对照"""
+    yy, xx = np.mgrid[0:h, 0:w]
+    nx = (xx - w * 0.5) / (0.5 * w)
+    ny = (yy - h * 0.5) / (0.5 * h)
+
+    if shader.VARIANT == "metaballs":
+        base, a1, a2 = shader._field_metaballs(nx, ny, t)
+    elif shader.VARIANT == "kaleido":
+        base, a1, a2 = shader._field_kaleido(nx, ny, t)
+    else:
+        base, a1, a2 = shader._field_vortex(nx, ny, t)
+    scan = shader._scanlines(h, w, t)
+    vig = shader._vignette(nx, ny)
+    base = np.clip(base * scan * vig, 0.0, 1.0)
+
+    font_target_height = int(h * 0.60)
+    font_target_width = int(w * 0.92)
+    font = pg.font.SysFont(shader.FONT_NAME, max(24, int(font_target_height)), bold=True)
+    text_surface = font.render(shader.TEXT_STRING, True, shader.TEXT_COLOR)
+    tw, th = text_surface.get_width(), text_surface.get_height()
+    scale = min(max(1, int(font_target_width / max(1, tw))), max(1, int(font_target_height / max(1, th))))
+    sw = max(1, int(tw * scale))
+    sh = max(1, int(th * scale))
+    text_scaled = pg.transform.smoothscale(text_surface, (sw, sh))
+    alpha_hw = (pg.surfarray.array_alpha(text_scaled).astype(np.float32) / 255.0).T
+    mask = np.zeros((h, w), dtype=np.float32)
+    sy = (h - sh) // 2
+    sx = (w - sw) // 2
+    mask[sy:sy + sh, sx:sx + sw] = alpha_hw
+
+    stroke = np.clip(_roll_max_reference(mask, shader.STROKE_SIZE) - mask, 0.0, 1.0)
+    glow = _roll_max_reference(mask, shader.GLOW_RADIUS)
+    if glow.max() > 1e-6:
+        glow = glow / glow.max()
+    glow = glow ** 0.85
+
+    r0, g0, b0 = shader._palette_neon(base, a1, a2)
+    r = r0 + shader.GLOW_STRENGTH * glow + shader.STROKE_INTENSITY * stroke * 0.3
+    g = g0 + shader.GLOW_STRENGTH * glow * 0.75 + shader.STROKE_INTENSITY * stroke * 0.5
+    b = b0 + shader.GLOW_STRENGTH * glow * 0.95 + shader.STROKE_INTENSITY * stroke * 0.2
+    r = np.where(mask > 0.5, np.clip(r + 0.6, 0, 1), r)
+    g = np.where(mask > 0.5, np.clip(g + 0.6, 0, 1), g)
+    b = np.where(mask > 0.5, np.clip(b + 0.6, 0, 1), b)
+    if shader.CHROM_AB_SHIFT > 0:
+        r = np.roll(r, +shader.CHROM_AB_SHIFT, axis=1)
+        b = np.roll(b, -shader.CHROM_AB_SHIFT, axis=1)
+
+    img_hw = np.zeros((h, w, 3), dtype=np.uint8)
+    img_hw[..., 0] = np.clip(r * 255.0, 0, 255).astype(np.uint8)
+    img_hw[..., 1] = np.clip(g * 255.0, 0, 255).astype(np.uint8)
+    img_hw[..., 2] = np.clip(b * 255.0, 0, 255).astype(np.uint8)
+    return np.transpose(img_hw, (1, 0, 2))
+
+
+def _field_cached(w: int, h: int, t: float) -> np.ndarray:
+    """现行路径：按 (w, h, 发光半径) 复用工作区"""
+    return shader.gen_1024_field(w, h, t)
+
+
+def _field_premask(w: int, h: int, t: float) -> np.ndarray:
+    """菜单预热路径：字样蒙版先渲染好再交给 resize_workspace"""
+    shader.resize_workspace(w, h, shader.text_mask(w, h))
+    return shader.gen_1024_field(w, h, t)
+
+
+def _field_scaled(scale: float) -> Callable[[int, int, float], np.ndarray]:
+    """画质档位路径：低分辨率计算后 smoothscale 放大"""
+    def field(w: int, h: int, t: float) -> np.ndarray:
+        sw, sh = max(1, int(w * scale)), max(1, int(h * scale))
+        img = shader.gen_1024_field(sw, sh, t)
+        surf = pg.transform.smoothscale(pg.surfarray.make_surface(img), (w, h))
+        return pg.surfarray.array3d(surf)
+    return field
+
+
+# 名称 -> (实现, 默认容差：逐像素最大通道差的平均值上限)
+FIELD_VARIANTS: dict[str, tuple[Callable[[int, int, float], np.ndarray], float]] = {
+    "cached": (_field_cached, 0.0),
+    "premask": (_field_premask, 0.0),
+    "scaled-0.75": (_field_scaled(0.75), 20.0),
+    "scaled-0.5": (_field_scaled(0.5), 30.0),
+}
+
+
+def field(args) -> int:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pg.init()
+    w, h = args.size
+    failed = 0
+    for name in args.variants or list(FIELD_VARIANTS):
+        fn, tol = FIELD_VARIANTS[name]
+        tol = tol if args.tol is None else args.tol
+        worst_max = worst_p99 = worst_mean = 0.0
+        for variant in ("vortex", "metaballs", "kaleido"):
+            shader.set_variant(variant)
+            for i in range(args.samples):
+                t = i * 0.37
+                ref = _field_reference(w, h, t).astype(np.int16)
+                alt = fn(w, h, t).astype(np.int16)
+                delta = np.abs(ref - alt).max(axis=2)
+                worst_max = max(worst_max, float(delta.max()))
+                worst_p99 = max(worst_p99, float(np.percentile(delta, 99)))
+                worst_mean = max(worst_mean, float(delta.mean()))
+        # 缩放类实现在字形边缘/扫描线上必然有大差值：按平均差判定，max / p99 仅供参考
+        ok = worst_mean <= tol
+        failed += not ok
+        print(f"{name:<14} max {worst_max:5.0f}  p99 {worst_p99:5.0f}  mean {worst_mean:6.2f}  "
+              f"tol {tol:5.2f}  {'ok' if ok else 'FAIL'}")
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="VibeSnake 参考实现与优化实现的差分对拍")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("run", "repro"):
+        p = sub.add_parser(name)
+        if name == "repro":
+            p.add_argument("replay")
+        p.add_argument("--reference", choices=sorted(ENGINES), default="reference")
+        p.add_argument("--engine", choices=sorted(ENGINES), default="ringbuffer")
+        p.add_argument("--frame-every", type=int, default=0, help="每隔多少 tick 比较一次画面（0 = 不比较）")
+        p.add_argument("--pixel-tol", type=int, default=0, help="单通道允许的最大差值")
+        p.add_argument("--pixel-count", type=int, default=0, help="允许超出容差的像素数")
+        p.add_argument("--frame-size", type=int, nargs=2, default=FRAME_SIZE, metavar=("W", "H"),
+                       help="比较画面时的窗口尺寸")
+    p_run = sub.choices["run"]
+    p_run.add_argument("--ticks", type=int, default=1_000_000)
+    p_run.add_argument("--seeds", type=int, default=8)
+    p_run.add_argument("--seed", type=int, default=0)
+    p_run.add_argument("--chaos", type=float, default=DEFAULT_CHAOS, help="随机转向概率")
+    p_run.add_argument("--workers", type=int, default=None)
+    p_run.add_argument("--out", default="divergence.vsr", help="最小复现录像的输出路径")
+    p_field = sub.add_parser("field", help="比较 gen_1024_field 的各实现")
+    p_field.add_argument("--variants", nargs="*", choices=sorted(FIELD_VARIANTS))
+    p_field.add_argument("--size", type=int, nargs=2, default=(806, 302), metavar=("W", "H"))
+    p_field.add_argument("--samples", type=int, default=4, help="每种效果取样的时间点数")
+    p_field.add_argument("--tol", type=float, default=None, help="覆盖各实现的默认容差（平均差）")
+    args = parser.parse_args()
+    raise SystemExit({"run": run, "repro": repro, "field": field}[args.command](args))
+
+
+if __name__ == "__main__":
+    main()
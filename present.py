@@ -0,0 +1,51 @@
+# present.py
+from __future__ import annotations
+
+from typing import Iterable
+
+import pygame as pg
+
+import render_backend
+
+# ---------------- 画面提交：脏矩形优先，过多时退回整屏 flip ----------------
+
+
+class Presenter:
+    def __init__(self, max_dirty_ratio: float = 0.45, max_rects: int = 256):
+        self.max_dirty_ratio = max_dirty_ratio
+        self.max_rects = max_rects
+        self._dirty: list[pg.Rect] = []
+        self._previous: list[pg.Rect] = []  # 上一帧画过的区域，本帧需要擦除后提交
+        self._full = True
+        self.last_was_full = True
+
+    def mark(self, *rects: pg.Rect) -> None:
+        self._dirty.extend(rects)
+
+    def mark_many(self, rects: Iterable[pg.Rect]) -> None:
+        self._dirty.extend(rects)
+
+    def mark_full(self) -> None:
+        """尺寸变化、覆盖层切换等整屏变化时调用"""
+        self._full = True
+
+    def present(self) -> None:
+        backend = render_backend.active()
+        screen = backend.get_surface()
+        if screen is None:
+            return
+        current = self._dirty
+        # 相同矩形只提交一次（棋盘、HUD 等位置通常逐帧不变）
+        rects = list({tuple(r): r for r in self._previous + current}.values())
+        self._previous = current
+        self._dirty = []
+
+        full = self._full or len(rects) > self.max_rects
+        if not full:
+            # 重叠面积按重复计算：偏保守，宁可多 flip
+            screen_area = max(1, screen.get_width() * screen.get_height())
+            dirty_area = sum(r.width * r.height for r in rects)
+            full = dirty_area > screen_area * self.max_dirty_ratio
+        self._full = False
+        self.last_was_full = full
+        backend.present(None if full else rects)
@@ -0,0 +1,96 @@
+# quality.py
+from __future__ import annotations
+
+import os
+
+# ---------------- 画质调节：按帧耗时自动升降档 ----------------
+# 每帧把“实际工作耗时”（不含等待下一帧的睡眠）交给 observe()；
+# 平滑后的耗时持续超出预算就降一档，持续远低于预算才升一档（升档门槛更严、需要更久），
+# 且每次换档后有冷却期——避免在临界点来回跳档。
+# 各组件每帧读取 active().settings，自行判断是否需要重建缓存。
+# 环境变量 VIBESNAKE_QUALITY=high/medium/low/minimal 可固定档位（默认 auto）。
+
+QUALITY_ENV = "VIBESNAKE_QUALITY"
+
+# 0 = 最高画质
+LEVELS: tuple[dict, ...] = (
+    {"name": "high", "shader_scale": 1.0, "glow_radius": 6, "codewall_density": 1.0,
+     "codewall_alpha": "blend", "bean_detail": True, "smoothscale": True},
+    {"name": "medium", "shader_scale": 0.75, "glow_radius": 4, "codewall_density": 0.75,
+     "codewall_alpha": "blend", "bean_detail": True, "smoothscale": True},
+    {"name": "low", "shader_scale": 0.5, "glow_radius": 3, "codewall_density": 0.5,
+     "codewall_alpha": "key", "bean_detail": False, "smoothscale": False},
+    {"name": "minimal", "shader_scale": 0.35, "glow_radius": 2, "codewall_density": 0.3,
+     "codewall_alpha": "key", "bean_detail": False, "smoothscale": False},
+)
+
+FRAME_BUDGET_MS = 1000.0 / 60.0
+DOWNGRADE_RATIO = 1.10   # 平滑耗时 > 预算 * 1.10 ...
+DOWNGRADE_FRAMES = 15    # ... 连续这么多帧则降档
+UPGRADE_RATIO = 0.60     # 平滑耗时 < 预算 * 0.60 ...
+UPGRADE_FRAMES = 180     # ... 连续这么多帧才升档
+COOLDOWN_FRAMES = 30     # 换档后至少观察这么多帧
+EMA_ALPHA = 0.1
+
+
+class QualityGovernor:
+    def __init__(self, budget_ms: float = FRAME_BUDGET_MS, level: int = 0, fixed: bool = False):
+        self.budget_ms = budget_ms
+        self.level_index = max(0, min(len(LEVELS) - 1, level))
+        self.fixed = fixed
+        self.frame_ms: float | None = None  # 平滑后的帧耗时
+        self.changes = 0
+        self._over = 0
+        self._under = 0
+        self._since_change = 0
+
+    @property
+    def settings(self) -> dict:
+        return LEVELS[self.level_index]
+
+    @property
+    def level_name(self) -> str:
+        return self.settings["name"]
+
+    def set_level(self, level: int) -> None:
+        level = max(0, min(len(LEVELS) - 1, level))
+        if level != self.level_index:
+            self.level_index = level
+            self.changes += 1
+        # 换档后重新开始计数，旧档位的耗时不再参考
+        self.frame_ms = None
+        self._over = self._under = self._since_change = 0
+
+    def observe(self, work_ms: float) -> int:
+        """记录一帧的工作耗时；返回当前档位"""
+        if self.fixed:
+            return self.level_index
+        self.frame_ms = work_ms if self.frame_ms is None else (
+            self.frame_ms + EMA_ALPHA * (work_ms - self.frame_ms))
+        self._since_change += 1
+        if self._since_change < COOLDOWN_FRAMES:
+            return self.level_index
+
+        self._over = self._over + 1 if self.frame_ms > self.budget_ms * DOWNGRADE_RATIO else 0
+        self._under = self._under + 1 if self.frame_ms < self.budget_ms * UPGRADE_RATIO else 0
+        if self._over >= DOWNGRADE_FRAMES and self.level_index < len(LEVELS) - 1:
+            self.set_level(self.level_index + 1)
+        elif self._under >= UPGRADE_FRAMES and self.level_index > 0:
+            self.set_level(self.level_index - 1)
+        return self.level_index
+
+
+_active: QualityGovernor | None = None
+
+
+def active() -> QualityGovernor:
+    """全局唯一的调节器（菜单与游戏共用，档位跨页面保留）"""
+    global _active
+    if _active is None:
+        value = os.environ.get(QUALITY_ENV, "auto").lower()
+        names = [level["name"] for level in LEVELS]
+        if value in names:
+            _active = QualityGovernor(level=names.index(value), fixed=True)
+        else:
+            _active = QualityGovernor()
+    return _active
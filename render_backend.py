@@ -0,0 +1,268 @@
+# render_backend.py
+from __future__ import annotations
+
+import os
+
+import pygame as pg
+
+# ---------------- 渲染后端 ----------------
+# surface      —— 默认：软件 Surface 合成，display.flip/update 提交
+# sdl2         —— pygame._sdl2.video 的 Window/Renderer/Texture：
+#                 豆子/蛇身精灵只上传一次纹理，棋盘缩放交给 Renderer
+# sdl2-software —— 同上，但强制使用 SDL 软件渲染器（无 GPU 环境可测）
+# 启动时读取环境变量 VIBESNAKE_RENDERER 选择，sdl2 初始化失败时回退到 surface。
+
+BACKEND_ENV = "VIBESNAKE_RENDERER"
+SCALE_QUALITY_HINT = "SDL_RENDER_SCALE_QUALITY"
+
+
+class SurfaceBackend:
+    name = "surface"
+
+    def __init__(self):
+        self.board_surface: pg.Surface | None = None
+        self.entities_surface: pg.Surface | None = None
+        self._entities_to_blit: pg.Surface | None = None
+        self._board_dest: pg.Rect | None = None
+
+    # ---------- 窗口 ----------
+    def open(self, size, caption: str) -> pg.Surface:
+        pg.display.set_caption(caption)
+        return pg.display.set_mode(size, pg.RESIZABLE)
+
+    def get_surface(self) -> pg.Surface | None:
+        return pg.display.get_surface()
+
+    def resize(self, size) -> pg.Surface:
+        return pg.display.set_mode(size, pg.RESIZABLE)
+
+    def present(self, rects: list[pg.Rect] | None = None) -> None:
+        if rects is None:
+            pg.display.flip()
+        elif rects:
+            pg.display.update(rects)
+
+    # ---------- 棋盘：底色 -> (代码雨) -> 实体 ----------
+    def begin_board(self, screen: pg.Surface, game, dest_rect: pg.Rect,
+                    use_integer_scale: bool, dest_size) -> None:
+        board_pixels = game.board_pixels
+        if self.board_surface is None:
+            self.board_surface = pg.Surface((board_pixels, board_pixels))
+            self.entities_surface = pg.Surface((board_pixels, board_pixels), pg.SRCALPHA)
+        self.board_surface.fill(game.board_color)
+        self.entities_surface.fill((0, 0, 0, 0))
+        sprites = game.sprites
+        self.entities_surface.blits([(sprites[key], pos) for key, pos in game.entity_blits()],
+                                    doreturn=False)
+
+        # 缩放并贴到屏幕
+        if use_integer_scale:
+            if dest_size[0] == board_pixels:
+                board_to_blit = self.board_surface
+                entities_to_blit = self.entities_surface
+            else:
+                board_to_blit = pg.transform.scale(self.board_surface, dest_size)
+                entities_to_blit = pg.transform.scale(self.entities_surface, dest_size)
+        else:
+            # 低画质档位用最近邻缩放代替 smoothscale
+            scale = pg.transform.smoothscale if game.smooth_scaling else pg.transform.scale
+            board_to_blit = (self.board_surface if self.board_surface.get_size() == dest_size
+                             else scale(self.board_surface, dest_size))
+            entities_to_blit = (self.entities_surface if self.entities_surface.get_size() == dest_size
+                                else scale(self.entities_surface, dest_size))
+        screen.blit(board_to_blit, dest_rect)
+        self._entities_to_blit = entities_to_blit
+        self._board_dest = dest_rect
+
+    def finish_board(self, screen: pg.Surface) -> None:
+        # 让实体在最前
+        screen.blit(self._entities_to_blit, self._board_dest)
+
+    def overlay_layer(self, screen: pg.Surface) -> pg.Surface:
+        return screen
+
+    def capture(self, screen: pg.Surface) -> pg.Surface:
+        """读回本帧的最终画面（不提交），供对拍/截图"""
+        return screen.copy()
+
+
+class SDL2Backend:
+    """Renderer 合成顺序：软件画布（背景/代码雨/HUD）-> 棋盘纹理 -> 覆盖层。
+    棋盘内的代码雨因此总在棋盘之下；游戏内子块全部激活时与 surface 后端输出一致。"""
+
+    name = "sdl2"
+
+    def __init__(self, software: bool = False):
+        from pygame._sdl2 import video
+
+        self._video = video
+        self.software = software
+        self.window = None
+        self.renderer = None
+        self.canvas: pg.Surface | None = None
+        self._canvas_tex = None
+        self._overlay: pg.Surface | None = None
+        self._overlay_tex = None
+        self._overlay_used = False
+        self._board_tex = None
+        self._board_nearest: bool | None = None
+        self._board_dest: pg.Rect | None = None
+        self._capture_tex = None
+        self._textures: dict[str, object] = {}
+        self._sprite_ids: dict[str, int] = {}
+
+    # ---------- 窗口 ----------
+    def open(self, size, caption: str) -> pg.Surface:
+        video = self._video
+        self.window = video.Window(caption, size=size, resizable=True)
+        self.renderer = video.Renderer(self.window, index=-1,
+                                       accelerated=0 if self.software else -1,
+                                       target_texture=True)
+        return self.resize(size)
+
+    def get_surface(self) -> pg.Surface | None:
+        if self.window is None:
+            return None
+        # 窗口被系统缩放后画布跟随
+        if self.canvas is None or self.canvas.get_size() != tuple(self.window.size):
+            self.resize(self.window.size)
+        return self.canvas
+
+    def resize(self, size) -> pg.Surface:
+        size = (max(1, size[0]), max(1, size[1]))
+        if tuple(self.window.size) != size:
+            self.window.size = size
+        self.canvas = pg.Surface(size)
+        self._canvas_tex = self._video.Texture(self.renderer, size, streaming=True)
+        self._overlay = pg.Surface(size, pg.SRCALPHA)
+        self._overlay_tex = self._video.Texture(self.renderer, size, streaming=True)
+        self._overlay_tex.blend_mode = 1  # SDL_BLENDMODE_BLEND
+        return self.canvas
+
+    def present(self, rects: list[pg.Rect] | None = None) -> None:
+        canvas = self.canvas
+        if canvas is None:
+            return
+        # 画布只上传变化区域
+        if rects is None:
+            self._canvas_tex.update(canvas)
+        else:
+            bounds = canvas.get_rect()
+            for rect in rects:
+                rect = pg.Rect(rect).clip(bounds)
+                if rect.width and rect.height:
+                    self._canvas_tex.update(canvas.subsurface(rect), rect)
+
+        self._compose()
+        self.renderer.present()
+        self._board_dest = None
+        self._overlay_used = False
+
+    def _compose(self) -> None:
+        r = self.renderer
+        r.draw_color = (0, 0, 0, 255)
+        r.clear()
+        self._canvas_tex.draw()
+        if self._board_dest is not None:
+            self._board_tex.draw(dstrect=self._board_dest)
+        if self._overlay_used:
+            self._overlay_tex.update(self._overlay)
+            self._overlay_tex.draw()
+
+    def capture(self, screen: pg.Surface) -> pg.Surface:
+        """按 present() 的顺序合成到离屏纹理再读回（不提交），供对拍/截图"""
+        size = self.canvas.get_size()
+        if self._capture_tex is None or self._capture_tex.get_rect().size != size:
+            self._capture_tex = self._video.Texture(self.renderer, size, target=True)
+        self._canvas_tex.update(self.canvas)
+        r = self.renderer
+        r.target = self._capture_tex
+        try:
+            self._compose()
+            return r.to_surface()
+        finally:
+            r.target = None
+
+    # ---------- 棋盘 ----------
+    def _texture(self, key: str, surface: pg.Surface):
+        tex = self._textures.get(key)
+        if tex is None or self._sprite_ids.get(key) != id(surface):
+            tex = self._video.Texture.from_surface(self.renderer, surface)
+            tex.blend_mode = 1
+            self._textures[key] = tex
+            self._sprite_ids[key] = id(surface)
+        return tex
+
+    def _scaled_texture(self, size, nearest: bool):
+        # SDL 只在创建纹理时读取这个提示：用完即还原，不影响画布/覆盖层/精灵纹理
+        previous = os.environ.get(SCALE_QUALITY_HINT)
+        os.environ[SCALE_QUALITY_HINT] = "nearest" if nearest else "linear"
+        try:
+            return self._video.Texture(self.renderer, size, target=True)
+        finally:
+            if previous is None:
+                del os.environ[SCALE_QUALITY_HINT]
+            else:
+                os.environ[SCALE_QUALITY_HINT] = previous
+
+    def begin_board(self, screen: pg.Surface, game, dest_rect: pg.Rect,
+                    use_integer_scale: bool, dest_size) -> None:
+        r = self.renderer
+        if self._board_tex is None or self._board_nearest != use_integer_scale:
+            # 缩放质量在纹理创建时确定：整数倍放大用最近邻，其余用线性；
+            # 窗口在两种缩放之间切换时重建纹理
+            self._board_tex = self._scaled_texture((game.board_pixels, game.board_pixels), use_integer_scale)
+            self._board_nearest = use_integer_scale
+        r.target = self._board_tex
+        r.draw_color = (*game.board_color, 255)
+        r.clear()
+        sprites = game.sprites
+        textures = {key: self._texture(key, surf) for key, surf in sprites.items()}
+        cell = game.cell_pixels
+        for key, (x, y) in game.entity_blits():
+            textures[key].draw(dstrect=(x, y, cell, cell))
+        r.target = None
+        self._board_dest = dest_rect
+
+    def finish_board(self, screen: pg.Surface) -> None:
+        pass
+
+    def overlay_layer(self, screen: pg.Surface) -> pg.Surface:
+        if not self._overlay_used:
+            self._overlay.fill((0, 0, 0, 0))
+            self._overlay_used = True
+        return self._overlay
+
+
+_active: SurfaceBackend | SDL2Backend | None = None
+
+
+def select(name: str | None = None) -> SurfaceBackend | SDL2Backend:
+    """启动时选择后端（默认读取环境变量）；之后通过 active() 取用"""
+    global _active
+    name = (name or os.environ.get(BACKEND_ENV, "surface")).lower()
+    backend: SurfaceBackend | SDL2Backend = SurfaceBackend()
+    if name in ("sdl2", "sdl2-software"):
+        try:
+            backend = SDL2Backend(software=name == "sdl2-software")
+        except ImportError:
+            backend = SurfaceBackend()
+    _active = backend
+    return backend
+
+
+def open_window(size, caption: str) -> pg.Surface:
+    """用当前后端打开窗口；sdl2 创建失败（驱动不支持等）时回退到 surface"""
+    backend = active()
+    try:
+        return backend.open(size, caption)
+    except pg.error:
+        if isinstance(backend, SurfaceBackend):
+            raise
+    return select("surface").open(size, caption)
+
+
+def active() -> SurfaceBackend | SDL2Backend:
+    if _active is None:
+        return select()
+    return _active
@@ -0,0 +1,261 @@
+# replay.py
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import random
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame as pg
+
+import render_backend
+from codewall import CodeWall
+from game import (HUD_RESERVED_HEIGHT, INPUT_DIRECTIONS, INPUT_RESET, MOVE_FPS, REPLAY_ENV,
+                  SnakeGame, Vec2)
+
+# ---------------- 录像：种子 + 逐 tick 输入，离线多进程导出帧序列 ----------------
+# 对局逻辑只依赖种子与每个 tick 采用的方向，因此录像就是“种子 + 输入字节流”
+# （见 game.INPUT_DIRECTIONS / INPUT_RESET）。导出分两步：
+# 1) 主进程无界面快速重放一遍（不绘制），在每段开头记下关键帧：
+#    SnakeGame.snapshot() + CodeWall 动画状态；
+# 2) 各段交给进程池，工作进程在 SDL dummy 驱动下从关键帧恢复，
+#    逐帧走 game_loop 同一条路径（CodeWall.advance -> SnakeGame.render）写出 PNG 或原始 RGB 帧。
+# 死亡/彩蛋后的结算画面停留 HOLD_SECONDS 秒再进入下一局（录像里不记录结算页停留时长）。
+#
+#   VIBESNAKE_REPLAY=run.vsr python main.py                    # 游戏时录制
+#   python replay.py export run.vsr frames/ --fps 60 --workers 8
+#   python replay.py export run.vsr frames/ --format raw       # frames_*.rgb，可直接喂给 ffmpeg
+# 单帧耗时里 PNG 压缩往往比渲染本身还贵，追求速度时用 --format tga 或 raw。
+
+REPLAY_MAGIC = b"VSRP"
+REPLAY_VERSION = 1
+_HEADER = struct.Struct("<4sBqdI")  # magic, 版本, 种子, 每秒 tick 数, 输入字节数
+
+DEFAULT_SIZE = (1152, 864)  # 与 main.py 的窗口尺寸一致
+DEFAULT_FPS = 60
+CHUNK_SECONDS = 10.0
+HOLD_SECONDS = 1.5
+CODEWALL_SEED = 1024
+
+# 时间轴上的一步 = 一个 tick 的时长：0~3 = 按该方向推进一个 tick
+STEP_HOLD = 4    # 不推进（结算画面停留）
+STEP_RESET = 5   # 重开
+
+
+# ====== 文件 ======
+def save(path: str, seed: int, inputs: bytes, move_fps: float = MOVE_FPS) -> None:
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed, move_fps, len(inputs)))
+        f.write(inputs)
+
+
+def load(path: str) -> tuple[int, float, bytes]:
+    """返回 (种子, 每秒 tick 数, 输入字节流)"""
+    with open(path, "rb") as f:
+        blob = f.read()
+    magic, version, seed, move_fps, n = _HEADER.unpack_from(blob)
+    if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+        raise ValueError(f"unsupported replay: {magic!r} v{version}")
+    inputs = blob[_HEADER.size:_HEADER.size + n]
+    if len(inputs) != n:
+        raise ValueError("truncated replay")
+    return seed, move_fps, inputs
+
+
+class ReplayRecorder:
+    def __init__(self, path: str, seed: int | None = None):
+        self.path = path
+        self.seed = random.randrange(1 << 62) if seed is None else seed
+        self.game: SnakeGame | None = None
+
+    def attach(self, game: SnakeGame) -> None:
+        """game 须以 self.seed 创建"""
+        self.game = game
+        game.input_log = bytearray()
+
+    def close(self) -> None:
+        game = self.game
+        if game is None or game.input_log is None:
+            return
+        save(self.path, self.seed, bytes(game.input_log), 1.0 / game.move_interval)
+        game.input_log = None
+
+
+def from_env() -> ReplayRecorder | None:
+    path = os.environ.get(REPLAY_ENV, "")
+    if path in ("", "0"):
+        return None
+    return ReplayRecorder(path)
+
+
+# ====== 重放 ======
+class ReplayDriver:
+    """按录像给出方向（挂在 game.autopilot 上，接口与 Autopilot 相同）"""
+
+    def __init__(self):
+        self.direction: Vec2 = (1, 0)
+
+    def choose(self, game: SnakeGame) -> Vec2:
+        return self.direction
+
+
+def build_timeline(inputs: bytes, hold_steps: int) -> bytes:
+    steps = bytearray()
+    for code in inputs:
+        if code == INPUT_RESET:
+            steps += bytes([STEP_HOLD]) * hold_steps
+            steps.append(STEP_RESET)
+        else:
+            steps.append(code)
+    steps += bytes([STEP_HOLD]) * hold_steps
+    return bytes(steps)
+
+
+def apply_step(game: SnakeGame, driver: ReplayDriver, step: int) -> None:
+    if step == STEP_RESET:
+        game.reset()
+    elif step < STEP_HOLD:
+        driver.direction = INPUT_DIRECTIONS[step]
+        game.move_timer = 0.0
+        game.update(game.move_interval)
+
+
+def _frame_plan(fps: int, move_fps: float) -> tuple[int, int]:
+    frames_per_step = round(fps / move_fps)
+    if frames_per_step < 1 or abs(frames_per_step * move_fps - fps) > 1e-6:
+        raise ValueError(f"fps must be a multiple of the tick rate ({move_fps:g})")
+    return frames_per_step, round(1000.0 / fps)
+
+
+def plan_chunks(seed: int, move_fps: float, inputs: bytes, fps: int,
+                size: tuple[int, int], chunk_steps: int) -> list[dict]:
+    """无界面重放一遍，每 chunk_steps 步记一个关键帧（对局快照 + 代码雨状态）"""
+    frames_per_step, dt_ms = _frame_plan(fps, move_fps)
+    timeline = build_timeline(inputs, round(HOLD_SECONDS * move_fps))
+    game = SnakeGame(rng_seed=seed)
+    game.set_move_fps(move_fps)
+    driver = game.autopilot = ReplayDriver()
+    code_wall = CodeWall(seed=CODEWALL_SEED)
+    stub = pg.Surface(size)
+
+    chunks = []
+    for start in range(0, len(timeline), chunk_steps):
+        steps = timeline[start:start + chunk_steps]
+        chunks.append({
+            "index": len(chunks),
+            "first_frame": start * frames_per_step,
+            "steps": steps,
+            "game": game.snapshot(),
+            "wall": code_wall.get_state(),
+        })
+        for step in steps:
+            apply_step(game, driver, step)
+            for _ in range(frames_per_step):
+                code_wall.set_score(game.score)
+                code_wall.advance(dt_ms, screen=stub, hud_height=HUD_RESERVED_HEIGHT)
+    return chunks
+
+
+# ====== 工作进程 ======
+_worker: dict = {}
+
+
+def _init_worker(size: tuple[int, int]) -> None:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pg.init()
+    _worker["screen"] = render_backend.select("surface").open(size, "VibeSnake replay")
+    _worker["code_wall"] = CodeWall(seed=CODEWALL_SEED)
+
+
+def render_chunk(chunk: dict, out_dir: str, fps: int, move_fps: float, fmt: str) -> int:
+    """从关键帧恢复并渲染一段，返回写出的帧数"""
+    screen = _worker["screen"]
+    code_wall = _worker["code_wall"]
+    code_wall.set_state(chunk["wall"])
+    frames_per_step, dt_ms = _frame_plan(fps, move_fps)
+    game = SnakeGame()
+    game.restore(chunk["game"])
+    driver = game.autopilot = ReplayDriver()
+
+    frame = chunk["first_frame"]
+    raw = open(os.path.join(out_dir, f"frames_{frame:07d}.rgb"), "wb") if fmt == "raw" else None
+    for step in chunk["steps"]:
+        apply_step(game, driver, step)
+        for k in range(frames_per_step):
+            game.move_timer = k / frames_per_step * game.move_interval
+            code_wall.set_score(game.score)
+            code_wall.advance(dt_ms, screen=screen, hud_height=HUD_RESERVED_HEIGHT)
+            game.render(screen, code_wall=code_wall)
+            if raw is not None:
+                raw.write(pg.image.tobytes(screen, "RGB"))
+            else:
+                pg.image.save(screen, os.path.join(out_dir, f"frame_{frame:07d}.{fmt}"))
+            frame += 1
+    if raw is not None:
+        raw.close()
+    return frame - chunk["first_frame"]
+
+
+def export(path: str, out_dir: str, fps: int = DEFAULT_FPS, size: tuple[int, int] = DEFAULT_SIZE,
+           workers: int | None = None, fmt: str = "png", chunk_seconds: float = CHUNK_SECONDS) -> None:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pg.font.init()
+    seed, move_fps, inputs = load(path)
+    os.makedirs(out_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    chunk_steps = max(1, round(chunk_seconds * move_fps))
+    chunks = plan_chunks(seed, move_fps, inputs, fps, size, chunk_steps)
+    planned = time.perf_counter()
+    total_steps = sum(len(c["steps"]) for c in chunks)
+    print(f"{len(inputs)} inputs -> {total_steps} ticks, {len(chunks)} chunks "
+          f"(keyframes in {planned - started:.1f}s)", flush=True)
+
+    # 父进程已经初始化过 SDL/字体，工作进程用 spawn 重新启动更稳妥
+    frames = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(size,)) as pool:
+        futures = [pool.submit(render_chunk, chunk, out_dir, fps, move_fps, fmt) for chunk in chunks]
+        for done, future in enumerate(as_completed(futures), 1):
+            frames += future.result()
+            print(f"\r{done}/{len(chunks)} chunks  {frames} frames", end="", flush=True)
+    elapsed = time.perf_counter() - started
+    video_seconds = frames / fps
+    print(f"\n{frames} frames in {elapsed:.1f}s  ({frames / elapsed:.1f} fps, "
+          f"{video_seconds / elapsed:.2f}x real time)")
+    if fmt == "raw":
+        print(f"cat {out_dir}/frames_*.rgb | ffmpeg -f rawvideo -pix_fmt rgb24 "
+              f"-s {size[0]}x{size[1]} -r {fps} -i - out.mp4")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="VibeSnake 录像离线导出")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_exp = sub.add_parser("export", help="把录像渲染成帧序列")
+    p_exp.add_argument("replay")
+    p_exp.add_argument("out_dir")
+    p_exp.add_argument("--fps", type=int, default=DEFAULT_FPS, help="须为 tick 频率的整数倍")
+    p_exp.add_argument("--size", type=int, nargs=2, default=DEFAULT_SIZE, metavar=("W", "H"))
+    p_exp.add_argument("--workers", type=int, default=None)
+    p_exp.add_argument("--format", choices=("png", "tga", "raw"), default="png",
+                       help="tga 为 RLE 压缩，写盘比 png 快数倍")
+    p_exp.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS, help="每段时长（秒）")
+    p_info = sub.add_parser("info", help="显示录像信息")
+    p_info.add_argument("replay")
+    args = parser.parse_args()
+    if args.command == "export":
+        export(args.replay, args.out_dir, args.fps, tuple(args.size), args.workers,
+               args.format, args.chunk_seconds)
+    else:
+        seed, move_fps, inputs = load(args.replay)
+        games = 1 + inputs.count(INPUT_RESET)
+        print(f"seed {seed}  {move_fps:g} ticks/s  {len(inputs) - games + 1} ticks  {games} games")
+
+
+if __name__ == "__main__":
+    main()
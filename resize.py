@@ -0,0 +1,43 @@
+# resize.py
+from __future__ import annotations
+
+from typing import Callable
+
+import pygame as pg
+
+import render_backend
+
+# ---------------- 窗口缩放合并 ----------------
+# 拖拽窗口边缘时一帧内可能收到许多 VIDEORESIZE：只取最后一个尺寸，
+# 且只调用一次 set_mode，再把新尺寸依次交给所有订阅的尺寸相关缓存。
+
+ResizeListener = Callable[[tuple[int, int]], None]
+
+
+class ResizeHub:
+    def __init__(self):
+        self._listeners: list[ResizeListener] = []
+
+    def subscribe(self, listener: ResizeListener) -> ResizeListener:
+        self._listeners.append(listener)
+        return listener
+
+    @staticmethod
+    def coalesce(events: list[pg.event.Event]) -> tuple[list[pg.event.Event], tuple[int, int] | None]:
+        """拿掉本帧所有 VIDEORESIZE，返回 (其余事件, 最后一个尺寸或 None)"""
+        size = None
+        rest = []
+        for event in events:
+            if event.type == pg.VIDEORESIZE:
+                size = (event.w, event.h)
+            else:
+                rest.append(event)
+        return rest, size
+
+    def apply(self, size: tuple[int, int]) -> pg.Surface:
+        """重设窗口一次并通知全部缓存；返回新的画布"""
+        screen = render_backend.active().resize(size)
+        size = screen.get_size()
+        for listener in self._listeners:
+            listener(size)
+        return screen
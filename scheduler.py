@@ -0,0 +1,63 @@
+# scheduler.py
+from __future__ import annotations
+
+import pygame as pg
+
+# ---------------- 帧调度：按画面状态决定等待方式 ----------------
+#   "ACTIVE"   —— 正常游戏，按满帧率 tick
+#   "ANIMATED" —— 有动画但无交互（如结算页背后的代码雨），降帧率
+#   "STATIC"   —— 画面静止，阻塞等待事件（带超时）
+# 窗口失焦或最小化时一律视为暂停：阻塞等待，且本帧 dt 记为 0。
+
+ACTIVE = "ACTIVE"
+ANIMATED = "ANIMATED"
+STATIC = "STATIC"
+
+
+class FrameScheduler:
+    def __init__(
+        self,
+        clock: pg.time.Clock,
+        active_fps: int = 60,
+        idle_fps: int = 20,
+        static_timeout_ms: int = 500,
+        paused_timeout_ms: int = 1000,
+    ):
+        self.clock = clock
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.static_timeout_ms = static_timeout_ms
+        self.paused_timeout_ms = paused_timeout_ms
+        self.focused = True
+        self.minimized = False
+
+    @property
+    def paused(self) -> bool:
+        return not self.focused or self.minimized
+
+    def note_event(self, event: pg.event.Event) -> None:
+        if event.type == pg.WINDOWFOCUSLOST:
+            self.focused = False
+        elif event.type == pg.WINDOWFOCUSGAINED:
+            self.focused = True
+        elif event.type == pg.WINDOWMINIMIZED:
+            self.minimized = True
+        elif event.type in (pg.WINDOWRESTORED, pg.WINDOWSHOWN, pg.WINDOWMAXIMIZED):
+            self.minimized = False
+
+    def next_events(self, mode: str = ACTIVE) -> tuple[list[pg.event.Event], int]:
+        """等待下一帧并取出本帧事件，返回 (events, dt_ms)；阻塞等待后 dt 为 0"""
+        if self.paused or mode == STATIC:
+            timeout = self.paused_timeout_ms if self.paused else self.static_timeout_ms
+            first = pg.event.wait(timeout)
+            events = pg.event.get()
+            if first.type != pg.NOEVENT:
+                events.insert(0, first)
+            self.clock.tick()  # 重置时钟，避免恢复后出现一帧巨大的 dt
+            dt_ms = 0
+        else:
+            dt_ms = self.clock.tick(self.active_fps if mode == ACTIVE else self.idle_fps)
+            events = pg.event.get()
+        for event in events:
+            self.note_event(event)
+        return events, dt_ms
@@ -0,0 +1,252 @@
+# server.py
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import struct
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from game import GRID_SIZE, INPUT_DIRECTIONS, MOVE_FPS, SnakeGame
+
+# ---------------- 无界面对局服务器 ----------------
+# 一个进程托管大量 SnakeGame，本地 TCP 或 Unix socket 二进制协议：
+# 客户端发转向，服务器每个 tick 推一条紧凑的增量更新。
+# 所有对局由同一个 asyncio 定时循环按 MOVE_FPS 统一推进（分批执行，批间让出事件循环）。
+#
+#   python server.py --port 10240          # 或 --unix /tmp/vibesnake.sock
+#   python loadtest.py --sessions 500      # 压测
+#
+# 帧格式：u32 负载长度 + u8 消息类型 + 负载（小端）
+# 客户端 -> 服务器
+#   MSG_NEW   i64 种子（-1 表示随机）          新建对局（每个连接一局，再发一次即重开）
+#   MSG_TURN  i8 dx, i8 dy                    转向（与键盘同一套队列规则；只接受四个单位方向）
+#   MSG_BYE   -                               结束
+# 服务器 -> 客户端
+#   MSG_STATE u32 对局 id + SnakeGame.snapshot()   完整状态（新建/重开后）
+#   MSG_TICK  见 _TICK_HEADER，其后为新增豆子 (u8 种类, u16 格子) 与移除豆子 u16 格子
+#             蛇身按“新蛇头 + 从尾部移除的节数”增量描述
+#   MSG_ERROR u8 错误码（ERR_*）               请求被拒绝，连接保持
+
+MSG_NEW = 1
+MSG_TURN = 2
+MSG_BYE = 3
+MSG_STATE = 16
+MSG_TICK = 17
+MSG_ERROR = 18
+
+ERR_BAD_TURN = 1
+
+FLAG_DEAD = 1
+FLAG_EASTER = 2
+
+BEAN_KINDS = ("green", "orange", "red")
+
+_FRAME_HEADER = struct.Struct("<IB")
+_NEW = struct.Struct("<q")
+_TURN = struct.Struct("<bb")
+_TICK_HEADER = struct.Struct("<IHBHHHH")  # tick, 分数, 状态位, 蛇头格子, 尾部移除节数, 新增豆子数, 移除豆子数
+_BEAN_ADD = struct.Struct("<BH")
+_ERROR = struct.Struct("<B")
+
+DEFAULT_PORT = 10240
+TICK_BATCH = 64                 # 每批推进的对局数，批间让出事件循环
+MAX_WRITE_BUFFER = 256 * 1024   # 客户端积压超过该值视为掉线
+STATS_INTERVAL = 5.0            # 秒
+
+
+def encode_frame(msg_type: int, payload: bytes = b"") -> bytes:
+    return _FRAME_HEADER.pack(len(payload), msg_type) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    length, msg_type = _FRAME_HEADER.unpack(await reader.readexactly(_FRAME_HEADER.size))
+    payload = await reader.readexactly(length) if length else b""
+    return msg_type, payload
+
+
+def decode_tick(payload: bytes) -> dict:
+    """把 MSG_TICK 负载解成字典（客户端/测试用）"""
+    tick, score, flags, head, popped, n_added, n_removed = _TICK_HEADER.unpack_from(payload)
+    offset = _TICK_HEADER.size
+    added = []
+    for _ in range(n_added):
+        kind, cell = _BEAN_ADD.unpack_from(payload, offset)
+        added.append((BEAN_KINDS[kind], (cell % GRID_SIZE, cell // GRID_SIZE)))
+        offset += _BEAN_ADD.size
+    removed = [(cell % GRID_SIZE, cell // GRID_SIZE)
+               for cell in struct.unpack_from(f"<{n_removed}H", payload, offset)]
+    return {
+        "tick": tick,
+        "score": score,
+        "dead": bool(flags & FLAG_DEAD),
+        "easter": bool(flags & FLAG_EASTER),
+        "head": (head % GRID_SIZE, head // GRID_SIZE),
+        "popped": popped,
+        "added": added,
+        "removed": removed,
+    }
+
+
+class Session:
+    def __init__(self, session_id: int, writer: asyncio.StreamWriter):
+        self.id = session_id
+        self.writer = writer
+        self.game: SnakeGame | None = None
+        self.tick = 0
+        self._known: list[set] = [set(), set(), set()]
+
+    def start(self, seed: int | None) -> None:
+        self.game = SnakeGame(rng_seed=seed)
+        self.tick = 0
+        self._known = [set(beans) for beans in self._bean_sets()]
+        self.writer.write(encode_frame(MSG_STATE, struct.pack("<I", self.id) + self.game.snapshot()))
+
+    def _bean_sets(self) -> tuple[set, set, set]:
+        game = self.game
+        return game.green_beans, game.orange_beans, game.red_beans
+
+    def step(self) -> None:
+        """推进一个 tick 并推送增量（对局已结束时不再推送）"""
+        game = self.game
+        if game is None or game.dead or game.easter_triggered:
+            return
+        head_before = game.snake[0]
+        length_before = len(game.snake)
+        game.update(game.move_interval)
+        self.tick += 1
+
+        head = game.snake[0] if game.snake else head_before
+        # 缩短致死时新蛇头也已经放上去又被移除
+        pushed = 1 if head != head_before or game.death_cause == "shrink" else 0
+        popped = length_before + pushed - len(game.snake)
+
+        # 豆子变化：只在数量变化或蛇头落在旧豆子上时做集合差
+        added: list[bytes] = []
+        removed: list[int] = []
+        for kind, (current, known) in enumerate(zip(self._bean_sets(), self._known)):
+            if len(current) == len(known) and head not in known:
+                continue
+            for x, y in known - current:
+                removed.append(y * GRID_SIZE + x)
+            for x, y in current - known:
+                added.append(_BEAN_ADD.pack(kind, y * GRID_SIZE + x))
+            self._known[kind] = set(current)
+
+        flags = (FLAG_DEAD if game.dead else 0) | (FLAG_EASTER if game.easter_triggered else 0)
+        payload = b"".join([
+            _TICK_HEADER.pack(self.tick, min(game.score, 0xFFFF), flags,
+                              head[1] * GRID_SIZE + head[0], popped, len(added), len(removed)),
+            *added,
+            struct.pack(f"<{len(removed)}H", *removed),
+        ])
+        self.writer.write(encode_frame(MSG_TICK, payload))
+
+
+class GameServer:
+    def __init__(self, move_fps: float = MOVE_FPS, batch: int = TICK_BATCH, verbose: bool = True):
+        self.interval = 1.0 / move_fps
+        self.batch = batch
+        self.verbose = verbose
+        self.sessions: dict[int, Session] = {}
+        self._next_id = 1
+        self.tick_ms: list[float] = []   # 本统计周期内每个 tick 的处理耗时
+        self.late_ticks = 0              # 处理超出一个 tick 周期的次数
+
+    # ---------- 连接 ----------
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = Session(self._next_id, writer)
+        self._next_id += 1
+        self.sessions[session.id] = session
+        try:
+            while True:
+                msg_type, payload = await read_frame(reader)
+                if msg_type == MSG_NEW:
+                    (seed,) = _NEW.unpack(payload)
+                    session.start(None if seed < 0 else seed)
+                elif msg_type == MSG_TURN and session.game is not None:
+                    turn = _TURN.unpack(payload)
+                    if turn in INPUT_DIRECTIONS:
+                        session.game.queue_turn(turn)
+                    else:
+                        writer.write(encode_frame(MSG_ERROR, _ERROR.pack(ERR_BAD_TURN)))
+                elif msg_type == MSG_BYE:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error):
+            pass
+        finally:
+            self.sessions.pop(session.id, None)
+            writer.close()
+
+    # ---------- 定时推进 ----------
+    async def run_ticks(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        last_stats = loop.time()
+        while True:
+            next_tick += self.interval
+            started = time.perf_counter()
+            sessions = list(self.sessions.values())
+            for i in range(0, len(sessions), self.batch):
+                for session in sessions[i:i + self.batch]:
+                    if session.id not in self.sessions:
+                        continue  # 让出事件循环期间断开的连接
+                    session.step()
+                    # 慢客户端：积压过多直接断开，不拖累其他对局
+                    if session.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                        session.writer.transport.abort()
+                        self.sessions.pop(session.id, None)
+                await asyncio.sleep(0)
+            elapsed = time.perf_counter() - started
+            self.tick_ms.append(elapsed * 1000.0)
+            if elapsed > self.interval:
+                self.late_ticks += 1
+
+            now = loop.time()
+            if self.verbose and now - last_stats >= STATS_INTERVAL:
+                self._print_stats()
+                last_stats = now
+            # 落后时不补 tick：直接对齐到下一个周期
+            if next_tick < now:
+                next_tick = now
+            await asyncio.sleep(next_tick - now)
+
+    def _print_stats(self) -> None:
+        samples = sorted(self.tick_ms)
+        self.tick_ms.clear()
+        if not samples:
+            return
+        print(f"sessions {len(self.sessions):5d}  tick p50 {samples[len(samples) // 2]:6.2f}ms  "
+              f"p99 {samples[min(len(samples) - 1, int(len(samples) * 0.99))]:6.2f}ms  "
+              f"max {samples[-1]:6.2f}ms  late {self.late_ticks}", flush=True)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                    unix_path: str | None = None) -> None:
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_client, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+        if self.verbose:
+            where = unix_path or f"{host}:{port}"
+            print(f"serving on {where} at {1.0 / self.interval:g} ticks/s", flush=True)
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run_ticks())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="VibeSnake 无界面对局服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="改用 Unix socket（路径）")
+    parser.add_argument("--fps", type=float, default=MOVE_FPS, help="每秒 tick 数")
+    args = parser.parse_args()
+    try:
+        asyncio.run(GameServer(args.fps).serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
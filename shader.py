@@ -2,8 +2,6 @@
 import numpy as np
 import pygame as pg
 
-pg.font.init()
-
 # ------------------ 配置 ------------------
 FONT_NAME = "Consolas, Menlo, Monospace"
 TEXT_COLOR = (255, 255, 255)
@@ -21,6 +19,12 @@ TEXT_STRING = "1024"
 GLOW_STRENGTH = 1.6     # 发光强度（加法）
 STROKE_SIZE = 3         # 描边膨胀像素（近似）
 STROKE_INTENSITY = 0.71 # 描边亮度
+GLOW_RADIUS = 6         # 发光膨胀半径（画质档位可调）
+
+def set_glow_radius(radius: int):
+    """调整发光半径；下一帧按新半径重建工作区"""
+    global GLOW_RADIUS
+    GLOW_RADIUS = max(1, int(radius))
 
 # 扫描线 & 暗角
 SCANLINE_STRENGTH = 0.10
@@ -116,31 +120,16 @@ def _field_kaleido(nx, ny, t):
     return np.clip(base, 0.0, 1.0), rings, lattice
 
 
-# ------------------ 主函数 ------------------
-def gen_1024_field(w, h, t):
-    """
-    生成动态底图 + '1024' 字形霓虹蒙版。
-    返回 (w, h, 3) 的 uint8。
-    """
-    # 坐标/归一化
-    yy, xx = np.mgrid[0:h, 0:w]
-    nx = (xx - w * 0.5) / (0.5 * w)
-    ny = (yy - h * 0.5) / (0.5 * h)
-
-    # 选择底图
-    if VARIANT == "metaballs":
-        base, a1, a2 = _field_metaballs(nx, ny, t)
-    elif VARIANT == "kaleido":
-        base, a1, a2 = _field_kaleido(nx, ny, t)
-    else:
-        base, a1, a2 = _field_vortex(nx, ny, t)
-
-    # 扫描线 + 暗角
-    scan = _scanlines(h, w, t)
-    vig = _vignette(nx, ny)
-    base = np.clip(base * scan * vig, 0.0, 1.0)
+# ------------------ 工作区缓存 ------------------
+# 坐标网格、暗角、文字蒙版及其描边/发光只与 (w, h, 发光半径) 有关：按此缓存，变化时重建。
+# 预热线程与菜单 Shader 线程都会读写：(键, 数组) 建好后作为一个元组整体替换，
+# 读者要么看到旧的一对，要么看到新的一对，不会出现键已更新、数组还没建好
+_workspace: tuple[tuple, dict] | None = None
 
-    # ----------- 渲染文字蒙版（缩放+居中） -----------
+def text_mask(w, h):
+    """渲染 '1024' 字样蒙版（用到字体，须在主线程调用）"""
+    if not pg.font.get_init():
+        pg.font.init()
     font_target_height = int(h * 0.60)
     font_target_width = int(w * 0.92)
     FONT_SIZE = max(24, int(font_target_height))
@@ -159,16 +148,77 @@ def gen_1024_field(w, h, t):
     sy = (h - sh) // 2
     sx = (w - sw) // 2
     mask[sy:sy + sh, sx:sx + sw] = alpha_hw
+    return mask
+
+def resize_workspace(w, h, mask=None):
+    """按新尺寸重建工作区（窗口尺寸变化时调用一次即可）；
+    传入主线程预先渲染的 mask 时只做 numpy 计算，可放到后台线程"""
+    global _workspace
+    key = (w, h, GLOW_RADIUS)  # 半径在开头取一次，构建期间被改也不会错配
+
+    # 坐标/归一化
+    yy, xx = np.mgrid[0:h, 0:w]
+    nx = (xx - w * 0.5) / (0.5 * w)
+    ny = (yy - h * 0.5) / (0.5 * h)
+
+    # ----------- 渲染文字蒙版（缩放+居中） -----------
+    if mask is None:
+        mask = text_mask(w, h)
 
     # 发光 + 描边（近似膨胀/卷积）
     stroke = _roll_max(mask, STROKE_SIZE) - mask
     stroke = np.clip(stroke, 0.0, 1.0)
 
-    glow = _roll_max(mask, 6)
+    glow = _roll_max(mask, key[2])
     if glow.max() > 1e-6:
         glow = glow / glow.max()
     glow = glow ** 0.85  # 软一点
 
+    ws = {
+        "nx": nx,
+        "ny": ny,
+        "vig": _vignette(nx, ny),
+        "mask": mask,
+        "stroke": stroke,
+        "glow": glow,
+    }
+    _workspace = (key, ws)
+    return ws
+
+def workspace_ready(w, h):
+    """当前工作区是否与 (w, h, 发光半径) 匹配"""
+    current = _workspace
+    return current is not None and current[0] == (w, h, GLOW_RADIUS)
+
+def _get_workspace(w, h):
+    current = _workspace
+    if current is None or current[0] != (w, h, GLOW_RADIUS):
+        return resize_workspace(w, h)
+    return current[1]
+
+
+# ------------------ 主函数 ------------------
+def gen_1024_field(w, h, t):
+    """
+    生成动态底图 + '1024' 字形霓虹蒙版。
+    返回 (w, h, 3) 的 uint8。
+    """
+    ws = _get_workspace(w, h)
+    nx, ny = ws["nx"], ws["ny"]
+    mask, stroke, glow = ws["mask"], ws["stroke"], ws["glow"]
+
+    # 选择底图
+    if VARIANT == "metaballs":
+        base, a1, a2 = _field_metaballs(nx, ny, t)
+    elif VARIANT == "kaleido":
+        base, a1, a2 = _field_kaleido(nx, ny, t)
+    else:
+        base, a1, a2 = _field_vortex(nx, ny, t)
+
+    # 扫描线 + 暗角
+    scan = _scanlines(h, w, t)
+    base = np.clip(base * scan * ws["vig"], 0.0, 1.0)
+
     # ----------- 颜色合成 -----------
     # 基础三通道
     r0, g0, b0 = _palette_neon(base, a1, a2)
@@ -0,0 +1,101 @@
+# snakebody.py
+from __future__ import annotations
+
+from array import array
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+
+Vec2 = Tuple[int, int]
+
+# ---------------- 蛇身：定长环形缓冲区 ----------------
+# 每节存打包后的格子编号 y * grid_size + x（int16），容量为全部格子数；
+# 占用情况用一张按格子编号索引的 bytearray 计数维护，O(1) 判断碰撞
+# （计数而非布尔：蛇头追上蛇尾的那一步同一格会短暂出现两次）。
+# 蛇头在 start 处，向低地址生长；蛇尾在 start + length - 1 处。
+
+
+class SnakeBody:
+    def __init__(self, grid_size: int, cells: Iterable[Vec2] = ()):
+        self.grid_size = grid_size
+        self.capacity = grid_size * grid_size
+        self.buf = array("h", bytes(2 * self.capacity))
+        self.occupied = bytearray(self.capacity)
+        self.start = 0
+        self.length = 0
+        # cells 按蛇头 -> 蛇尾给出
+        for cell in reversed(list(cells)):
+            self.push_head(cell)
+
+    # ---------- 基本协议 ----------
+    def __len__(self) -> int:
+        return self.length
+
+    def __bool__(self) -> bool:
+        return self.length > 0
+
+    def __contains__(self, cell: Vec2) -> bool:
+        x, y = cell
+        if not (0 <= x < self.grid_size and 0 <= y < self.grid_size):
+            return False
+        return self.occupied[y * self.grid_size + x] != 0
+
+    def __getitem__(self, i: int) -> Vec2:
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError("snake index out of range")
+        return divmod(self.buf[(self.start + i) % self.capacity], self.grid_size)[::-1]
+
+    def __iter__(self) -> Iterator[Vec2]:
+        g = self.grid_size
+        for idx in self.indices().tolist():
+            yield idx % g, idx // g
+
+    # ---------- 复制 / 重建 ----------
+    @classmethod
+    def from_indices(cls, grid_size: int, indices) -> "SnakeBody":
+        """由蛇头 -> 蛇尾的打包格子编号重建（快照恢复用）"""
+        body = cls(grid_size)
+        n = len(indices)
+        body.buf[:n] = array("h", indices)
+        for idx in body.buf[:n]:
+            body.occupied[idx] += 1
+        body.length = n
+        return body
+
+    def copy(self) -> "SnakeBody":
+        body = SnakeBody.__new__(SnakeBody)
+        body.grid_size = self.grid_size
+        body.capacity = self.capacity
+        body.buf = array("h", self.buf)
+        body.occupied = bytearray(self.occupied)
+        body.start = self.start
+        body.length = self.length
+        return body
+
+    # ---------- 变更 ----------
+    def push_head(self, cell: Vec2) -> None:
+        idx = cell[1] * self.grid_size + cell[0]
+        self.start = (self.start - 1) % self.capacity
+        self.buf[self.start] = idx
+        self.occupied[idx] += 1
+        self.length += 1
+
+    def pop_tail(self, n: int = 1) -> int:
+        """一次移除 n 节尾巴（只移动长度，不搬数据）；返回实际移除数"""
+        n = min(n, self.length)
+        end = self.start + self.length
+        for pos in range(end - n, end):
+            self.occupied[self.buf[pos % self.capacity]] -= 1
+        self.length -= n
+        return n
+
+    # ---------- 批量视图 ----------
+    def indices(self) -> np.ndarray:
+        """蛇头 -> 蛇尾的打包格子编号（int16 拷贝）"""
+        buf = np.frombuffer(self.buf, dtype=np.int16)
+        end = self.start + self.length
+        if end <= self.capacity:
+            return buf[self.start:end].copy()
+        return np.concatenate((buf[self.start:], buf[:end - self.capacity]))
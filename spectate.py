@@ -0,0 +1,409 @@
+# spectate.py
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from collections import deque
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame as pg
+
+import render_backend
+from game import (BEAN_GREEN, BEAN_ORANGE, EV_EAT, EV_HEAD, EV_POP, EV_RESET,
+                  EV_SPAWN, EV_TICK, GRID_SIZE, MOVE_FPS, SPECTATE_ENV, SnakeGame)
+
+# ---------------- 观战流：逐 tick 增量 + 定期关键帧 ----------------
+# 编码器读取 SnakeGame.journal（对局自己记下的变化），只写出每个 tick 的改动：
+#   新蛇头（相对上一蛇头的方向，2 bit）、尾部移除节数、吃掉的豆子种类、本 tick 生成的豆子；
+# 每 KEYFRAME_EVERY 个 tick（以及重开 / 彩蛋时）插入一份完整的 SnakeGame.snapshot()，
+# 中途加入或丢了数据的观众从下一个关键帧开始就能对上。
+#
+# 流格式：STREAM_MAGIC 开头，之后是一串消息，每条消息以一个字节开头：
+#   bit 0~2  蛇头：0~3 = 沿 DIRECTIONS 走一格，4 = 未移动，5 = 撞墙，6 = 撞自己，7 = 关键帧
+#   bit 3~4  吃到的豆子（0 无 / 1 绿 / 2 橙 / 3 红；豆子就在新蛇头上）
+#   bit 5~6  尾部移除：0 = 0 节，1 = 1 节，2 = 节数随后以 varint 给出
+#   bit 7    本 tick 有新生成的豆子：varint 绿豆数、varint 橙豆数，
+#            各自的格子编号升序排列后按差值写 varint
+# 关键帧：字节 7，varint 长度，快照。蛇身被缩短到 0 节即视为缩短致死，不单独编码。
+#
+#   VIBESNAKE_SPECTATE=game.vsp python main.py        # 边玩边录
+#   python spectate.py view game.vsp --follow          # 另开窗口观战（跟随写入）
+#   python spectate.py record game.vsp --ticks 20000   # 无界面自动驾驶录制 + 码率统计
+
+STREAM_MAGIC = b"VSPC\x01"
+KEYFRAME_EVERY = 600  # tick（按 10 tick/s 约一分钟一帧）
+
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+_DIR_CODES = {d[1] * GRID_SIZE + d[0]: code for code, d in enumerate(DIRECTIONS)}
+
+HEAD_NONE = 4
+HEAD_WALL = 5
+HEAD_SELF = 6
+KEYFRAME = 7
+POP_VARINT = 2
+HAS_SPAWNS = 0x80
+
+MAX_BACKLOG_TICKS = 2 * MOVE_FPS  # 观看时落后超过该值直接追到最新
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+class _Incomplete(Exception):
+    """数据还没收全，等下一块"""
+
+
+class _Reader:
+    def __init__(self, data: bytes | bytearray, pos: int = 0):
+        self.data = data
+        self.pos = pos
+
+    def byte(self) -> int:
+        if self.pos >= len(self.data):
+            raise _Incomplete
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def varint(self) -> int:
+        value = shift = 0
+        while True:
+            b = self.byte()
+            value |= (b & 0x7F) << shift
+            if b < 0x80:
+                return value
+            shift += 7
+
+    def take(self, n: int) -> bytes:
+        end = self.pos + n
+        if end > len(self.data):
+            raise _Incomplete
+        chunk = bytes(self.data[self.pos:end])
+        self.pos = end
+        return chunk
+
+
+# ====== 编码 ======
+class SpectatorEncoder:
+    def __init__(self, game: SnakeGame, out=None, keyframe_every: int = KEYFRAME_EVERY):
+        self.game = game
+        self.out = out  # 可选的二进制文件对象；flush() 的输出会顺便写进去
+        self.keyframe_every = max(1, keyframe_every)
+        self.ticks = 0
+        self.bytes = 0
+        self.keyframes = 0
+        self.keyframe_bytes = 0
+        self._since_keyframe = 0
+        self._head = 0
+        self._easter = False
+        self._started = False
+        game.journal = []
+
+    def _keyframe(self, buf: bytearray) -> None:
+        game = self.game
+        blob = game.snapshot()
+        size = len(buf)
+        buf.append(KEYFRAME)
+        write_varint(buf, len(blob))
+        buf += blob
+        self.keyframe_bytes += len(buf) - size
+        hx, hy = game.snake[0] if game.snake else (0, 0)
+        self._head = hy * GRID_SIZE + hx
+        self._easter = game.easter_triggered
+        self._since_keyframe = 0
+        self.keyframes += 1
+
+    def _tick(self, buf: bytearray, head: int | None, eaten: int, popped: int,
+              spawns: list[tuple[int, int]], last: bool) -> None:
+        if head is not None:
+            code = _DIR_CODES[head - self._head]
+            self._head = head
+        elif last and self.game.dead:
+            code = HEAD_WALL if self.game.death_cause == "wall" else HEAD_SELF
+        else:
+            code = HEAD_NONE
+        code |= eaten << 3
+        code |= (popped if popped <= 1 else POP_VARINT) << 5
+        if spawns:
+            code |= HAS_SPAWNS
+        buf.append(code)
+        if popped > 1:
+            write_varint(buf, popped)
+        if spawns:
+            for kind in (BEAN_GREEN, BEAN_ORANGE):
+                cells = sorted(cell for k, cell in spawns if k == kind)
+                write_varint(buf, len(cells))
+                prev = 0
+                for cell in cells:
+                    write_varint(buf, cell - prev)
+                    prev = cell
+        self.ticks += 1
+        self._since_keyframe += 1
+
+    def flush(self) -> bytes:
+        """把上次 flush 以来的 tick 编码成字节（每帧 update 之后调用一次）"""
+        game = self.game
+        journal = game.journal
+        buf = bytearray(b"" if self._started else STREAM_MAGIC)
+        # 首次 flush 或重开之后：已有的事件都包含在当前状态里，只发一个关键帧
+        need_keyframe = not self._started or (EV_RESET,) in journal
+        self._started = True
+        if not need_keyframe:
+            last_tick = max((i for i, ev in enumerate(journal) if ev[0] == EV_TICK), default=-1)
+            head, eaten, popped, spawns = None, 0, 0, []
+            for i, ev in enumerate(journal):
+                kind = ev[0]
+                if kind == EV_HEAD:
+                    head = ev[1]
+                elif kind == EV_POP:
+                    popped += ev[1]
+                elif kind == EV_EAT:
+                    eaten = ev[1]
+                elif kind == EV_SPAWN:
+                    spawns.append((ev[1], ev[2]))
+                elif kind == EV_TICK:
+                    self._tick(buf, head, eaten, popped, spawns, i == last_tick)
+                    head, eaten, popped, spawns = None, 0, 0, []
+        journal.clear()
+
+        if (need_keyframe or self._since_keyframe >= self.keyframe_every
+                or game.easter_triggered != self._easter):
+            self._keyframe(buf)
+        data = bytes(buf)
+        self.bytes += len(data)
+        if self.out is not None and data:
+            self.out.write(data)
+            self.out.flush()
+        return data
+
+    def close(self) -> None:
+        self.game.journal = None
+        if self.out is not None:
+            self.out.close()
+            self.out = None
+
+
+def from_env(game: SnakeGame) -> SpectatorEncoder | None:
+    """VIBESNAKE_SPECTATE 指定了文件路径时开始录制"""
+    path = os.environ.get(SPECTATE_ENV, "")
+    if path in ("", "0"):
+        return None
+    return SpectatorEncoder(game, open(path, "wb"))
+
+
+# ====== 解码 ======
+class SpectatorDecoder:
+    def __init__(self, game: SnakeGame | None = None):
+        self.game = game if game is not None else SnakeGame(rng_seed=0)
+        self.queue: deque[tuple] = deque()  # 已解析、尚未应用的消息
+        self.synced = False  # 收到第一个关键帧之前不应用增量
+        self._buffer = bytearray()
+        self._magic_seen = False
+
+    def feed(self, data: bytes) -> int:
+        """追加一段流数据，返回新解析出的消息数（不完整的尾部留到下次）"""
+        self._buffer += data
+        if not self._magic_seen:
+            if len(self._buffer) < len(STREAM_MAGIC):
+                return 0
+            if bytes(self._buffer[:len(STREAM_MAGIC)]) != STREAM_MAGIC:
+                raise ValueError("not a spectator stream")
+            del self._buffer[:len(STREAM_MAGIC)]
+            self._magic_seen = True
+
+        reader = _Reader(self._buffer)
+        parsed = 0
+        while True:
+            start = reader.pos
+            try:
+                self.queue.append(self._parse(reader))
+            except _Incomplete:
+                reader.pos = start
+                break
+            parsed += 1
+        del self._buffer[:reader.pos]
+        return parsed
+
+    @staticmethod
+    def _parse(reader: _Reader) -> tuple:
+        code = reader.byte()
+        if code & 7 == KEYFRAME:
+            return (KEYFRAME, reader.take(reader.varint()))
+        pop_code = (code >> 5) & 3
+        popped = reader.varint() if pop_code == POP_VARINT else pop_code
+        spawns: list[tuple[int, int]] = []
+        if code & HAS_SPAWNS:
+            for kind in (BEAN_GREEN, BEAN_ORANGE):
+                cell = 0
+                for _ in range(reader.varint()):
+                    cell += reader.varint()
+                    spawns.append((kind, cell))
+        return (code & 7, (code >> 3) & 3, popped, spawns)
+
+    @property
+    def pending_ticks(self) -> int:
+        return sum(1 for msg in self.queue if msg[0] != KEYFRAME)
+
+    def apply_next(self) -> bool:
+        """应用下一个 tick（途经的关键帧一并应用）；队列空时返回 False"""
+        while self.queue:
+            msg = self.queue.popleft()
+            if msg[0] == KEYFRAME:
+                self.game.restore(msg[1])
+                self.synced = True
+                continue
+            if self.synced:
+                self._apply_tick(*msg)
+                return True
+        return False
+
+    def drain(self) -> int:
+        applied = 0
+        while self.apply_next():
+            applied += 1
+        return applied
+
+    def _apply_tick(self, head_code: int, eaten: int, popped: int, spawns: list) -> None:
+        game = self.game
+        snake = game.snake
+        g = GRID_SIZE
+        if snake:
+            game._prev_head = snake[0]
+            game._prev_tail = snake[-1]
+        if head_code < HEAD_NONE:
+            dx, dy = DIRECTIONS[head_code]
+            hx, hy = snake[0]
+            head = (hx + dx, hy + dy)
+            game.direction = (dx, dy)
+            snake.push_head(head)
+            if eaten:
+                (game.green_beans, game.orange_beans, game.red_beans)[eaten - 1].discard(head)
+            snake.pop_tail(popped)
+            if len(snake) == 0:
+                game.dead = True
+                game.death_cause = "shrink"
+            else:
+                game.score = len(snake)
+                game.high_score = max(game.high_score, game.score)
+        elif head_code in (HEAD_WALL, HEAD_SELF):
+            game.dead = True
+            game.death_cause = "wall" if head_code == HEAD_WALL else "self"
+        for kind, cell in spawns:
+            beans = game.green_beans if kind == BEAN_GREEN else game.orange_beans
+            beans.add((cell % g, cell // g))
+
+
+# ====== 观看窗口 ======
+def view(path: str, follow: bool = False, speed: float = 1.0) -> None:
+    pg.init()
+    screen = render_backend.open_window((960, 800), "VibeSnake 观战")
+    backend = render_backend.active()
+    decoder = SpectatorDecoder()
+    game = decoder.game
+    interval = game.move_interval / max(1e-3, speed)
+    clock = pg.time.Clock()
+    timer = 0.0
+    with open(path, "rb") as f:
+        while True:
+            for event in pg.event.get():
+                if event.type == pg.QUIT or (event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE):
+                    pg.quit()
+                    return
+                if event.type == pg.VIDEORESIZE:
+                    screen = backend.resize(event.size)
+                    game.on_resize(event.size)
+            chunk = f.read()
+            if chunk:
+                decoder.feed(chunk)
+            elif not follow and not decoder.queue:
+                # 回放结束：停在最后一帧
+                timer = interval
+
+            dt = clock.tick(60) / 1000.0
+            timer += dt
+            # 跟随写入时落后太多就直接追上
+            if follow:
+                backlog = decoder.pending_ticks
+                while backlog > MAX_BACKLOG_TICKS:
+                    decoder.apply_next()
+                    backlog -= 1
+            while timer >= interval and decoder.apply_next():
+                timer -= interval
+            if not decoder.queue:
+                timer = min(timer, interval)
+            game.move_timer = timer / interval * game.move_interval
+
+            screen = backend.get_surface() or screen
+            if decoder.synced:
+                game.render(screen)
+            backend.present()
+
+
+# ====== 无界面录制（码率统计） ======
+def record(path: str, seed: int, ticks: int, keyframe_every: int, verify: bool) -> None:
+    from autopilot import Autopilot
+
+    game = SnakeGame(rng_seed=seed)
+    game.autopilot = Autopilot()
+    with open(path, "wb") as f:
+        encoder = SpectatorEncoder(game, f, keyframe_every)
+        decoder = SpectatorDecoder() if verify else None
+        games = 1
+        started = time.perf_counter()
+        for _ in range(ticks):
+            if game.dead or game.easter_triggered:
+                game.reset()
+                games += 1
+            game.update(game.move_interval)
+            data = encoder.flush()
+            if decoder is not None:
+                decoder.feed(data)
+                decoder.drain()
+                mirror = decoder.game
+                if (list(mirror.snake) != list(game.snake) or mirror.green_beans != game.green_beans
+                        or mirror.orange_beans != game.orange_beans or mirror.red_beans != game.red_beans
+                        or mirror.dead != game.dead):
+                    raise SystemExit(f"mirror diverged at tick {encoder.ticks}")
+        elapsed = time.perf_counter() - started
+        encoder.close()
+
+    snapshot_size = len(game.snapshot())
+    print(f"{encoder.ticks} ticks  {games} games  {elapsed:.1f}s")
+    deltas = encoder.bytes - encoder.keyframe_bytes
+    print(f"stream {encoder.bytes} B  ({encoder.bytes / max(1, encoder.ticks):.2f} B/tick)")
+    print(f"  deltas    {deltas} B  ({deltas / max(1, encoder.ticks):.2f} B/tick)")
+    print(f"  keyframes {encoder.keyframe_bytes} B  ({encoder.keyframes} x "
+          f"{encoder.keyframe_bytes / max(1, encoder.keyframes):.0f} B)")
+    print(f"full snapshot per tick would be ~{snapshot_size} B/tick")
+    if verify:
+        print("mirror matched the live game on every tick")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="VibeSnake 观战流")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_view = sub.add_parser("view", help="回放 / 观看观战流文件")
+    p_view.add_argument("path")
+    p_view.add_argument("--follow", action="store_true", help="文件仍在写入时持续跟随")
+    p_view.add_argument("--speed", type=float, default=1.0, help="播放倍速")
+    p_rec = sub.add_parser("record", help="无界面自动驾驶录制")
+    p_rec.add_argument("path")
+    p_rec.add_argument("--seed", type=int, default=0)
+    p_rec.add_argument("--ticks", type=int, default=10000)
+    p_rec.add_argument("--keyframe-every", type=int, default=KEYFRAME_EVERY)
+    p_rec.add_argument("--verify", action="store_true", help="同时解码并逐 tick 比对")
+    args = parser.parse_args()
+    if args.command == "view":
+        view(args.path, args.follow, args.speed)
+    else:
+        record(args.path, args.seed, args.ticks, args.keyframe_every, args.verify)
+
+
+if __name__ == "__main__":
+    main()
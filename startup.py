@@ -0,0 +1,151 @@
+# startup.py
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# ---------------- 冷启动：时间点记录 / 后台预热 / 启动基准 ----------------
+# main.py 第一行导入本模块，之后各阶段调用 mark()；菜单每提交一帧调用 frame_presented()。
+# 首帧之前只做“开窗口 + 画一帧菜单”必需的事，其余工作（Shader 工作区、游戏模块导入、
+# 代码雨字形表等）通过 background() / after_first_frame() 放到后台线程。
+# 注意：后台任务不要创建或使用 pygame 字体/显示相关对象（SDL_ttf 与显示不是线程安全的），
+# 需要字体的部分先在主线程做好再把结果交给后台。
+# pygame 2 在 import 时会顺带导入 NumPy（经 surfarray/sndarray，数十毫秒）和 pkg_resources
+# （经 pkgdata，装了 setuptools 时上百毫秒）。main.py 在 blocked_imports() 里导入 pygame：
+# pkgdata 自动退回普通文件读取（默认字体等照常加载），NumPy 则在首帧（不依赖 NumPy 的
+# 启动画面）之后由 load_numpy() 在后台补上。
+#
+# 环境变量 VIBESNAKE_STARTUP=1 时进入基准模式：首帧提交时向 stdout 打印一行
+# "first_frame <ms>"，后台预热全部完成后打印一行 JSON（各时间点，毫秒）并退出。
+#   python startup.py --runs 10          # 反复冷启动 main.py，汇总中位数
+
+STARTUP_ENV = "VIBESNAKE_STARTUP"
+
+_T0 = time.perf_counter()
+_marks: dict[str, float] = {}
+_executor: ThreadPoolExecutor | None = None
+_pending: list[Future] = []
+_after_first_frame: list[tuple] = []
+
+
+def mark(name: str) -> None:
+    """记录一个时间点（只记第一次）"""
+    _marks.setdefault(name, (time.perf_counter() - _T0) * 1000.0)
+
+
+def marks() -> dict[str, float]:
+    return dict(_marks)
+
+
+def benchmarking() -> bool:
+    return os.environ.get(STARTUP_ENV, "") not in ("", "0")
+
+
+def background(fn, *args) -> Future:
+    """在单个后台线程里按提交顺序执行（预热任务之间通常有依赖，串行即可）"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="warmup")
+    future = _executor.submit(fn, *args)
+    _pending.append(future)
+    return future
+
+
+@contextlib.contextmanager
+def blocked_imports(*names: str):
+    """上下文内导入这些（尚未导入的）模块会抛 ImportError；退出后恢复可导入"""
+    blocked = [name for name in names if name not in sys.modules]
+    for name in blocked:
+        sys.modules[name] = None
+    try:
+        yield
+    finally:
+        for name in blocked:
+            if sys.modules.get(name, 0) is None:
+                del sys.modules[name]
+
+
+def load_numpy() -> None:
+    """导入 NumPy 并补上被跳过的 pygame.surfarray / sndarray（可在后台线程调用）"""
+    importlib.import_module("numpy")
+    for name in ("pygame.surfarray", "pygame.sndarray"):
+        importlib.import_module(name)
+
+
+def after_first_frame(fn, *args) -> None:
+    """首帧提交之后再放进后台线程（避免与首帧争 CPU）"""
+    if "first_frame" in _marks:
+        background(fn, *args)
+    else:
+        _after_first_frame.append((fn, args))
+
+
+def first_frame() -> None:
+    """首帧提交后调用：记时间点，并把 after_first_frame() 登记的任务放进后台"""
+    if "first_frame" in _marks:
+        return
+    mark("first_frame")
+    if benchmarking():
+        print(f"first_frame {_marks['first_frame']:.1f}", flush=True)
+    for fn, args in _after_first_frame:
+        background(fn, *args)
+    _after_first_frame.clear()
+
+
+def frame_presented() -> bool:
+    """菜单每帧提交后调用；基准模式下预热全部完成时返回 True（调用方据此退出）"""
+    first_frame()
+    if not benchmarking() or not all(f.done() for f in _pending):
+        return False
+    for future in _pending:
+        future.result()  # 预热出错时直接暴露
+    mark("warm")
+    print(json.dumps(_marks), flush=True)
+    return True
+
+
+# ====== 基准 ======
+def run_once(script: str, env: dict) -> dict[str, float]:
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, script], stdout=subprocess.PIPE, text=True, env=env)
+    result: dict[str, float] = {}
+    for line in proc.stdout:
+        if line.startswith("first_frame"):
+            result["launch_to_first_frame"] = (time.perf_counter() - started) * 1000.0
+        elif line.startswith("{"):
+            result.update(json.loads(line))
+    proc.wait()
+    result["launch_to_exit"] = (time.perf_counter() - started) * 1000.0
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="VibeSnake 冷启动基准（time-to-first-frame）")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--script", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py"))
+    parser.add_argument("--headless", action="store_true", help="使用 SDL dummy 视频驱动")
+    args = parser.parse_args()
+
+    env = dict(os.environ, **{STARTUP_ENV: "1", "PYGAME_HIDE_SUPPORT_PROMPT": "1"})
+    if args.headless:
+        env["SDL_VIDEODRIVER"] = "dummy"
+    runs = [run_once(args.script, env) for _ in range(args.runs)]
+
+    keys = sorted({k for run in runs for k in run}, key=lambda k: statistics.median(
+        run[k] for run in runs if k in run))
+    print(f"{args.runs} runs, median / min / max (ms)")
+    for key in keys:
+        values = [run[key] for run in runs if key in run]
+        print(f"  {key:<24}{statistics.median(values):8.1f}{min(values):8.1f}{max(values):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import pygame as pg
+
+from game import TURN_QUEUE_SIZE, SnakeGame
+
+UP, DOWN, LEFT, RIGHT = (0, -1), (0, 1), (-1, 0), (1, 0)
+
+
+def step(game: SnakeGame) -> None:
+    game.update(game.move_interval)
+
+
+def test_two_turns_in_one_tick_apply_over_two_steps():
+    game = SnakeGame(rng_seed=1)
+    hx, hy = game.snake[0]
+    assert game.direction == RIGHT
+    game.handle_keydown(pg.K_UP)
+    game.handle_keydown(pg.K_LEFT)  # 同一 tick 内连按：不会被上一次按键覆盖
+    step(game)
+    assert (game.direction, game.snake[0]) == (UP, (hx, hy - 1))
+    step(game)
+    assert (game.direction, game.snake[0]) == (LEFT, (hx - 1, hy - 1))
+    assert not game.turn_queue and not game.dead
+
+
+def test_reversing_the_queued_turn_is_dropped():
+    game = SnakeGame(rng_seed=1)
+    assert game.queue_turn(UP)
+    assert not game.queue_turn(DOWN)   # 相对队尾（UP）掉头
+    assert not game.queue_turn(UP)     # 重复
+    assert game.queue_turn(RIGHT)      # 相对队尾合法，即使与当前方向相同
+    assert [d for d, _ in game.turn_queue] == [UP, RIGHT]
+
+
+def test_queue_caps_at_turn_queue_size():
+    game = SnakeGame(rng_seed=1)
+    turns = [UP, LEFT, DOWN, RIGHT, DOWN]
+    accepted = [game.queue_turn(d) for d in turns]
+    assert accepted == [True] * TURN_QUEUE_SIZE + [False] * (len(turns) - TURN_QUEUE_SIZE)
+    assert len(game.turn_queue) == TURN_QUEUE_SIZE
+    step(game)  # 消费一个后又能排入
+    assert game.queue_turn(RIGHT)
+
+
+def test_latency_sample_per_applied_turn():
+    game = SnakeGame(rng_seed=1)
+    game.queue_turn(UP)
+    game.queue_turn(LEFT)
+    game.mark_frame_presented()
+    assert game.latency_stats() == {"count": 0}  # 尚未生效的转向不计
+    step(game)
+    game.mark_frame_presented()
+    step(game)
+    game.mark_frame_presented()
+    stats = game.latency_stats()
+    assert stats["count"] == 2
+    assert 0.0 <= stats["p50"] <= stats["p95"] <= stats["max"]
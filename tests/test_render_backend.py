@@ -0,0 +1,51 @@
+import os
+
+import pygame as pg
+import pytest
+
+import render_backend
+from game import SnakeGame
+
+pytest.importorskip("pygame._sdl2.video")
+
+BIG = (1024, 1112)    # 棋盘 1:1（整数倍，最近邻）
+SMALL = (640, 520)    # 棋盘缩小（线性）
+
+
+def _board(backend: render_backend.SDL2Backend, game: SnakeGame, size) -> bytes:
+    screen = backend.resize(size)
+    game.backend = backend
+    game.on_resize(size)
+    rect, _ = game.render(screen)
+    return pg.image.tobytes(backend.capture(screen).subsurface(rect), "RGB")
+
+
+@pytest.fixture
+def sdl2_pair():
+    pg.init()
+    backends = []
+
+    def make(size):
+        backend = render_backend.SDL2Backend(software=True)
+        backend.open(size, "test")
+        backends.append(backend)
+        return backend
+
+    yield make
+    for backend in backends:
+        backend.window.destroy()
+
+
+@pytest.mark.parametrize("first,second", [(BIG, SMALL), (SMALL, BIG)])
+def test_board_texture_follows_scale_mode(sdl2_pair, first, second):
+    game = SnakeGame(rng_seed=3)
+    resized = sdl2_pair(first)
+    _board(resized, game, first)
+    assert _board(resized, game, second) == _board(sdl2_pair(second), game, second)
+
+
+def test_scale_hint_does_not_leak(sdl2_pair):
+    before = os.environ.get(render_backend.SCALE_QUALITY_HINT)
+    backend = sdl2_pair(SMALL)
+    _board(backend, SnakeGame(rng_seed=3), SMALL)
+    assert os.environ.get(render_backend.SCALE_QUALITY_HINT) == before
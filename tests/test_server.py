@@ -0,0 +1,53 @@
+import asyncio
+import struct
+
+import pytest
+
+from game import SnakeGame
+from server import (ERR_BAD_TURN, MSG_ERROR, MSG_NEW, MSG_STATE, MSG_TURN, GameServer,
+                    encode_frame, read_frame)
+
+
+@pytest.mark.parametrize("turn", [(2, 0), (5, 5), (0, 0), (-1, 1), (0, -3)])
+def test_queue_turn_rejects_non_unit_directions(turn):
+    game = SnakeGame(rng_seed=1)
+    assert not game.queue_turn(turn)
+    assert not game.turn_queue
+
+
+def test_queue_turn_accepts_unit_directions():
+    game = SnakeGame(rng_seed=1)
+    assert game.queue_turn((0, 1))
+    assert game.queue_turn((-1, 0))
+
+
+def test_server_replies_error_to_bad_turn():
+    async def scenario():
+        server = GameServer(verbose=False)
+        listener = await asyncio.start_server(server.handle_client, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            writer.write(encode_frame(MSG_NEW, struct.pack("<q", 7)))
+            msg_type, _ = await read_frame(reader)
+            assert msg_type == MSG_STATE
+
+            writer.write(encode_frame(MSG_TURN, struct.pack("<bb", 2, 0)))
+            msg_type, payload = await asyncio.wait_for(read_frame(reader), 5)
+            assert (msg_type, payload) == (MSG_ERROR, bytes([ERR_BAD_TURN]))
+            (session,) = server.sessions.values()
+            assert not session.game.turn_queue
+
+            writer.write(encode_frame(MSG_TURN, struct.pack("<bb", 0, 1)))
+            await writer.drain()
+            for _ in range(100):
+                if session.game.turn_queue:
+                    break
+                await asyncio.sleep(0.01)
+            assert [d for d, _ in session.game.turn_queue] == [(0, 1)]
+        finally:
+            writer.close()
+            listener.close()
+            await listener.wait_closed()
+
+    asyncio.run(scenario())
@@ -0,0 +1,71 @@
+import random
+from collections import deque
+
+import pytest
+
+from snakebody import SnakeBody
+
+GRID = 4  # 容量 16 格：几十次 push 就会绕回缓冲区开头
+
+
+def assert_same(body: SnakeBody, ref: deque) -> None:
+    assert len(body) == len(ref)
+    assert list(body) == list(ref)
+    g = GRID
+    assert body.indices().tolist() == [y * g + x for x, y in ref]
+    if ref:
+        assert body[0] == ref[0] and body[-1] == ref[-1]
+    occupied = set(ref)
+    for cell in ((x, y) for x in range(g) for y in range(g)):
+        assert (cell in body) == (cell in occupied)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_deque_over_wrapping_sequences(seed):
+    rng = random.Random(seed)
+    body, ref = SnakeBody(GRID), deque()
+    pushes = 0
+    for step in range(3000):
+        if ref and (len(ref) == body.capacity or rng.random() < 0.45):
+            n = rng.randint(1, 3)
+            assert body.pop_tail(n) == min(n, len(ref))
+            for _ in range(min(n, len(ref))):
+                ref.pop()
+        else:
+            # 一半概率走进尾巴格（蛇头追尾），否则随机格子（允许重复，考验计数）
+            cell = ref[-1] if ref and rng.random() < 0.5 else (rng.randrange(GRID), rng.randrange(GRID))
+            body.push_head(cell)
+            ref.appendleft(cell)
+            pushes += 1
+        assert_same(body, ref)
+        if step % 97 == 0:
+            assert_same(body.copy(), ref)
+            assert_same(SnakeBody.from_indices(GRID, body.indices()), ref)
+    assert pushes > 3 * body.capacity
+
+
+def test_head_entering_tail_cell_stays_occupied():
+    body = SnakeBody(GRID, [(1, 0), (0, 0), (0, 1), (1, 1)])
+    body.push_head((1, 1))  # 蛇头进入旧尾巴格
+    body.pop_tail()
+    assert (1, 1) in body
+    assert list(body) == [(1, 1), (1, 0), (0, 0), (0, 1)]
+    body.pop_tail(3)
+    assert (1, 1) in body and (0, 1) not in body
+    body.pop_tail()
+    assert not body and (1, 1) not in body
+
+
+def test_copy_and_from_indices_are_independent():
+    body = SnakeBody(GRID)
+    for i in range(40):  # 多次绕回
+        body.push_head((i % GRID, (i // GRID) % GRID))
+        if len(body) > 5:
+            body.pop_tail()
+    cells = list(body)
+    clone, rebuilt = body.copy(), SnakeBody.from_indices(GRID, body.indices())
+    assert list(clone) == list(rebuilt) == cells
+    clone.push_head((3, 3))
+    rebuilt.pop_tail(2)
+    assert list(body) == cells
+    assert (3, 3) in clone and body.occupied == SnakeBody.from_indices(GRID, body.indices()).occupied
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from game import INPUT_DIRECTIONS, SNAPSHOT_VERSION, SnakeGame
+
+
+def play(game: SnakeGame, steps: int, rng: random.Random) -> None:
+    """随机转向推进若干步；死亡/彩蛋后重开"""
+    for _ in range(steps):
+        if game.dead or game.easter_triggered:
+            game.reset()
+        if rng.random() < 0.2:
+            game.queue_turn(rng.choice(INPUT_DIRECTIONS))
+        game.update(game.move_interval)
+
+
+@pytest.fixture
+def played():
+    game = SnakeGame(rng_seed=11)
+    play(game, 400, random.Random(1))
+    return game
+
+
+def test_snapshot_restore_is_byte_identical(played):
+    blob = played.snapshot()
+    other = SnakeGame(rng_seed=99)
+    other.restore(blob)
+    assert other.snapshot() == blob
+
+    play(played, 600, random.Random(2))
+    play(other, 600, random.Random(2))
+    assert other.snapshot() == played.snapshot()
+
+
+def test_clone_stays_deterministic(played):
+    before = played.snapshot()
+    fork = played.clone()
+    assert fork.snapshot() == before
+
+    play(fork, 600, random.Random(3))
+    assert played.snapshot() == before  # 克隆推进不影响原对局
+    play(played, 600, random.Random(3))
+    assert fork.snapshot() == played.snapshot()
+
+
+@pytest.mark.parametrize("mangle", [
+    lambda b: b[:-1],
+    lambda b: b + b"\0",
+    lambda b: b[:10],
+    lambda b: b[:4] + bytes([SNAPSHOT_VERSION + 1]) + b[5:],
+    lambda b: b"XXXX" + b[4:],
+])
+def test_restore_rejects_bad_blob(played, mangle):
+    blob = played.snapshot()
+    target = SnakeGame(rng_seed=5)
+    untouched = target.snapshot()
+    with pytest.raises(ValueError):
+        target.restore(mangle(blob))
+    assert target.snapshot() == untouched
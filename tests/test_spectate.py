@@ -0,0 +1,77 @@
+import io
+import random
+
+import pytest
+
+from game import INPUT_DIRECTIONS, SnakeGame
+from spectate import STREAM_MAGIC, SpectatorDecoder, SpectatorEncoder, _Incomplete, _Reader, write_varint
+
+
+@pytest.mark.parametrize("value,size", [
+    (0, 1), (1, 1), (127, 1), (128, 2), (16383, 2), (16384, 3),
+    (2**21 - 1, 3), (2**21, 4), (2**21 + 1, 4), (2**35, 6),
+])
+def test_varint_roundtrip(value, size):
+    buf = bytearray()
+    write_varint(buf, value)
+    assert len(buf) == size
+    reader = _Reader(buf + b"\x05")
+    assert reader.varint() == value
+    assert reader.byte() == 5  # 恰好读完自己的字节
+
+
+def test_varint_incomplete():
+    buf = bytearray()
+    write_varint(buf, 2**21)
+    with pytest.raises(_Incomplete):
+        _Reader(buf[:-1]).varint()
+
+
+def state(game: SnakeGame) -> tuple:
+    return (list(game.snake), game.green_beans, game.orange_beans, game.red_beans,
+            game.dead, game.death_cause, game.score)
+
+
+def record(ticks: int, on_flush) -> SpectatorEncoder:
+    """随机转向录一段流；每帧 flush 的输出交给 on_flush(data, game)"""
+    rng = random.Random(4)
+    game = SnakeGame(rng_seed=21)
+    encoder = SpectatorEncoder(game, keyframe_every=100)
+    for _ in range(ticks):
+        if game.dead or game.easter_triggered:
+            game.reset()
+        if rng.random() < 0.25:
+            game.queue_turn(rng.choice(INPUT_DIRECTIONS))
+        game.update(game.move_interval)
+        on_flush(encoder.flush(), game)
+    return encoder
+
+
+def test_mirror_matches_every_tick():
+    decoder = SpectatorDecoder()
+
+    def check(data, game):
+        decoder.feed(data)
+        decoder.drain()
+        assert state(decoder.game) == state(game)
+
+    encoder = record(1500, check)
+    assert encoder.keyframes > 1 and encoder.ticks > 10 * encoder.keyframes  # 大部分是增量
+
+
+def test_stream_decodes_in_arbitrary_chunks():
+    stream = io.BytesIO()
+    final = {}
+
+    def keep(data, game):
+        stream.write(data)
+        final["state"] = state(game)
+
+    record(800, keep)
+    data = stream.getvalue()
+    assert data.startswith(STREAM_MAGIC)
+    decoder = SpectatorDecoder()
+    for i in range(0, len(data), 5):  # 消息会被切在任意位置
+        decoder.feed(data[i:i + 5])
+        decoder.drain()
+    assert state(decoder.game) == final["state"]
@@ -0,0 +1,305 @@
+# tuner.py
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import game as G
+from autopilot import Autopilot
+from game import GRID_SIZE, SnakeGame, Vec2
+
+# ---------------- 难度参数调优：多进程无界面批量对局 ----------------
+# 每个参数组合跑若干局（固定种子），由脚本/机器人策略操控，统计：
+# 到达 1024 的用时分布、死因、各阶段场上豆子数量、彩蛋触发率。
+#
+#   python tuner.py --games 400 --set green_scale=0.8,1.0,1.2 --set initial_red=64,96
+
+DEFAULT_PARAMS: dict[str, float] = {
+    "green_scale": 1.0,    # green_weight 倍率
+    "orange_scale": 1.0,   # orange_weight 倍率
+    "batch_scale": 1.0,    # batch_size 倍率（四舍五入，至少 1）
+    "cap_early": G.CAP_EARLY,
+    "cap_peak": G.CAP_PEAK,
+    "cap_late": G.CAP_LATE,
+    "hard_cap": G.MAX_BEANS_HARD_CAP,
+    "initial_red": G.INITIAL_RED_BEANS,
+}
+
+PHASES = ("EARLY", "PEAK", "LATE", "SPRINT")
+DEFAULT_MAX_TICKS = 30000  # 10 步/秒下约 50 分钟游戏时间
+
+
+class TunedGame(SnakeGame):
+    """按参数覆盖难度曲线的对局；其余规则与 SnakeGame 完全一致"""
+
+    def __init__(self, params: dict[str, float], rng_seed: int | None = None):
+        self.params = {**DEFAULT_PARAMS, **params}
+        super().__init__(rng_seed)
+
+    def green_weight(self, score: int) -> float:
+        return SnakeGame.green_weight(score) * self.params["green_scale"]
+
+    def orange_weight(self, score: int) -> float:
+        return SnakeGame.orange_weight(score) * self.params["orange_scale"]
+
+    def batch_size(self, score: int) -> int:
+        return max(1, round(SnakeGame.batch_size(score) * self.params["batch_scale"]))
+
+    def max_beans(self, score: int) -> int:
+        p = self.params
+        if score < 300:
+            cap_ratio = p["cap_early"]
+        elif score < 800:
+            cap_ratio = p["cap_peak"]
+        else:
+            cap_ratio = p["cap_late"]
+        return min(int(G.TOTAL_CELLS * cap_ratio), int(p["hard_cap"]))
+
+    def _seed_initial_red_beans(self) -> None:
+        target = min(int(self.params["initial_red"]), G.MAX_RED_BEAN_COUNT)
+        for _ in range(target):
+            if len(self.red_beans) >= G.MAX_RED_BEAN_COUNT:
+                break
+            cell = self._random_free_cell()
+            if cell is None:
+                break
+            self.red_beans.add(cell)
+
+
+# ---------- 策略：返回本步想走的方向（None 表示保持） ----------
+# POLICIES 存工厂：每局新建一个策略实例（有状态的策略互不干扰）
+Policy = Callable[[SnakeGame, random.Random], "Vec2 | None"]
+
+def _safe_moves(game: SnakeGame) -> list[tuple[Vec2, Vec2]]:
+    """不撞墙、不撞身（蛇尾格本步会让出）的 (方向, 目标格)"""
+    hx, hy = game.snake[0]
+    tail = game.snake[-1]
+    reverse = (-game.direction[0], -game.direction[1])
+    moves = []
+    for d in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        if d == reverse:
+            continue
+        cell = (hx + d[0], hy + d[1])
+        if not (0 <= cell[0] < GRID_SIZE and 0 <= cell[1] < GRID_SIZE):
+            continue
+        if cell in game.snake and cell != tail:
+            continue
+        moves.append((d, cell))
+    return moves
+
+
+def random_policy(game: SnakeGame, rng: random.Random) -> Vec2 | None:
+    """随机游走：大多数时候直行，只避开立即致死的格子"""
+    moves = _safe_moves(game)
+    if not moves:
+        return None
+    straight = [d for d, _ in moves if d == game.direction]
+    if straight and rng.random() > 0.1:
+        return straight[0]
+    return rng.choice(moves)[0]
+
+
+def greedy_policy(game: SnakeGame, rng: random.Random) -> Vec2 | None:
+    """一步贪心：绿豆加分、橙/红豆扣分，偏好周围空位多的格子"""
+    moves = _safe_moves(game)
+    if not moves:
+        return None
+    best, best_score = None, float("-inf")
+    for d, (x, y) in moves:
+        if (x, y) in game.green_beans:
+            value = 3.0
+        elif (x, y) in game.orange_beans:
+            value = -2.0
+        elif (x, y) in game.red_beans:
+            value = -6.0
+        else:
+            value = 0.0
+        free = sum(
+            1 for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1))
+            if 0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE and (nx, ny) not in game.snake
+        )
+        value += 0.75 * free + (0.2 if d == game.direction else 0.0) + rng.random() * 0.1
+        if value > best_score:
+            best, best_score = d, value
+    return best
+
+
+POLICIES: dict[str, Callable[[], Policy]] = {
+    "random": lambda: random_policy,
+    "greedy": lambda: greedy_policy,
+    "autopilot": Autopilot,
+}
+
+
+# ---------- 单局 / 批量 ----------
+def play_one(params: dict[str, float], policy_name: str, seed: int,
+             max_ticks: int = DEFAULT_MAX_TICKS) -> dict:
+    policy = POLICIES[policy_name]()
+    game = TunedGame(params, rng_seed=seed)
+    policy_rng = random.Random(seed ^ 0x5EED)
+    step = game.move_interval
+
+    phase_sums = {phase: [0, 0, 0] for phase in PHASES}
+    phase_ticks = {phase: 0 for phase in PHASES}
+    reached_1024 = None
+    max_score = game.score
+    ticks = 0
+    while ticks < max_ticks and not game.dead and not game.easter_triggered:
+        direction = policy(game, policy_rng)
+        if direction is not None and direction != game.direction:
+            game.queue_turn(direction)
+        game.update(step)
+        game.mark_frame_presented()  # 无画面：只为清空转向延迟记录
+        ticks += 1
+
+        phase = game._phase_name(game.score)
+        sums = phase_sums[phase]
+        sums[0] += len(game.green_beans)
+        sums[1] += len(game.orange_beans)
+        sums[2] += len(game.red_beans)
+        phase_ticks[phase] += 1
+        max_score = max(max_score, game.score)
+        if reached_1024 is None and game.score >= 1024:
+            reached_1024 = ticks * step
+
+    if game.easter_triggered:
+        outcome = "easter"
+    elif game.dead:
+        outcome = game.death_cause or "dead"
+    else:
+        outcome = "timeout"
+    return {
+        "seed": seed,
+        "ticks": ticks,
+        "max_score": max_score,
+        "final_score": game.score,
+        "time_to_1024": reached_1024,
+        "outcome": outcome,
+        "phase_ticks": phase_ticks,
+        "phase_bean_sums": phase_sums,
+    }
+
+
+def _run_chunk(config_index: int, params: dict[str, float], policy_name: str,
+               seeds: list[int], max_ticks: int) -> tuple[int, list[dict]]:
+    return config_index, [play_one(params, policy_name, seed, max_ticks) for seed in seeds]
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize(params: dict[str, float], results: list[dict]) -> dict:
+    n = len(results)
+    outcomes: dict[str, int] = {}
+    for r in results:
+        outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+    times = [r["time_to_1024"] for r in results if r["time_to_1024"] is not None]
+    max_scores = [r["max_score"] for r in results]
+
+    beans_per_phase = {}
+    for phase in PHASES:
+        ticks = sum(r["phase_ticks"][phase] for r in results)
+        if ticks:
+            sums = [sum(r["phase_bean_sums"][phase][k] for r in results) for k in range(3)]
+            beans_per_phase[phase] = {"green": sums[0] / ticks, "orange": sums[1] / ticks,
+                                      "red": sums[2] / ticks, "ticks": ticks}
+    return {
+        "params": params,
+        "games": n,
+        "outcomes": {k: v / n for k, v in sorted(outcomes.items())},
+        "easter_rate": outcomes.get("easter", 0) / n,
+        "reach_1024_rate": len(times) / n,
+        "time_to_1024_s": {"p10": _percentile(times, 0.1), "p50": _percentile(times, 0.5),
+                           "p90": _percentile(times, 0.9)},
+        "max_score": {"mean": statistics.fmean(max_scores), "p50": _percentile(max_scores, 0.5),
+                      "p90": _percentile(max_scores, 0.9)},
+        "beans_per_phase": beans_per_phase,
+    }
+
+
+def sweep(grid: dict[str, list[float]], games: int, policy_name: str = "autopilot",
+          max_ticks: int = DEFAULT_MAX_TICKS, seed: int = 0,
+          workers: int | None = None, progress: bool = True) -> list[dict]:
+    """笛卡尔积扫参：每个组合用同一批种子（组合间可直接对比）"""
+    names = list(grid)
+    configs = [dict(zip(names, values)) for values in itertools.product(*(grid[k] for k in names))]
+    seeds = [seed + i for i in range(games)]
+    workers = workers or os.cpu_count() or 1
+    # 每个组合切成若干块，保证所有核心都有活干且单块不会太长
+    chunks_per_config = max(1, -(-workers * 4 // len(configs)))
+    chunk = max(1, min(50, -(-games // chunks_per_config)))
+
+    results: list[list[dict]] = [[] for _ in configs]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_run_chunk, i, params, policy_name, seeds[j:j + chunk], max_ticks)
+            for i, params in enumerate(configs)
+            for j in range(0, games, chunk)
+        ]
+        done = 0
+        for future in as_completed(futures):
+            index, chunk_results = future.result()
+            results[index].extend(chunk_results)
+            done += 1
+            if progress:
+                print(f"\r{done}/{len(futures)} chunks  {time.perf_counter() - started:6.1f}s",
+                      end="", flush=True)
+    if progress:
+        print()
+    return [summarize(params, sorted(r, key=lambda x: x["seed"])) for params, r in zip(configs, results)]
+
+
+def _format_row(summary: dict) -> str:
+    params = " ".join(f"{k}={v:g}" for k, v in summary["params"].items()) or "(defaults)"
+    t = summary["time_to_1024_s"]["p50"]
+    outcomes = " ".join(f"{k}:{v:.0%}" for k, v in summary["outcomes"].items())
+    return (f"{params:<40} easter {summary['easter_rate']:6.1%}  "
+            f"1024 {summary['reach_1024_rate']:6.1%}  t50 {'-' if t is None else f'{t:7.1f}s'}  "
+            f"max p50 {summary['max_score']['p50']:5}  [{outcomes}]")
+
+
+def _parse_set(text: str) -> tuple[str, list[float]]:
+    name, _, values = text.partition("=")
+    if name not in DEFAULT_PARAMS or not values:
+        raise argparse.ArgumentTypeError(
+            f"expected NAME=V1,V2,... with NAME in {', '.join(DEFAULT_PARAMS)}")
+    return name, [float(v) for v in values.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="VibeSnake 难度参数批量调优")
+    parser.add_argument("--games", type=int, default=200, help="每个参数组合的对局数")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="autopilot")
+    parser.add_argument("--max-ticks", type=int, default=DEFAULT_MAX_TICKS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--set", dest="grid", type=_parse_set, action="append", default=[],
+                        metavar="NAME=V1,V2", help="扫描的参数及取值，可重复")
+    parser.add_argument("--json", help="把完整统计写入 JSON 文件")
+    args = parser.parse_args()
+
+    summaries = sweep(dict(args.grid), args.games, args.policy, args.max_ticks,
+                      args.seed, args.workers)
+    for summary in summaries:
+        print(_format_row(summary))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()